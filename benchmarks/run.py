@@ -0,0 +1,276 @@
+"""Time every stage of a tarmac diff on synthetic data.
+
+Each (rows, features) size gets a synthetic dataset whose two models
+disagree in a known region, and every stage of the pipeline is timed on it:
+loading, union, adapter predict, delta building (hard labels and the soft
+l1/js scores), explainer fit, explain and report writing. Results are
+written as JSON, so two runs (e.g. two commits) can be compared with
+--compare.
+
+The default preset covers 1e3 to 1e6 rows of 10 and 100 features. The
+large preset adds 1e7 rows and 2000 features; sizes over --max-cells are
+skipped, so raise it on a machine with the memory for them.
+
+Examples:
+    $ python benchmarks/run.py --rows 1e3,1e5 --features 10,100
+    $ python benchmarks/run.py --preset large --max-cells 2e10
+    $ python benchmarks/run.py -o before.json
+    $ python benchmarks/run.py -o after.json --compare before.json
+"""
+
+import argparse
+import gc
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.linear_model import LinearRegression, LogisticRegression
+
+from tarmac.adapters import get_adapter
+from tarmac.data import load_table, union_datasets
+from tarmac.delta.base import choose_builder
+from tarmac.explainers.base import choose_explainer
+
+PRESETS = {
+    "default": ("1e3,1e4,1e5,1e6", "10,100"),
+    "large": ("1e3,1e4,1e5,1e6,1e7", "10,100,2000"),
+}
+
+STAGES = (
+    "load_table[csv]",
+    "load_table[npy]",
+    "union_datasets",
+    "predict",
+    "build[classification]",
+    "build[regression]",
+    "build[l1]",
+    "build[js]",
+    "fit[exact]",
+    "fit[hist]",
+    "explain",
+    "report",
+)
+
+
+def make_dataset(n_rows, n_features, seed=0):
+    """Features whose first two columns drive the models' disagreement."""
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, n_features)).astype(np.float64)
+    y_class = (X[:, 0] + 0.5 * X[:, 1] > 0).astype(int)
+    y_reg = X[:, 0] + 0.5 * X[:, 1] + np.where(X[:, 1] > 1, X[:, 0] ** 2, 0)
+    return X, y_class, y_reg
+
+
+def make_models(X, y_class, y_reg, directory, n_fit=5000):
+    """Pickle a linear model and a forest of each kind, fitted on n_fit rows."""
+    X, y_class, y_reg = X[:n_fit], y_class[:n_fit], y_reg[:n_fit]
+    models = {
+        "lr": LogisticRegression(max_iter=300).fit(X, y_class),
+        "rf": RandomForestClassifier(20, max_depth=8, random_state=0).fit(X, y_class),
+        "lin": LinearRegression().fit(X, y_reg),
+        "rfr": RandomForestRegressor(20, max_depth=8, random_state=0).fit(X, y_reg),
+    }
+    for name, model in models.items():
+        joblib.dump(model, directory / f"{name}.pkl")
+    return {name: directory / f"{name}.pkl" for name in models}
+
+
+def timeit(func, repeat):
+    """Best wall time of func over repeat runs, and its last result."""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def bench_size(n_rows, n_features, stages, repeat, max_csv_cells, directory):
+    X, y_class, y_reg = make_dataset(n_rows, n_features)
+    paths = make_models(X, y_class, y_reg, directory)
+    timings = {}
+
+    def record(stage, func, rows=n_rows):
+        if stage not in stages:
+            return None
+        seconds, result = timeit(func, repeat)
+        timings[stage] = {"seconds": seconds, "rows_per_second": rows / seconds}
+        return result
+
+    if "load_table[csv]" in stages and n_rows * n_features <= max_csv_cells:
+        pd.DataFrame(X).to_csv(directory / "X.csv", index=False)
+        record("load_table[csv]", lambda: load_table(directory / "X.csv"))
+    if "load_table[npy]" in stages:
+        np.save(directory / "X.npy", X)
+        # memory-mapped: materialise the rows like the pipeline does
+        record("load_table[npy]", lambda: np.array(load_table(directory / "X.npy")))
+
+    # two halves overlapping on a quarter of the rows
+    half, quarter = n_rows // 2, n_rows // 4
+    X_a, X_b = X[:half], X[half - quarter :]
+    record(
+        "union_datasets",
+        lambda: union_datasets(X_a, X_b, y_class[:half], y_class[half - quarter :]),
+        rows=len(X_a) + len(X_b),
+    )
+
+    adapters = {name: get_adapter(path) for name, path in paths.items()}
+    preds = record(
+        "predict",
+        lambda: [adapters[name].predict(X) for name in ("lr", "rf", "lin", "rfr")],
+        rows=4 * n_rows,
+    )
+    if preds is None:
+        preds = [adapters[name].predict(X) for name in ("lr", "rf", "lin", "rfr")]
+
+    classification = choose_builder("classification")
+    delta = record(
+        "build[classification]", lambda: classification.build(preds[0], preds[1])
+    )
+    if delta is None:
+        delta = classification.build(preds[0], preds[1])
+    regression = choose_builder("regression")
+    record("build[regression]", lambda: regression.build(preds[2], preds[3]))
+    if stages & {"build[l1]", "build[js]"}:
+        proba = [adapters[name].predict_proba(X) for name in ("lr", "rf")]
+        for name in ("l1", "js"):
+            soft = choose_builder(name)
+            record(f"build[{name}]", lambda: soft.build(*proba))
+
+    explainer = record("fit[exact]", lambda: choose_explainer("exact").fit(X, delta))
+    record("fit[hist]", lambda: choose_explainer("hist").fit(X, delta))
+    if explainer is None:
+        explainer = choose_explainer("exact").fit(X, delta)
+
+    rules = record("explain", lambda: explainer.explain(return_dict=True))
+    if rules is None:
+        rules = explainer.explain(return_dict=True)
+
+    def write_report():
+        report = {"metadata": {"dataset_size": n_rows}, "rules": rules}
+        with open(directory / "rules.json", "w") as f:
+            json.dump(report, f, indent=2)
+
+    record("report", write_report)
+    return timings
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline):
+    """Print each stage's time relative to a previous run."""
+    previous = {
+        (r["rows"], r["features"], stage): t["seconds"]
+        for r in baseline["results"]
+        for stage, t in r["timings"].items()
+    }
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'}:")
+    for r in results:
+        for stage, t in r["timings"].items():
+            before = previous.get((r["rows"], r["features"], stage))
+            if before:
+                ratio = t["seconds"] / before
+                flag = "  <-- slower" if ratio > 1.2 else ""
+                print(
+                    f"  {r['rows']:>9} x {r['features']:<5} {stage:<22} "
+                    f"{before:9.4f}s -> {t['seconds']:9.4f}s ({ratio:5.2f}x){flag}"
+                )
+
+
+def parse_sizes(text):
+    return [int(float(size)) for size in text.split(",")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--preset",
+        choices=sorted(PRESETS),
+        default="default",
+        help="Sizes to run when --rows/--features are not given",
+    )
+    parser.add_argument("--rows", type=parse_sizes)
+    parser.add_argument("--features", type=parse_sizes)
+    parser.add_argument(
+        "--stages", default=",".join(STAGES), help="Comma-separated stages to time"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--max-cells",
+        type=float,
+        default=2e8,
+        help="Skip sizes with more rows x features than this (1e7 x 2000 "
+        "needs ~160 GB of float64)",
+    )
+    parser.add_argument("--max-csv-cells", type=float, default=2e7)
+    parser.add_argument("-o", "--output", type=Path, default=None)
+    parser.add_argument("--compare", type=Path, default=None)
+    args = parser.parse_args(argv)
+    rows, features = PRESETS[args.preset]
+    args.rows = args.rows or parse_sizes(rows)
+    args.features = args.features or parse_sizes(features)
+
+    stages = set(args.stages.split(","))
+    unknown = stages - set(STAGES)
+    if unknown:
+        parser.error(f"Unknown stages: {sorted(unknown)}")
+
+    results = []
+    for n_rows in args.rows:
+        for n_features in args.features:
+            if n_rows * n_features > args.max_cells:
+                print(f"skip {n_rows} x {n_features} (over --max-cells)")
+                continue
+            with tempfile.TemporaryDirectory() as directory:
+                timings = bench_size(
+                    n_rows,
+                    n_features,
+                    stages,
+                    args.repeat,
+                    args.max_csv_cells,
+                    Path(directory),
+                )
+            results.append({"rows": n_rows, "features": n_features, "timings": timings})
+            for stage, t in timings.items():
+                print(
+                    f"{n_rows:>9} x {n_features:<5} {stage:<22} "
+                    f"{t['seconds']:9.4f}s {t['rows_per_second']:14,.0f} rows/s"
+                )
+
+    report = {
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,56 @@
+import os
+import threading
 from pathlib import Path
 
+from .cache import PredictionCache
+from .executor import InferenceExecutor
 from .sklearn import SklearnAdapter
 
+_registry = {}
+_registry_lock = threading.Lock()
 
-def get_adapter(model_path: str):
+
+def get_adapter(model_path: str, mmap_dir: str = None):
     """
     Inspect file extension and return the right adapter instance.
     Currently supports:
       - .pkl, .joblib → SklearnAdapter
+
+    Adapters are kept in a process-wide registry, so loading the same
+    unchanged file again returns the instance already in memory (worker
+    processes forked afterwards inherit it too). With mmap_dir, the model's
+    arrays are memory-mapped from an uncompressed copy kept in that
+    directory (also read from TARMAC_MODEL_CACHE_DIR), which lets separate
+    processes share one physical copy.
     """
     p = Path(model_path)
     ext = p.suffix.lower()
-    if ext in {".pkl", ".joblib"}:
-        return SklearnAdapter(str(model_path))
-
-    else:
+    if ext not in {".pkl", ".joblib"}:
         raise ValueError(f"Unsupported model format: {ext}")
+
+    mmap_dir = mmap_dir or os.environ.get("TARMAC_MODEL_CACHE_DIR") or None
+    stat = os.stat(p)
+    key = (str(p.resolve()), None if mmap_dir is None else str(mmap_dir))
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _registry_lock:
+        entry = _registry.get(key)
+        if entry is None or entry[0] != version:
+            entry = (version, SklearnAdapter(str(model_path), mmap_dir))
+            _registry[key] = entry
+        return entry[1]
+
+
+def release_adapter(model_path: str):
+    """Drop a model from the registry so its memory can be reclaimed."""
+    path = str(Path(model_path).resolve())
+    with _registry_lock:
+        for key in [key for key in _registry if key[0] == path]:
+            del _registry[key]
+
+
+def shared_feature_names(*adapters):
+    """Feature names every adapter agrees on, or None if unknown or conflicting."""
+    names = [list(a.feature_names) for a in adapters if a.feature_names is not None]
+    if not names or any(n != names[0] for n in names):
+        return None
+    return names[0]
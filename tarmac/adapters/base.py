@@ -3,6 +3,22 @@ import numpy as np
 
 
 class BaseAdapter(ABC):
+    @property
+    def feature_names(self):
+        """Names of the input columns the model expects, if it records them."""
+        return None
+
+    @property
+    def n_features(self):
+        """Number of input columns the model expects, if known."""
+        names = self.feature_names
+        return None if names is None else len(names)
+
+    @property
+    def classes(self):
+        """Class labels in the column order of predict_proba, if known."""
+        return None
+
     @abstractmethod
     def predict(self, X: np.ndarray) -> np.ndarray:
         """Return discrete predictions."""
@@ -12,3 +28,14 @@ class BaseAdapter(ABC):
     def predict_proba(self, X: np.ndarray) -> np.ndarray:
         """Return probability estimates if available."""
         ...
+
+    def predict_with_proba(self, X: np.ndarray):
+        """Return (labels, probabilities) from one inference pass.
+
+        Labels are the classes of the most probable columns.
+        """
+        proba = self.predict_proba(X)
+        classes = self.classes
+        if classes is None:
+            classes = np.arange(proba.shape[1])
+        return np.asarray(classes)[proba.argmax(axis=1)], proba
@@ -0,0 +1,81 @@
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+import joblib
+import numpy as np
+
+
+def fingerprint_file(path, block_size=1 << 20) -> str:
+    """Content hash of a model file."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def fingerprint_array(X) -> str:
+    """Content hash of an input array (dtype and shape included)."""
+    return joblib.hash(X)
+
+
+class PredictionCache:
+    """On-disk store of predictions keyed by model and data fingerprints.
+
+    Entries are plain .npy files handed back memory-mapped. Every hit
+    refreshes the entry's mtime, and the least recently used entries are
+    evicted once the cache grows past max_bytes.
+    """
+
+    def __init__(self, directory, max_bytes: int = 2 * 1024**3):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._model_fingerprints = {}
+
+    def model_fingerprint(self, path) -> str:
+        stat = os.stat(path)
+        stamp = (str(Path(path).resolve()), stat.st_mtime_ns, stat.st_size)
+        if stamp not in self._model_fingerprints:
+            self._model_fingerprints[stamp] = fingerprint_file(path)
+        return self._model_fingerprints[stamp]
+
+    def key(self, model_path, data_fingerprint: str, method: str = "predict") -> str:
+        return f"{self.model_fingerprint(model_path)}-{data_fingerprint}-{method}"
+
+    def get(self, key: str):
+        path = self.directory / f"{key}.npy"
+        try:
+            preds = np.load(path, mmap_mode="r")
+        except FileNotFoundError:
+            return None
+        except ValueError:  # object labels cannot be memory-mapped
+            preds = np.load(path, allow_pickle=True)
+        os.utime(path)
+        return preds
+
+    def put(self, key: str, preds: np.ndarray):
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, np.asarray(preds), allow_pickle=True)
+        os.replace(tmp, self.directory / f"{key}.npy")
+        self.evict()
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits max_bytes."""
+        entries = []
+        for path in self.directory.glob("*.npy"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
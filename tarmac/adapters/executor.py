@@ -0,0 +1,172 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+from .cache import fingerprint_array
+
+_worker_adapters = None
+
+
+def _init_worker(sources):
+    global _worker_adapters
+    from . import get_adapter
+
+    _worker_adapters = [get_adapter(path, mmap_dir) for path, mmap_dir in sources]
+
+
+def _timed(predict, X):
+    start = time.perf_counter()
+    preds = predict(X)
+    return preds, start, time.perf_counter() - start
+
+
+def _predict_in_worker(i, X, method):
+    return _timed(getattr(_worker_adapters[i], method), X)
+
+
+# arrays returned by each adapter method
+_OUTPUTS = {"predict": 1, "predict_proba": 1, "predict_with_proba": 2}
+
+
+def _concatenate(parts):
+    if isinstance(parts[0], tuple):
+        return tuple(np.concatenate(arrays) for arrays in zip(*parts))
+    return np.concatenate(parts)
+
+
+class InferenceExecutor:
+    """Score several adapters on the same data concurrently.
+
+    Each adapter's rows are split into chunks and every (adapter, chunk)
+    pair is submitted to one pool, so models and chunks run side by side.
+    Threads are the default since most sklearn predict paths release the
+    GIL; the process backend loads each model once per worker from its path.
+    With a PredictionCache, adapters whose predictions for the same model
+    file and input are already on disk are not scored again. With a
+    Profiler, the latency of every (adapter, chunk) call is recorded.
+    """
+
+    def __init__(
+        self,
+        adapters,
+        jobs=1,
+        backend="thread",
+        chunk_size=None,
+        cache=None,
+        profiler=None,
+    ):
+        self.adapters = list(adapters)
+        self.profiler = profiler
+        self.jobs = jobs or os.cpu_count() or 1
+        self.backend = backend
+        self.chunk_size = chunk_size
+        self.cache = cache
+
+        if self.jobs == 1:
+            self._pool = None
+        elif backend == "thread":
+            self._pool = ThreadPoolExecutor(self.jobs)
+        elif backend == "process":
+            paths = [getattr(adapter, "path", None) for adapter in self.adapters]
+            if None in paths:
+                raise ValueError(
+                    "The process backend needs adapters loaded from a path"
+                )
+            sources = [
+                (path, getattr(adapter, "mmap_dir", None))
+                for path, adapter in zip(paths, self.adapters)
+            ]
+            self._pool = ProcessPoolExecutor(
+                self.jobs, initializer=_init_worker, initargs=(sources,)
+            )
+        else:
+            raise ValueError(f"Unknown inference backend: {backend}")
+
+    def predict(self, X, method: str = "predict") -> list:
+        """Return one prediction per adapter, in adapter order.
+
+        Args:
+            X: Rows to score
+            method: Adapter method to call: 'predict', 'predict_proba' or
+                'predict_with_proba' (whose results are (labels, proba) tuples)
+        """
+        if method not in _OUTPUTS:
+            raise ValueError(f"Unknown prediction method: {method}")
+        if self.cache is None:
+            return self._predict(range(len(self.adapters)), X, method)
+
+        data_fingerprint = fingerprint_array(X)
+        keys, results, missing = [], [], []
+        for i, adapter in enumerate(self.adapters):
+            path = getattr(adapter, "path", None)
+            key = None
+            if path is not None:
+                key = self.cache.key(path, data_fingerprint, method)
+            keys.append(key)
+            results.append(None if key is None else self._cache_get(key, method))
+            if results[i] is None:
+                missing.append(i)
+
+        for i, preds in zip(missing, self._predict(missing, X, method)):
+            if keys[i] is not None:
+                self._cache_put(keys[i], preds)
+            results[i] = preds
+        return results
+
+    def _cache_get(self, key, method):
+        if _OUTPUTS[method] == 1:
+            return self.cache.get(key)
+        parts = [self.cache.get(f"{key}.{k}") for k in range(_OUTPUTS[method])]
+        return None if any(part is None for part in parts) else tuple(parts)
+
+    def _cache_put(self, key, preds):
+        if not isinstance(preds, tuple):
+            return self.cache.put(key, preds)
+        for k, part in enumerate(preds):
+            self.cache.put(f"{key}.{k}", part)
+
+    def _predict(self, indices, X, method="predict") -> list:
+        if self._pool is None:
+            return [
+                self._record(i, *_timed(getattr(self.adapters[i], method), X))
+                for i in indices
+            ]
+
+        n = X.shape[0]
+        size = self.chunk_size or max(1, -(-n // self.jobs))
+        bounds = [(start, min(start + size, n)) for start in range(0, n, size)]
+        futures = [
+            [
+                self._submit(i, X[start:stop], method)
+                for start, stop in bounds or [(0, 0)]
+            ]
+            for i in indices
+        ]
+        return [
+            _concatenate([self._record(i, *f.result()) for f in chunk])
+            for i, chunk in zip(indices, futures)
+        ]
+
+    def _submit(self, i, X, method):
+        if self.backend == "process":
+            return self._pool.submit(_predict_in_worker, i, X, method)
+        return self._pool.submit(_timed, getattr(self.adapters[i], method), X)
+
+    def _record(self, i, preds, start, seconds):
+        if self.profiler is not None:
+            path = getattr(self.adapters[i], "path", None)
+            name = str(path) if path else f"model_{i}"
+            rows = len(preds[0] if isinstance(preds, tuple) else preds)
+            self.profiler.record_latency(name, start, seconds, rows)
+        return preds
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,23 +1,83 @@
+import os
+import tempfile
+from pathlib import Path
 import joblib
 import numpy as np
 from .base import BaseAdapter
+from .cache import fingerprint_file
 
 
 class SklearnAdapter(BaseAdapter):
-    def __init__(self, path: str):
+    def __init__(self, path: str, mmap_dir: str = None):
+        self.path = path
+        self.mmap_dir = mmap_dir
+        if mmap_dir is None:
+            self.model = joblib.load(path)
+        else:
+            self.model = joblib.load(local_copy(path, mmap_dir), mmap_mode="r")
 
-        self.model = joblib.load(path)
+    @property
+    def feature_names(self):
+        return getattr(self.model, "feature_names_in_", None)
+
+    @property
+    def n_features(self):
+        return getattr(self.model, "n_features_in_", None)
+
+    @property
+    def classes(self):
+        return getattr(self.model, "classes_", None)
 
     def predict(self, X: np.ndarray) -> np.ndarray:
-        return self.model.predict(X)
+        return self.model.predict(self._inputs(X))
 
     def predict_proba(self, X: np.ndarray) -> np.ndarray:
 
         if hasattr(self.model, "predict_proba"):
-            return self.model.predict_proba(X)
+            return self.model.predict_proba(self._inputs(X))
+
+        return self._one_hot(self.predict(X))
 
+    def predict_with_proba(self, X: np.ndarray):
+        if hasattr(self.model, "predict_proba"):
+            return super().predict_with_proba(X)
         preds = self.predict(X)
+        return preds, self._one_hot(preds)
+
+    def _inputs(self, X):
+        from ..data import Dataset
 
-        proba = np.zeros((len(preds), 2))
-        proba[np.arange(len(preds)), preds] = 1
+        if not isinstance(X, Dataset):
+            return X
+        # models fitted on DataFrames check the column names
+        return X.to_frame() if self.feature_names is not None else X.to_numpy()
+
+    def _one_hot(self, preds):
+        # over the model's classes, so any number and type of labels works
+        classes = self.classes
+        if classes is None:
+            classes, columns = np.unique(preds, return_inverse=True)
+        else:
+            columns = np.searchsorted(classes, preds)
+
+        proba = np.zeros((len(preds), len(classes)))
+        proba[np.arange(len(preds)), columns] = 1
         return proba
+
+
+def local_copy(path, directory) -> Path:
+    """Uncompressed copy of a model in directory, keyed by its content hash.
+
+    joblib can only memory-map the arrays of uncompressed files, so models
+    are re-dumped once; every later load, from any process, maps the same
+    file and shares its pages.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    target = directory / f"{fingerprint_file(path)}.joblib"
+    if not target.exists():
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        os.close(fd)
+        joblib.dump(joblib.load(path), tmp)
+        os.replace(tmp, target)
+    return target
@@ -0,0 +1,177 @@
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from .data import is_sparse
+from .explainers.base import choose_explainer
+
+_worker_data = None
+
+
+def _share(values, path, dtype, chunk_size=1 << 16):
+    """Write values to an .npy file chunk by chunk; workers memory-map it."""
+    shape = (values.shape[0],) + tuple(values.shape[1:])
+    out = np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+    for start in range(0, shape[0], chunk_size):
+        chunk = values[start : start + chunk_size]
+        out[start : start + chunk_size] = np.asarray(chunk, dtype=dtype)
+    out.flush()
+    return str(path)
+
+
+def _share_features(X, directory):
+    """Share X as one .npy file, or three (data, indices, indptr) for CSR."""
+    if not is_sparse(X):
+        return None, [_share(X, os.path.join(directory, "X.npy"), np.float32)]
+    X = X.tocsr()
+    parts = [(X.data, np.float32), (X.indices, None), (X.indptr, None)]
+    paths = [
+        _share(a, os.path.join(directory, f"X{i}.npy"), a.dtype if t is None else t)
+        for i, (a, t) in enumerate(parts)
+    ]
+    return X.shape, paths
+
+
+def _open_features(shape, paths):
+    arrays = [np.load(p, mmap_mode="r") for p in paths]
+    if shape is None:
+        return arrays[0]
+    from scipy import sparse
+
+    return sparse.csr_matrix(tuple(arrays), shape=shape, copy=False)
+
+
+def _init_worker(features, paths):
+    global _worker_data
+    _worker_data = [_open_features(*features)]
+    _worker_data += [None if p is None else np.load(p, mmap_mode="r") for p in paths]
+
+
+def _fit_in_worker(seed, engine, min_leaf):
+    return _fit_replicate(*_worker_data, seed, engine, min_leaf)
+
+
+def rule_key(rule):
+    """The (feature, operator) pairs a raw rule is made of, in sorted order.
+
+    Rules of two fits with the same key describe the same region, up to
+    their thresholds.
+    """
+    return tuple(sorted((int(f), op) for f, op, _ in rule["path"]))
+
+
+def _fit_replicate(X, y, w, seed, engine, min_leaf):
+    """Fit an explainer on one resample; return {key: thresholds in key order}."""
+    rng = np.random.default_rng(seed)
+    idx = np.sort(rng.integers(0, len(y), len(y)))
+    explainer = choose_explainer(engine, min_leaf=min_leaf).fit(
+        X[idx], y[idx], sample_weight=None if w is None else w[idx]
+    )
+    found = {}
+    for rule in explainer.extract_rules():
+        key = rule_key(rule)
+        if key not in found:  # rules come best first
+            by_condition = {(int(f), op): t for f, op, t in rule["path"]}
+            found[key] = [float(by_condition[c]) for c in key]
+    return found
+
+
+def bootstrap_rules(
+    X,
+    delta_labels,
+    n_boot,
+    engine="exact",
+    min_leaf=0.01,
+    sample_weight=None,
+    jobs=1,
+    seed=0,
+    spill_dir=None,
+):
+    """Fit n_boot explainers on bootstrap resamples of the rows.
+
+    With jobs > 1 (0 uses every CPU), the fits run in a process pool. X and
+    the labels are written once to .npy files that every worker
+    memory-maps, so the data is shared through the page cache instead of
+    being pickled to each worker. Sparse X is shared as its CSR arrays.
+
+    Args:
+        X: Features the explainer was fitted on
+        delta_labels: Disagreement labels of X
+        n_boot: Number of resamples
+        engine: Explainer engine (see choose_explainer)
+        min_leaf: Minimum fraction of rows per leaf
+        sample_weight: Optional row weights (e.g. from adaptive sampling)
+        jobs: Number of worker processes
+        seed: Seed the resamples are drawn from
+        spill_dir: Directory for the shared files (system temp by default)
+
+    Returns:
+        dict mapping each rule_key seen to the list of its thresholds in
+        every resample it appeared in
+    """
+    seeds = np.random.SeedSequence(seed).spawn(n_boot)
+    jobs = jobs or os.cpu_count() or 1
+    arrays = [(delta_labels, np.int8), (sample_weight, np.float64)]
+
+    if jobs == 1:
+        # float32 is what the trees split on
+        X = X.astype(np.float32) if is_sparse(X) else np.asarray(X, np.float32)
+        data = [X] + [None if a is None else np.asarray(a, t) for a, t in arrays]
+        replicates = [_fit_replicate(*data, s, engine, min_leaf) for s in seeds]
+    else:
+        with tempfile.TemporaryDirectory(dir=spill_dir) as directory:
+            features = _share_features(X, directory)
+            paths = [
+                None if a is None else _share(a, os.path.join(directory, f"{i}.npy"), t)
+                for i, (a, t) in enumerate(arrays)
+            ]
+            with ProcessPoolExecutor(
+                jobs, initializer=_init_worker, initargs=(features, paths)
+            ) as pool:
+                replicates = list(
+                    pool.map(
+                        _fit_in_worker,
+                        seeds,
+                        [engine] * n_boot,
+                        [min_leaf] * n_boot,
+                        chunksize=max(1, n_boot // (4 * jobs)),
+                    )
+                )
+
+    found = {}
+    for replicate in replicates:
+        for key, thresholds in replicate.items():
+            found.setdefault(key, []).append(thresholds)
+    return found
+
+
+def rule_stability(rules, found, n_boot, confidence=0.95):
+    """How often each rule reappears across resamples, and how its thresholds move.
+
+    Args:
+        rules: Raw rules of the reference fit (explainer.extract_rules())
+        found: Output of bootstrap_rules
+        n_boot: Number of resamples bootstrap_rules drew
+        confidence: Coverage of the percentile intervals
+
+    Returns:
+        One dict per rule with its frequency (fraction of resamples whose
+        rules include one with the same conditions) and threshold_ci, a
+        [low, high] percentile interval per condition of rule["path"] (None
+        for rules never seen again)
+    """
+    tails = [50 * (1 - confidence), 100 - 50 * (1 - confidence)]
+    stability = []
+    for rule in rules:
+        key = rule_key(rule)
+        thresholds = np.array(found.get(key, []), dtype=np.float64)
+        ci = None
+        if len(thresholds):
+            bounds = np.percentile(thresholds, tails, axis=0).T
+            by_condition = dict(zip(key, bounds.round(3).tolist()))
+            ci = [by_condition[(int(f), op)] for f, op, _ in rule["path"]]
+        stability.append(
+            {"frequency": round(len(thresholds) / n_boot, 3), "threshold_ci": ci}
+        )
+    return stability
@@ -2,13 +2,13 @@ import typer
 from rich import print as rprint
 from rich.panel import Panel
 from rich.console import Console
+from rich.table import Table
 from rich.text import Text
 from pathlib import Path
 from typing import Optional
-from .adapters import get_adapter
-from .delta.base import choose_builder
-from .explainers.deltaxplainer import DeltaXplainer
-from tarmac.data import load_table, union_datasets, load_builtin_dataset
+
+# numpy, pandas, scikit-learn and the tarmac modules built on them are
+# imported inside the commands, so --help and --version start fast
 
 app = typer.Typer(
     name="tarmac",
@@ -18,6 +18,32 @@ app = typer.Typer(
 console = Console()
 
 
+def _check_engine(engine: str) -> str:
+    if engine not in ("exact", "hist", "online"):
+        raise typer.BadParameter(f"Unknown explainer engine: {engine}")
+    return engine
+
+
+# options shared by several commands
+_engine_option = typer.Option(
+    "exact",
+    "--engine",
+    help="Tree engine explaining the differences:\n"
+    "- 'exact': Exact decision tree\n"
+    "- 'hist': Histogram-binned tree, much faster on millions of rows\n"
+    "- 'online': Incremental Hoeffding tree with bounded memory",
+    show_default=True,
+    callback=_check_engine,
+)
+_model_cache_dir_option = typer.Option(
+    None,
+    "--model-cache-dir",
+    envvar="TARMAC_MODEL_CACHE_DIR",
+    help="Directory of uncompressed model copies whose arrays are "
+    "memory-mapped, so worker processes share one copy of each model",
+)
+
+
 @app.callback(invoke_without_command=True)
 def callback(
     version: bool = typer.Option(False, "--version", "-v", help="Show version and exit")
@@ -35,6 +61,71 @@ def callback(
         raise typer.Exit()
 
 
+def _load_eval_data(
+    sampling,
+    data,
+    Xa,
+    ya,
+    Xb,
+    yb,
+    columns=None,
+    profiler=None,
+    split="holdout",
+    test_size=0.4,
+    return_source=False,
+):
+    """Load the comparison data and return the rows models are scored on."""
+    from .data import load_eval_data
+
+    try:
+        return load_eval_data(
+            sampling,
+            data,
+            Xa,
+            ya,
+            Xb,
+            yb,
+            columns,
+            profiler,
+            split,
+            test_size,
+            return_source,
+        )
+    except ValueError as e:
+        raise typer.BadParameter(str(e))
+
+
+def _print_profile(summary):
+    table = Table(title="Profile")
+    for column in ("Stage", "Wall (s)", "CPU (s)", "Peak RSS (MB)", "Rows/s"):
+        table.add_column(column, justify="left" if column == "Stage" else "right")
+    for stage in summary["stages"]:
+        rss = stage["peak_rss_mb"]
+        table.add_row(
+            stage["stage"],
+            f"{stage['wall_seconds']:.3f}",
+            f"{stage['cpu_seconds']:.3f}",
+            "-" if rss is None else f"{rss:.0f}",
+            f"{stage['rows_per_second']:,}" if "rows_per_second" in stage else "-",
+        )
+    console.print(table)
+
+    if summary["inference_latency"]:
+        table = Table(title="Inference latency per call")
+        for column in ("Model", "Calls", "p50 (s)", "p90 (s)", "p99 (s)", "Rows/s"):
+            table.add_column(column, justify="left" if column == "Model" else "right")
+        for model, latency in summary["inference_latency"].items():
+            table.add_row(
+                model,
+                str(latency["calls"]),
+                f"{latency['p50_seconds']:.4f}",
+                f"{latency['p90_seconds']:.4f}",
+                f"{latency['p99_seconds']:.4f}",
+                f"{latency['rows_per_second']:,}",
+            )
+        console.print(table)
+
+
 @app.command()
 def diff(
     model_a: Path = typer.Argument(
@@ -53,7 +144,9 @@ def diff(
         "-s",
         help="Sampling strategy for comparison data:\n"
         "- 'builtin': Use built-in datasets (iris/diabetes)\n"
-        "- 'union': Use your own datasets (requires --Xa, --ya, --Xb, --yb)",
+        "- 'union': Use your own datasets (requires --Xa and --Xb)\n"
+        "- 'adaptive': Score only --budget rows of the union of --Xa and --Xb, "
+        "chosen where the models are likely to disagree",
         show_default=True,
     ),
     data: str = typer.Option(
@@ -68,22 +161,40 @@ def diff(
     Xa: Optional[Path] = typer.Option(
         None,
         "--Xa",
-        help="Path to features for model_a (CSV/NPY, required if sampling='union')",
+        help="Path to features for model_a (CSV/Parquet/Feather/NPY/NPZ, or a "
+        "directory or quoted glob of shards, required if sampling='union')",
     ),
     ya: Optional[Path] = typer.Option(
         None,
         "--ya",
-        help="Path to target for model_a (CSV/NPY, required if sampling='union')",
+        help="Path to target for model_a (CSV/Parquet/Feather/NPY/NPZ, required for --split stratified)",
     ),
     Xb: Optional[Path] = typer.Option(
         None,
         "--Xb",
-        help="Path to features for model_b (CSV/NPY, required if sampling='union')",
+        help="Path to features for model_b (CSV/Parquet/Feather/NPY/NPZ, or a "
+        "directory or quoted glob of shards, required if sampling='union')",
     ),
     yb: Optional[Path] = typer.Option(
         None,
         "--yb",
-        help="Path to target for model_b (CSV/NPY, required if sampling='union')",
+        help="Path to target for model_b (CSV/Parquet/Feather/NPY/NPZ, required for --split stratified)",
+    ),
+    split: Optional[str] = typer.Option(
+        None,
+        "--split",
+        help="Rows of the builtin or union data to compare on:\n"
+        "- 'holdout' (default): A random --test-size fraction\n"
+        "- 'full': Every row (the only choice when streaming union data "
+        "with --chunk-size)\n"
+        "- 'stratified': A --test-size fraction keeping the class proportions "
+        "of the targets",
+    ),
+    test_size: Optional[float] = typer.Option(
+        None,
+        "--test-size",
+        help="Fraction of rows compared with --split holdout/stratified "
+        "[default: 0.4]",
     ),
     task: str = typer.Option(
         "auto",
@@ -98,7 +209,8 @@ def diff(
         0.05,
         "--epsilon",
         "-e",
-        help="Threshold for considering regression predictions different",
+        help="Threshold for considering regression predictions (or, with "
+        "--delta l1/js, probabilities) different",
     ),
     min_samples_leaf: float = typer.Option(
         0.01,
@@ -106,6 +218,25 @@ def diff(
         "-m",
         help="Minimum samples per leaf as fraction of dataset (controls rule granularity)",
     ),
+    engine: str = _engine_option,
+    delta: str = typer.Option(
+        "label",
+        "--delta",
+        help="How classifier disagreement is measured:\n"
+        "- 'label': The predicted labels differ\n"
+        "- 'l1': Total variation between predicted probabilities > --epsilon\n"
+        "- 'js': Jensen-Shannon divergence of the probabilities > --epsilon",
+        show_default=True,
+    ),
+    threshold_scale: str = typer.Option(
+        "max",
+        "--threshold-scale",
+        help="What a regression --epsilon below 1 is a fraction of:\n"
+        "- 'max': The largest prediction difference\n"
+        "- 'quantile': The 99th percentile difference (robust to outliers)\n"
+        "- 'mad': Median difference + 3 scaled MADs",
+        show_default=True,
+    ),
     output: Optional[Path] = typer.Option(
         None,
         "--output",
@@ -119,6 +250,81 @@ def diff(
         "--uf",
         help="Generate detailed, user-friendly explanations in output",
     ),
+    chunk_size: Optional[int] = typer.Option(
+        None,
+        "--chunk-size",
+        "-c",
+        min=1,
+        help="Stream the data through both models this many rows at a time, "
+        "keeping peak memory bounded by the chunk size. With sampling='union' "
+        "the --Xa/--Xb files are read lazily and deduplicated as they stream; "
+        "every row is compared, so --split, --test-size and --ya/--yb cannot "
+        "be given",
+    ),
+    budget: int = typer.Option(
+        10000,
+        "--budget",
+        min=1,
+        help="Number of rows scored by both models when sampling='adaptive'",
+    ),
+    jobs: int = typer.Option(
+        1,
+        "--jobs",
+        "-j",
+        min=0,
+        help="Number of concurrent inference workers scoring both models "
+        "(0 uses every CPU). Sharded --Xa/--Xb are loaded and scored a shard "
+        "at a time in this many processes",
+    ),
+    backend: str = typer.Option(
+        "thread",
+        "--backend",
+        help="Inference pool when --jobs > 1:\n"
+        "- 'thread': Share the loaded models between threads\n"
+        "- 'process': Load each model once per worker process",
+        show_default=True,
+    ),
+    cache_dir: Optional[Path] = typer.Option(
+        None,
+        "--cache-dir",
+        envvar="TARMAC_CACHE_DIR",
+        help="Directory of cached predictions keyed by model file and input "
+        "data, so unchanged models are not scored again across runs",
+    ),
+    model_cache_dir: Optional[Path] = _model_cache_dir_option,
+    profile: bool = typer.Option(
+        False,
+        "--profile",
+        help="Report wall time, CPU time, peak memory and rows/s of every stage "
+        "and model inference latency percentiles (added to the JSON metadata)",
+    ),
+    trace: Optional[Path] = typer.Option(
+        None,
+        "--trace",
+        help="Write the profiled stages and model calls to a Chrome trace file "
+        "(open in chrome://tracing or ui.perfetto.dev)",
+    ),
+    rows_out: Optional[Path] = typer.Option(
+        None,
+        "--rows-out",
+        help="Save the per-row view of the diff (index, prediction_a, "
+        "prediction_b, delta, leaf, rule_id) to a .parquet file, or to a "
+        "directory of memory-mappable .npy files",
+    ),
+    bootstrap: int = typer.Option(
+        0,
+        "--bootstrap",
+        min=0,
+        help="Refit the explainer on this many bootstrap resamples, in "
+        "--jobs processes, and report how often each rule reappears and 95% "
+        "intervals of its thresholds",
+    ),
+    cache_size: float = typer.Option(
+        2.0,
+        "--cache-size",
+        help="Maximum size of the prediction cache in GB (least recently "
+        "used entries are evicted first)",
+    ),
 ):
     """Compare two ML models and explain their differences with human-readable rules.
 
@@ -136,105 +342,890 @@ def diff(
 
         Compare regression models with custom threshold:
             $ tarmac diff model_a.pkl model_b.pkl --task regression --epsilon 0.1
+
+        Spend 5000 model calls on the rows most likely to disagree:
+            $ tarmac diff model_a.pkl model_b.pkl --sampling adaptive \
+                --Xa features_a.csv --Xb features_b.csv --budget 5000
+
+        Explain differences over millions of rows with the histogram engine:
+            $ tarmac diff model_a.pkl model_b.pkl --sampling union \
+                --Xa features_a.csv --Xb features_b.csv --chunk-size 1000000 \
+                --engine hist
+
+        Score both models concurrently on 8 threads:
+            $ tarmac diff model_a.pkl model_b.pkl --jobs 8
+
+        Reuse cached baseline predictions across runs:
+            $ tarmac diff baseline.pkl candidate.pkl --cache-dir ~/.cache/tarmac
+
+        Check how stable the rules are over 200 resamples, on every CPU:
+            $ tarmac diff model_a.pkl model_b.pkl --bootstrap 200 --jobs 0
+
+        Load and score a directory of Parquet shards on 8 processes:
+            $ tarmac diff model_a.pkl model_b.pkl --sampling union \\
+                --Xa "shards_a/*.parquet" --Xb shards_b/ --jobs 8
+
+        Stream large datasets through both models 100k rows at a time:
+            $ tarmac diff model_a.pkl model_b.pkl --sampling union \\
+                --Xa features_a.csv --Xb features_b.csv --chunk-size 100000
     """
-    from sklearn import model_selection
-    import json
+    import numpy as np
+    from .adapters import (
+        InferenceExecutor,
+        PredictionCache,
+        get_adapter,
+        shared_feature_names,
+    )
+    from .bootstrap import bootstrap_rules, rule_stability
+    from .data import (
+        iter_chunks,
+        iter_table,
+        iter_union,
+        load_dataset,
+        numeric_view,
+        split_rows,
+        union_datasets,
+    )
+    from .delta.base import choose_builder
+    from .explainers.base import choose_explainer
+    from .pipeline import score_adaptive, score_chunks, score_soft
+    from .profiling import NullProfiler, Profiler
+    from .report import (
+        open_row_writer,
+        rule_ids_by_node,
+        write_json,
+        write_ndjson,
+        write_rows,
+    )
+    from .shard import pair_shards, score_shards
 
-    if sampling == "builtin":
-        X, y = load_builtin_dataset(data)
-    elif sampling == "union":
-        if not (Xa and ya and Xb and yb):
+    if threshold_scale not in ("max", "quantile", "mad"):
+        raise typer.BadParameter(f"Unknown threshold scale: {threshold_scale}")
+    if delta not in ("label", "l1", "js"):
+        raise typer.BadParameter(f"Unknown delta: {delta}")
+    if delta != "label" and (chunk_size or sampling == "adaptive"):
+        raise typer.BadParameter(
+            "--delta l1/js cannot be combined with --chunk-size or sampling='adaptive'"
+        )
+    if delta != "label" and task == "regression":
+        raise typer.BadParameter("--delta l1/js compares classifier probabilities")
+    if sampling == "union" and chunk_size:
+        if split not in (None, "full") or test_size is not None:
             raise typer.BadParameter(
-                "When using sampling='union', all of --Xa, --ya, --Xb, and --yb are required"
+                "Streamed union data is compared on every row: --split and "
+                "--test-size cannot be combined with --chunk-size"
+            )
+        if ya or yb:
+            raise typer.BadParameter(
+                "Targets are not read when streaming: --ya/--yb cannot be "
+                "combined with --chunk-size"
+            )
+    split = split or "holdout"
+    test_size = 0.4 if test_size is None else test_size
+    if output and output.suffix not in (".json", ".ndjson", ".jsonl", ".txt"):
+        raise typer.BadParameter(
+            "Output file must have .json, .ndjson, .jsonl or .txt extension"
+        )
+    if rows_out and rows_out.suffix not in ("", ".parquet", ".pq"):
+        raise typer.BadParameter("--rows-out must be a directory or a .parquet file")
+    if rows_out and rows_out.suffix in (".parquet", ".pq"):
+        try:
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            raise typer.BadParameter(
+                'Writing --rows-out as Parquet needs pyarrow: pip install -e ".[parquet]"'
             )
-        X_a = load_table(Xa)
-        y_a = load_table(ya)
-        X_b = load_table(Xb)
-        y_b = load_table(yb)
 
-        X, y = union_datasets(X_a, X_b, y_a, y_b)
-    else:
-        raise typer.BadParameter(f"Unknown sampling strategy: {sampling}")
+    profiler = Profiler() if profile or trace else NullProfiler()
 
-    if y is not None:
-        X_tr, X_te, y_tr, y_te = model_selection.train_test_split(
-            X, y, test_size=0.4, random_state=0
+    load = get_adapter  # alias
+    with profiler.stage("load_models"):
+        ma, mb = load(model_a, model_cache_dir), load(model_b, model_cache_dir)
+    # only read the columns the models were trained on
+    columns = shared_feature_names(ma, mb)
+
+    chunks, shards, source_parts = None, None, None
+    if sampling == "union" and not chunk_size and delta == "label":
+        if Xa and Xb and bool(ya) == bool(yb):
+            try:
+                shards_a = pair_shards(Xa, ya)
+                shards = shards_a + pair_shards(Xb, yb)
+            except ValueError as e:
+                raise typer.BadParameter(str(e))
+        if shards is not None and len(shards) <= 2:
+            shards = None  # one file each: split before scoring
+
+    preds_a = preds_b = None
+    if sampling == "union" and chunk_size:
+        if not (Xa and Xb):
+            raise typer.BadParameter(
+                "When streaming with --chunk-size, --Xa and --Xb are required"
+            )
+        source_parts = []
+        chunks = iter_union(
+            [iter_table(Xa, chunk_size, columns), iter_table(Xb, chunk_size, columns)],
+            source_parts,
         )
+    elif sampling == "adaptive":
+        if not (Xa and Xb):
+            raise typer.BadParameter(
+                "When using sampling='adaptive', --Xa and --Xb are required"
+            )
+        if chunk_size:
+            raise typer.BadParameter(
+                "--chunk-size cannot be combined with sampling='adaptive'"
+            )
+        with profiler.stage("load") as stage:
+            X_a, X_b = load_dataset(Xa, columns), load_dataset(Xb, columns)
+            stage["rows"] = X_a.shape[0] + X_b.shape[0]
+        with profiler.stage("union", rows=X_a.shape[0] + X_b.shape[0]):
+            X_te, source = union_datasets(X_a, X_b, return_source=True)
+    elif shards:
+        # workers load, deduplicate and score the shards in one stage
+        with profiler.stage("inference") as stage:
+            inputs = [0] * len(shards_a) + [1] * (len(shards) - len(shards_a))
+            X_te, y_te, preds_a, preds_b, source = score_shards(
+                shards, model_a, model_b, columns, jobs, model_cache_dir, inputs
+            )
+            stage["rows"] = X_te.shape[0]
+        with profiler.stage("split", rows=X_te.shape[0]):
+            try:
+                rows = split_rows(X_te.shape[0], y_te, split, test_size)
+            except ValueError as e:
+                raise typer.BadParameter(str(e))
+            if rows is not None:
+                X_te, preds_a, preds_b = X_te[rows], preds_a[rows], preds_b[rows]
+                source = source[rows]
     else:
-        X_te = X
+        X_te, source = _load_eval_data(
+            sampling,
+            data,
+            Xa,
+            ya,
+            Xb,
+            yb,
+            columns,
+            profiler,
+            split,
+            test_size,
+            return_source=True,
+        )
 
-    load = get_adapter  # alias
-    ma, mb = load(model_a), load(model_b)
-    preds_a, preds_b = ma.predict(X_te), mb.predict(X_te)
+    cache = PredictionCache(cache_dir, int(cache_size * 1024**3)) if cache_dir else None
+
+    # predictions of the compared rows, kept for --rows-out
+    batches = ([], [])
+
+    def keep_predictions(chunk_a, chunk_b):
+        batches[0].append(chunk_a)
+        batches[1].append(chunk_b)
+
+    on_chunk = keep_predictions if rows_out else None
+
+    weights, threshold = None, None
+    if sampling == "adaptive":
+        with profiler.stage("inference", rows=budget):
+            X_te, delta_labels, weights, task, rows = score_adaptive(
+                X_te,
+                ma,
+                mb,
+                budget,
+                task=task,
+                epsilon=epsilon,
+                jobs=jobs,
+                backend=backend,
+                cache=cache,
+                profiler=profiler,
+                scale=threshold_scale,
+                on_chunk=on_chunk,
+            )
+        source = source[rows]
+    elif chunk_size:
+        if chunks is None:
+            chunks = iter_chunks(X_te, chunk_size)
+        # streamed: reading and deduplicating chunks is part of this stage
+        with profiler.stage("inference") as stage:
+            X_te, delta_labels, task, threshold = score_chunks(
+                chunks,
+                ma,
+                mb,
+                task=task,
+                epsilon=epsilon,
+                jobs=jobs,
+                backend=backend,
+                cache=cache,
+                profiler=profiler,
+                scale=threshold_scale,
+                on_chunk=on_chunk,
+            )
+            stage["rows"] = X_te.shape[0]
+        if source_parts is not None:
+            source = np.concatenate(source_parts)
+    elif delta != "label":
+        task = "classification"
+        with profiler.stage("inference", rows=X_te.shape[0]):
+            delta_scores, delta_labels, preds_a, preds_b = score_soft(
+                X_te,
+                ma,
+                mb,
+                delta=delta,
+                epsilon=epsilon,
+                jobs=jobs,
+                backend=backend,
+                cache=cache,
+                profiler=profiler,
+            )
+    else:
+        if preds_a is None:
+            with profiler.stage("inference", rows=X_te.shape[0]):
+                with InferenceExecutor(
+                    [ma, mb], jobs=jobs, backend=backend, cache=cache, profiler=profiler
+                ) as pool:
+                    preds_a, preds_b = pool.predict(X_te)
+
+        if task == "auto":
+            task = "regression" if preds_a.dtype.kind in "f" else "classification"
 
-    if task == "auto":
-        task = "regression" if preds_a.dtype.kind in "f" else "classification"
+        kw = {"scale": threshold_scale} if task == "regression" else {}
+        builder = choose_builder(task, **kw)
+        with profiler.stage("delta", rows=X_te.shape[0]):
+            delta_labels = builder.build(preds_a, preds_b, epsilon=epsilon)
+        threshold = getattr(builder, "threshold_", None)
+
+    # explainers split on numbers: categorical columns are seen as codes
+    X_fit = numeric_view(X_te)
+    with profiler.stage("fit", rows=X_te.shape[0]):
+        explainer = choose_explainer(engine, min_leaf=min_samples_leaf).fit(
+            X_fit, delta_labels, sample_weight=weights
+        )
+    if batches[0]:
+        preds_a, preds_b = np.concatenate(batches[0]), np.concatenate(batches[1])
 
-    delta_labels = choose_builder(task).build(preds_a, preds_b, epsilon=epsilon)
-    explainer = DeltaXplainer(min_leaf=min_samples_leaf).fit(X_te, delta_labels)
-    rules = explainer.explain()
+    # the tree is walked once; rules are formatted as each output needs them
+    with profiler.stage("explain"):
+        raw_rules = explainer.extract_rules()
+
+    stability = None
+    if bootstrap:
+        with profiler.stage("bootstrap", rows=bootstrap * X_te.shape[0]):
+            found = bootstrap_rules(
+                X_fit,
+                delta_labels,
+                bootstrap,
+                engine=engine,
+                min_leaf=min_samples_leaf,
+                sample_weight=weights,
+                jobs=jobs,
+            )
+            stability = rule_stability(raw_rules, found, bootstrap)
 
     console.print("\n[bold green]📊 Model Difference Analysis[/]")
+    if threshold is not None:
+        console.print(f"Predictions differ when |a - b| > {threshold:.6g}")
     console.print(
-        f"[bold blue]Generated {len(rules)} rules explaining model differences:[/]\n"
+        f"[bold blue]Generated {len(raw_rules)} rules explaining model differences:[/]\n"
     )
 
-    for i, rule in enumerate(rules[:10], 1):
+    for i, rule in enumerate(raw_rules[:10], 1):
         text = Text()
         text.append(f"Rule {i}: ", style="bold cyan")
-        text.append(rule)
+        text.append(explainer.format_rule_str(rule))
+        if stability:
+            text.append(
+                f"\nFound in {stability[i - 1]['frequency']:.0%} of "
+                f"{bootstrap} bootstrap resamples",
+                style="dim",
+            )
         console.print(Panel(text, expand=False))
 
-    if output:
-        if output.suffix == ".json":
-
-            rules = explainer.explain(return_dict=True)
-
-            output_dict = {
-                "metadata": {
-                    "total_rules": len(rules),
-                    "task": task,
-                    "epsilon": epsilon if task == "regression" else None,
-                    "dataset_size": len(X_te),
-                    "min_samples_leaf": min_samples_leaf,
-                },
-                "rules": rules,
-            }
-            with open(output, "w") as f:
-                json.dump(output_dict, f, indent=2)
-        elif output.suffix == ".txt":
-            with open(output, "w") as f:
-                if user_friendly:
-
-                    f.write("📊 Analysis of Model Behavior Differences\n")
-                    f.write("=" * 50 + "\n\n")
-                    f.write(
-                        "This report identifies key patterns where the two models make different predictions.\n\n"
-                    )
-                    f.write(
-                        f"We analyzed {len(X_te)} data samples and found {len(rules)} important patterns.\n"
-                    )
-                    f.write(
-                        "Each pattern describes specific conditions where the models disagree.\n\n"
+    def rule_dicts():
+        for i, rule in enumerate(raw_rules):
+            formatted = explainer.format_rule_dict(rule)
+            if stability:
+                formatted["bootstrap_frequency"] = stability[i]["frequency"]
+                for condition, ci in zip(
+                    formatted["conditions"], stability[i]["threshold_ci"] or []
+                ):
+                    condition["threshold_ci"] = ci
+            yield formatted
+
+    with profiler.stage("report"):
+        if output:
+            if output.suffix in (".json", ".ndjson", ".jsonl"):
+
+                rules = rule_dicts()
+
+                output_dict = {
+                    "metadata": {
+                        "total_rules": len(raw_rules),
+                        "task": task,
+                        "epsilon": (
+                            epsilon
+                            if task == "regression" or delta != "label"
+                            else None
+                        ),
+                        "dataset_size": X_te.shape[0],
+                        "min_samples_leaf": min_samples_leaf,
+                    },
+                    "rules": rules,
+                }
+                if threshold is not None:
+                    output_dict["metadata"]["threshold"] = threshold
+                    output_dict["metadata"]["threshold_scale"] = threshold_scale
+                if delta != "label":
+                    output_dict["metadata"]["delta"] = delta
+                    output_dict["metadata"]["mean_delta_score"] = round(
+                        float(delta_scores.mean()), 4
                     )
-                    f.write("Key Findings:\n")
-                    f.write("-" * 20 + "\n\n")
-                    for i, rule in enumerate(rules, 1):
-                        f.write(f"Pattern #{i}:\n")
-                        f.write("What we found: When " + str(rule).lower() + "\n")
+                if bootstrap:
+                    output_dict["metadata"]["bootstrap"] = bootstrap
+                if profile:
+                    output_dict["metadata"]["profile"] = profiler.summary()
+                write = write_json if output.suffix == ".json" else write_ndjson
+                write(output, output_dict["metadata"], output_dict["rules"])
+            else:
+                rules = (explainer.format_rule_str(rule) for rule in raw_rules)
+                with open(output, "w") as f:
+                    if user_friendly:
+
+                        f.write("📊 Analysis of Model Behavior Differences\n")
+                        f.write("=" * 50 + "\n\n")
                         f.write(
-                            "This means that under these specific conditions, the models produce notably different results.\n\n"
+                            "This report identifies key patterns where the two models make different predictions.\n\n"
                         )
-                    f.write(
-                        "\nNote: Understanding these patterns can help identify where the models might need additional review or where their differences might impact business decisions.\n"
-                    )
-                else:
+                        f.write(
+                            f"We analyzed {X_te.shape[0]} data samples and found {len(raw_rules)} important patterns.\n"
+                        )
+                        f.write(
+                            "Each pattern describes specific conditions where the models disagree.\n\n"
+                        )
+                        f.write("Key Findings:\n")
+                        f.write("-" * 20 + "\n\n")
+                        for i, rule in enumerate(rules, 1):
+                            f.write(f"Pattern #{i}:\n")
+                            f.write("What we found: When " + str(rule).lower() + "\n")
+                            f.write(
+                                "This means that under these specific conditions, the models produce notably different results.\n\n"
+                            )
+                        f.write(
+                            "\nNote: Understanding these patterns can help identify where the models might need additional review or where their differences might impact business decisions.\n"
+                        )
+                    else:
+
+                        f.write(f"Dataset size: {X_te.shape[0]} samples\n")
+                        for i, rule in enumerate(rules, 1):
+                            f.write(f"Rule {i}: {rule}\n")
+
+        if rows_out:
+            columns = {"delta": delta_labels}
+            if preds_a is not None:
+                columns = {"prediction_a": preds_a, "prediction_b": preds_b, **columns}
+            if delta != "label":
+                columns["delta_score"] = delta_scores
+            with open_row_writer(rows_out, X_te.shape[0]) as writer:
+                write_rows(
+                    writer,
+                    explainer,
+                    X_fit,
+                    columns,
+                    rule_ids_by_node(explainer, raw_rules),
+                    source=source,
+                )
+
+    if profile:
+        _print_profile(profiler.summary())
+    if trace:
+        profiler.write_chrome_trace(trace)
+
+
+@app.command("diff-many")
+def diff_many(
+    models: list[Path] = typer.Argument(
+        ...,
+        help="Baseline model followed by the candidate models to compare against it",
+        show_default=False,
+    ),
+    sampling: str = typer.Option(
+        "builtin",
+        "--sampling",
+        "-s",
+        help="Sampling strategy for comparison data: 'builtin' or 'union'",
+        show_default=True,
+    ),
+    data: str = typer.Option(
+        "iris",
+        "--data",
+        "-d",
+        help="Built-in dataset to use (when sampling='builtin'): 'iris' or 'diabetes'",
+        show_default=True,
+    ),
+    Xa: Optional[Path] = typer.Option(None, "--Xa", help="Path to features A"),
+    ya: Optional[Path] = typer.Option(None, "--ya", help="Path to target A"),
+    Xb: Optional[Path] = typer.Option(None, "--Xb", help="Path to features B"),
+    yb: Optional[Path] = typer.Option(None, "--yb", help="Path to target B"),
+    split: str = typer.Option(
+        "holdout",
+        "--split",
+        help="Rows to compare on: 'holdout', 'full' or 'stratified'",
+        show_default=True,
+    ),
+    test_size: float = typer.Option(
+        0.4,
+        "--test-size",
+        help="Fraction of rows compared with --split holdout/stratified",
+        show_default=True,
+    ),
+    task: str = typer.Option(
+        "auto", "--task", "-t", help="'auto', 'classification' or 'regression'"
+    ),
+    epsilon: float = typer.Option(
+        0.05,
+        "--epsilon",
+        "-e",
+        help="Threshold for considering regression predictions different",
+    ),
+    min_samples_leaf: float = typer.Option(
+        0.01,
+        "--min-samples-leaf",
+        "-m",
+        help="Minimum samples per leaf as fraction of dataset (controls rule granularity)",
+    ),
+    engine: str = _engine_option,
+    matrix: bool = typer.Option(
+        False,
+        "--matrix",
+        help="Also report the pairwise disagreement rate between all models",
+    ),
+    output: Optional[Path] = typer.Option(
+        None, "--output", "-o", help="Save all comparisons to a .json file"
+    ),
+    jobs: int = typer.Option(
+        1,
+        "--jobs",
+        "-j",
+        min=0,
+        help="Number of concurrent inference workers (0 uses every CPU)",
+    ),
+    backend: str = typer.Option(
+        "thread", "--backend", help="Inference pool: 'thread' or 'process'"
+    ),
+    cache_dir: Optional[Path] = typer.Option(
+        None,
+        "--cache-dir",
+        envvar="TARMAC_CACHE_DIR",
+        help="Directory of cached predictions reused across runs",
+    ),
+    model_cache_dir: Optional[Path] = _model_cache_dir_option,
+):
+    """Compare several candidate models against one baseline in a single run.
+
+    The data is loaded and split once and every model is scored once.
+
+    Examples:
+        $ tarmac diff-many baseline.pkl cand_1.pkl cand_2.pkl cand_3.pkl --matrix
+    """
+    import json
+    from .adapters import PredictionCache, get_adapter, shared_feature_names
+    from .pipeline import diff_many as run_diff_many
+
+    if len(models) < 2:
+        raise typer.BadParameter("Provide a baseline and at least one candidate")
+
+    adapters = [get_adapter(path, model_cache_dir) for path in models]
+    columns = shared_feature_names(*adapters)
+    X_te = _load_eval_data(
+        sampling, data, Xa, ya, Xb, yb, columns, split=split, test_size=test_size
+    )
+    cache = PredictionCache(cache_dir) if cache_dir else None
+
+    result = run_diff_many(
+        X_te,
+        adapters,
+        task=task,
+        epsilon=epsilon,
+        min_leaf=min_samples_leaf,
+        engine=engine,
+        matrix=matrix,
+        jobs=jobs,
+        backend=backend,
+        cache=cache,
+    )
+
+    console.print("\n[bold green]📊 Model Difference Analysis[/]")
+    comparisons = []
+    for path, delta, explainer in zip(
+        models[1:], result["delta_labels"], result["explainers"]
+    ):
+        raw_rules = explainer.extract_rules()
+        console.print(
+            f"\n[bold blue]{models[0].name} vs {path.name}: "
+            f"{delta.mean():.1%} disagreement, {len(raw_rules)} rules[/]"
+        )
+        for i, rule in enumerate(raw_rules[:3], 1):
+            text = Text()
+            text.append(f"Rule {i}: ", style="bold cyan")
+            text.append(explainer.format_rule_str(rule))
+            console.print(Panel(text, expand=False))
+        comparisons.append(
+            {
+                "model_a": str(models[0]),
+                "model_b": str(path),
+                "disagreement_rate": round(float(delta.mean()), 4),
+                "total_rules": len(raw_rules),
+                "rules": [explainer.format_rule_dict(rule) for rule in raw_rules],
+            }
+        )
+
+    output_dict = {
+        "metadata": {
+            "task": result["task"],
+            "epsilon": epsilon if result["task"] == "regression" else None,
+            "dataset_size": X_te.shape[0],
+            "min_samples_leaf": min_samples_leaf,
+        },
+        "comparisons": comparisons,
+    }
+
+    if matrix:
+        names = [path.name for path in models]
+        table = Table(title="Pairwise disagreement rate")
+        table.add_column("")
+        for name in names:
+            table.add_column(name, justify="right")
+        for name, row in zip(names, result["disagreement"]):
+            table.add_row(name, *(f"{rate:.1%}" for rate in row))
+        console.print(table)
+        output_dict["disagreement_matrix"] = {
+            "models": [str(path) for path in models],
+            "rates": result["disagreement"].round(4).tolist(),
+        }
+
+    if output:
+        if output.suffix != ".json":
+            raise typer.BadParameter("Output file must have a .json extension")
+        with open(output, "w") as f:
+            json.dump(output_dict, f, indent=2)
+
 
-                    f.write(f"Dataset size: {len(X_te)} samples\n")
-                    for i, rule in enumerate(rules, 1):
-                        f.write(f"Rule {i}: {rule}\n")
+@app.command("log")
+def log(
+    model_dir: Path = typer.Argument(
+        ...,
+        help="Directory with one .pkl/.joblib file per model version",
+        show_default=False,
+    ),
+    sampling: str = typer.Option(
+        "builtin",
+        "--sampling",
+        "-s",
+        help="Sampling strategy for comparison data: 'builtin' or 'union'",
+        show_default=True,
+    ),
+    data: str = typer.Option(
+        "iris",
+        "--data",
+        "-d",
+        help="Built-in dataset to use (when sampling='builtin'): 'iris' or 'diabetes'",
+        show_default=True,
+    ),
+    Xa: Optional[Path] = typer.Option(None, "--Xa", help="Path to features A"),
+    ya: Optional[Path] = typer.Option(None, "--ya", help="Path to target A"),
+    Xb: Optional[Path] = typer.Option(None, "--Xb", help="Path to features B"),
+    yb: Optional[Path] = typer.Option(None, "--yb", help="Path to target B"),
+    split: str = typer.Option(
+        "holdout",
+        "--split",
+        help="Rows to compare on: 'holdout', 'full' or 'stratified'",
+        show_default=True,
+    ),
+    test_size: float = typer.Option(
+        0.4,
+        "--test-size",
+        help="Fraction of rows compared with --split holdout/stratified",
+        show_default=True,
+    ),
+    task: str = typer.Option(
+        "auto", "--task", "-t", help="'auto', 'classification' or 'regression'"
+    ),
+    epsilon: float = typer.Option(
+        0.05,
+        "--epsilon",
+        "-e",
+        help="Threshold for considering regression predictions different",
+    ),
+    min_samples_leaf: float = typer.Option(
+        0.01,
+        "--min-samples-leaf",
+        "-m",
+        help="Minimum samples per leaf as fraction of dataset (controls rule granularity)",
+    ),
+    engine: str = _engine_option,
+    order: str = typer.Option(
+        "name",
+        "--order",
+        help="Version order: 'name' (natural sort, v2 before v10) or 'mtime'",
+        show_default=True,
+    ),
+    state_dir: Optional[Path] = typer.Option(
+        None,
+        "--state-dir",
+        help="Where predictions and logged diffs are kept "
+        "(default: MODEL_DIR/.tarmac)",
+    ),
+    top: int = typer.Option(
+        3, "--top", help="Rules shown for every pair of versions", show_default=True
+    ),
+    output: Optional[Path] = typer.Option(
+        None, "--output", "-o", help="Save the whole log to a .json file"
+    ),
+    jobs: int = typer.Option(
+        1,
+        "--jobs",
+        "-j",
+        min=0,
+        help="Number of concurrent inference workers (0 uses every CPU)",
+    ),
+    backend: str = typer.Option(
+        "thread", "--backend", help="Inference pool: 'thread' or 'process'"
+    ),
+    model_cache_dir: Optional[Path] = _model_cache_dir_option,
+):
+    """Show what changed between consecutive versions of a model.
+
+    Every version is scored once on the evaluation set and its predictions
+    are kept, along with every diff, in MODEL_DIR/.tarmac. Running the
+    command again after adding a version only scores that version and
+    explains its diff against the previous one.
+
+    Examples:
+        $ tarmac log models/ --sampling union --Xa eval.csv --Xb eval.csv \\
+            --split full
+    """
+    import json
+    from .adapters import get_adapter, shared_feature_names
+    from .history import ModelLog
+
+    if output and output.suffix != ".json":
+        raise typer.BadParameter("Output file must have a .json extension")
+    try:
+        history = ModelLog(model_dir, state_dir, order)
+        versions = history.versions()
+    except (OSError, ValueError) as e:
+        raise typer.BadParameter(str(e))
+    if len(versions) < 2:
+        raise typer.BadParameter(f"Need at least two model versions in {model_dir}")
+
+    # versions are expected to share their features: only the newest is loaded
+    columns = shared_feature_names(get_adapter(versions[-1], model_cache_dir))
+    X_te = _load_eval_data(
+        sampling, data, Xa, ya, Xb, yb, columns, split=split, test_size=test_size
+    )
+    entries = history.update(
+        X_te,
+        task=task,
+        epsilon=epsilon,
+        min_leaf=min_samples_leaf,
+        engine=engine,
+        jobs=jobs,
+        backend=backend,
+        mmap_dir=model_cache_dir,
+    )
+
+    computed = sum(entry["computed"] for entry in entries)
+    console.print(
+        f"\n[bold green]📜 {len(versions)} versions, {len(entries)} diffs "
+        f"({computed} new)[/]"
+    )
+    for entry in entries:
+        status = "new" if entry["computed"] else "logged"
+        console.print(
+            f"\n[bold blue]{entry['from']} → {entry['to']}: "
+            f"{entry['disagreement_rate']:.1%} disagreement, "
+            f"{entry['total_rules']} rules[/] [dim]({status})[/]"
+        )
+        for i, rule in enumerate(entry["rules"][:top], 1):
+            conditions = " AND ".join(
+                f"{c['feature']} {c['operator']} {c['threshold']}"
+                for c in rule["conditions"]
+            )
+            text = Text()
+            text.append(f"Rule {i}: ", style="bold cyan")
+            text.append(
+                f"IF {conditions or 'always'} THEN models differ "
+                f"(affects {rule['samples_affected']} samples, "
+                f"{rule['disagreement_percentage']}% disagree)"
+            )
+            console.print(Panel(text, expand=False))
+
+    if output:
+        output_dict = {
+            "metadata": {
+                "model_dir": str(model_dir),
+                "versions": [path.name for path in versions],
+                "dataset_size": X_te.shape[0],
+                "epsilon": epsilon,
+                "min_samples_leaf": min_samples_leaf,
+            },
+            "diffs": entries,
+        }
+        with open(output, "w") as f:
+            json.dump(output_dict, f, indent=2)
+
+
+@app.command()
+def apply(
+    rules: Path = typer.Argument(
+        ...,
+        help="Rules saved by 'tarmac diff -o rules.json'",
+        show_default=False,
+    ),
+    data: Path = typer.Argument(
+        ...,
+        help="Rows to label (CSV/Parquet/Feather/NPY/NPZ)",
+        show_default=False,
+    ),
+    output: Optional[Path] = typer.Option(
+        None,
+        "--output",
+        "-o",
+        help="Save the rule ID of every row (0 when no rule matches):\n"
+        "- '.npy': NumPy array\n"
+        "- '.csv' / '.parquet': One 'rule_id' column",
+    ),
+    chunk_size: Optional[int] = typer.Option(
+        None,
+        "--chunk-size",
+        "-c",
+        min=1,
+        help="Read the data this many rows at a time instead of all at once",
+    ),
+):
+    """Flag the rows that fall into a region where the models differ.
+
+    Every row is labelled with the 1-based ID of the first rule it matches,
+    in the order of the rules file.
+
+    Examples:
+        $ tarmac diff model_a.pkl model_b.pkl -o rules.json
+        $ tarmac apply rules.json traffic.parquet -o flagged.npy
+    """
+    import numpy as np
+    import pandas as pd
+    from .data import iter_table, load_table
+    from .rules import RuleSet
+
+    rule_set = RuleSet.from_json(rules)
+    if rule_set.positional:
+        # unnamed features are column positions, read every column
+        columns = feature_names = None
+    elif data.suffix.lower() in {".npy", ".npz"}:
+        raise typer.BadParameter(
+            "The rules use named features, which .npy/.npz data cannot provide"
+        )
+    else:
+        columns = feature_names = rule_set.features
+
+    if chunk_size:
+        labels = np.concatenate(
+            [
+                rule_set.apply(chunk, feature_names)
+                for chunk in iter_table(data, chunk_size, columns)
+            ]
+            or [np.zeros(0, dtype=np.int32)]
+        )
+    else:
+        labels = rule_set.apply(load_table(data, columns), feature_names)
+
+    counts = rule_set.counts(labels)
+    table = Table(title=f"{len(labels)} rows, {len(labels) - counts[0]} flagged")
+    table.add_column("Rule", justify="right")
+    table.add_column("Rows", justify="right")
+    table.add_column("Share", justify="right")
+    for rule_id, count in enumerate(counts):
+        if count:
+            share = f"{count / len(labels):.1%}"
+            table.add_row(str(rule_id) if rule_id else "none", str(count), share)
+    console.print(table)
+
+    if output:
+        ext = output.suffix.lower()
+        if ext == ".npy":
+            np.save(output, labels)
+        elif ext == ".csv":
+            pd.DataFrame({"rule_id": labels}).to_csv(output, index=False)
+        elif ext in {".parquet", ".pq"}:
+            pd.DataFrame({"rule_id": labels}).to_parquet(output, index=False)
         else:
-            raise typer.BadParameter("Output file must have .json or .txt extension")
+            raise typer.BadParameter(
+                "Output file must have .npy, .csv or .parquet extension"
+            )
+
+
+@app.command()
+def serve(
+    host: str = typer.Option("127.0.0.1", "--host", help="Interface to listen on"),
+    port: int = typer.Option(8765, "--port", "-p", help="Port to listen on"),
+    preload: Optional[list[Path]] = typer.Option(
+        None, "--preload", help="Models to load before the first request"
+    ),
+    model_dir: Optional[Path] = typer.Option(
+        None,
+        "--model-dir",
+        help="Also serve the models under this directory. Requests naming "
+        "any other model than --preload ones are rejected",
+    ),
+    data_dir: Optional[Path] = typer.Option(
+        None,
+        "--data-dir",
+        help="Directory /diff may read Xa/ya/Xb/yb from. Without it, /diff "
+        "only takes rows or the built-in datasets",
+    ),
+    max_models: int = typer.Option(
+        8, "--max-models", min=2, help="Loaded models kept in memory"
+    ),
+    max_batch: int = typer.Option(
+        4096,
+        "--max-batch",
+        min=1,
+        help="Rows of concurrent /disagree requests scored in one predict call",
+    ),
+    max_delay_ms: float = typer.Option(
+        5.0,
+        "--max-delay-ms",
+        min=0,
+        help="How long a /disagree request waits for others to batch with",
+    ),
+    cache_dir: Optional[Path] = typer.Option(
+        None,
+        "--cache-dir",
+        envvar="TARMAC_CACHE_DIR",
+        help="Directory of cached predictions reused by /diff",
+    ),
+    model_cache_dir: Optional[Path] = _model_cache_dir_option,
+):
+    """Serve diffs over HTTP from models kept loaded in memory.
+
+    POST /diff takes the options of 'tarmac diff' as JSON and returns its
+    rules. POST /disagree tells whether the models disagree on given rows.
+    Only the --preload models and the models under --model-dir are served.
+
+    Examples:
+        $ tarmac serve --preload baseline.pkl --model-dir models/ --port 8765
+        $ curl -X POST localhost:8765/diff \\
+            -d '{"model_a": "baseline.pkl", "model_b": "candidate.pkl"}'
+    """
+    from .adapters import PredictionCache
+    from .serve import AdapterPool, create_app
+
+    pool = AdapterPool(max_models, model_cache_dir)
+    for path in preload or []:
+        pool.get(path)
+    cache = PredictionCache(cache_dir) if cache_dir else None
+    server = create_app(
+        pool, max_batch, max_delay_ms / 1000, cache, model_dir, data_dir
+    )
+    console.print(f"[bold green]Serving {len(pool.paths())} models on {host}:{port}[/]")
+    server.run(host=host, port=port, threaded=True)
 
 
 if __name__ == "__main__":
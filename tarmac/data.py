@@ -1,54 +1,742 @@
+import glob
+import sys
 from pathlib import Path
 import numpy as np
 import pandas as pd
 
-from sklearn import datasets
 
+def is_sparse(X) -> bool:
+    """Whether X is a scipy.sparse matrix, without importing scipy."""
+    sparse = sys.modules.get("scipy.sparse")
+    return sparse is not None and sparse.issparse(X)
 
-def load_table(path: Path, feature_columns: list = None) -> np.ndarray:
+
+def load_table(
+    path: Path, feature_columns: list = None, dtype=None, member: str = None
+) -> np.ndarray:
+    """Load a feature or target table, reading as little of it as possible.
+
+    .npy files are memory-mapped and .npz members are decompressed one at a
+    time. CSV, Parquet and Feather files only read the requested columns.
+    Sparse matrices saved with scipy.sparse.save_npz are returned as CSR,
+    never densified. A directory or glob pattern loads every shard it
+    matches (see expand_paths) and stacks them.
+
+    Args:
+        path: CSV, Parquet, Feather, NPY or NPZ file, or a directory or glob
+            pattern of such files
+        feature_columns: Columns to keep. Names are looked up in the file's
+            header; integers select positions. For arrays without a header,
+            names keep the first len(feature_columns) columns.
+        dtype: Optional dtype the values are parsed or cast to
+        member: Array to read from a .npz archive (defaults to 'X', or the
+            only member)
+    """
+    shards = expand_paths(path)
+    if len(shards) > 1:
+        return stack_rows(
+            [load_table(p, feature_columns, dtype, member) for p in shards]
+        )
+    path = shards[0]
+    ext = path.suffix.lower()
+    if ext in _FRAME_FORMATS:
+        return _read_frame(path, feature_columns, dtype).values
+    elif ext == ".npy":
+        data = np.load(path, mmap_mode="r")
+        return _select_columns(data, feature_columns, dtype)
+    elif ext == ".npz":
+        with np.load(path) as archive:
+            if member is None and {"format", "indptr"} <= set(archive.files):
+                from scipy import sparse
+
+                data = sparse.load_npz(path).tocsr()
+            else:
+                data = archive[_npz_member(archive, member)]
+        return _select_columns(data, feature_columns, dtype)
+    else:
+        raise ValueError(f"Unsupported data format: {ext}")
+
+
+_FRAME_FORMATS = {".csv", ".parquet", ".pq", ".feather"}
+_DATA_FORMATS = _FRAME_FORMATS | {".npy", ".npz"}
+
+
+def expand_paths(path) -> list:
+    """The files a data path stands for, in sorted order.
+
+    A directory stands for the data files (CSV, Parquet, Feather, NPY, NPZ)
+    directly inside it, and a path with glob characters (*, ?, [) for the
+    files it matches. Any other path stands for itself.
+    """
+    path = Path(path)
+    if path.is_dir():
+        paths = [
+            p
+            for p in path.iterdir()
+            if p.is_file()
+            and not p.name.startswith(".")
+            and p.suffix.lower() in _DATA_FORMATS
+        ]
+    elif glob.has_magic(str(path)):
+        paths = [Path(p) for p in glob.glob(str(path)) if Path(p).is_file()]
+    else:
+        return [path]
+    if not paths:
+        raise ValueError(f"No data files found at {path}")
+    return sorted(paths)
+
+
+def _read_frame(path: Path, feature_columns: list = None, dtype=None):
+    """Read the feature_columns of a CSV, Parquet or Feather file, in that order."""
     ext = path.suffix.lower()
+    columns = feature_columns or None
     if ext == ".csv":
-        df = pd.read_csv(path)
-        if feature_columns:
-            df = df[feature_columns]
-        return df.values
-    elif ext in {".npy", ".npz"}:
-        data = np.load(path)
-        if feature_columns and len(feature_columns) < data.shape[1]:
+        df = pd.read_csv(path, usecols=columns, dtype=dtype)
+    elif ext in {".parquet", ".pq"}:
+        df = pd.read_parquet(path, columns=columns)
+    else:
+        df = pd.read_feather(path, columns=columns)
+    df = _order_columns(df, feature_columns)
+    return df if dtype is None or ext == ".csv" else df.astype(dtype, copy=False)
+
+
+def load_dataset(path: Path, feature_columns: list = None):
+    """Load features keeping their names and a compact dtype per column.
+
+    CSV, Parquet and Feather files give a Dataset (see Dataset.from_frame).
+    .npy and .npz arrays already have one compact dtype, so they are
+    returned as load_table gives them: memory-mapped or sparse. The shards
+    of a directory or glob pattern are loaded one by one and stacked.
+    """
+    shards = expand_paths(path)
+    if len(shards) > 1:
+        return stack_rows([load_dataset(p, feature_columns) for p in shards])
+    path = shards[0]
+    if path.suffix.lower() in _FRAME_FORMATS:
+        return Dataset.from_frame(_read_frame(path, feature_columns))
+    return load_table(path, feature_columns)
+
+
+def _is_positional(feature_columns):
+    return all(isinstance(c, (int, np.integer)) for c in feature_columns)
+
+
+def _order_columns(df, feature_columns=None):
+    """Readers return the requested columns in file order: restore ours."""
+    if feature_columns and _is_positional(feature_columns):
+        rank = {c: i for i, c in enumerate(sorted(set(feature_columns)))}
+        return df.iloc[:, [rank[c] for c in feature_columns]]
+    if feature_columns:
+        return df[feature_columns]
+    return df
+
+
+def _npz_member(archive, member=None):
+    if member is not None:
+        return member
+    if "X" in archive.files:
+        return "X"
+    if len(archive.files) == 1:
+        return archive.files[0]
+    raise ValueError(
+        f"Ambiguous .npz archive with members {archive.files}: pick one explicitly"
+    )
+
+
+def _select_columns(data, feature_columns=None, dtype=None):
+    if feature_columns and data.ndim == 2:
+        if _is_positional(feature_columns):
+            data = data[:, feature_columns]
+        elif len(feature_columns) < data.shape[1]:
             data = data[:, : len(feature_columns)]
-        return data
+    return data if dtype is None else data.astype(dtype, copy=False)
+
+
+class Dataset:
+    """Feature table stored column by column, each in a compact dtype.
+
+    Integer columns use the smallest integer type holding their range,
+    float64 columns become float32 when that loses nothing, and text or
+    categorical columns are kept as pandas category codes (usually int8).
+    Row selection gives a Dataset whose columns are views (for slices) of
+    these arrays, and to_frame() hands them to models and explainers
+    without copying, along with the feature names.
+
+    Attributes:
+        columns: dict mapping each feature name to a 1D array
+        categories: dict mapping the names of categorical columns to their
+            categories (the arrays in columns are then codes, -1 for missing)
+    """
+
+    def __init__(self, columns: dict, categories: dict = None):
+        self.columns = dict(columns)
+        self.categories = dict(categories or {})
+        lengths = {len(values) for values in self.columns.values()}
+        if len(lengths) > 1:
+            raise ValueError("Dataset columns must all have the same length")
+        self._n_rows = lengths.pop() if lengths else 0
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "Dataset":
+        columns, categories = {}, {}
+        for name in df.columns:
+            values, categories_ = _compact(df[name])
+            columns[name] = values
+            if categories_ is not None:
+                categories[name] = categories_
+        return cls(columns, categories)
+
+    @property
+    def feature_names(self) -> list:
+        return list(self.columns)
+
+    @property
+    def shape(self) -> tuple:
+        return (self._n_rows, len(self.columns))
+
+    @property
+    def nbytes(self) -> int:
+        return sum(values.nbytes for values in self.columns.values())
+
+    def __len__(self):
+        return self._n_rows
+
+    def __getitem__(self, rows) -> "Dataset":
+        """Rows selected by a slice, integer indices or a boolean mask."""
+        if isinstance(rows, (int, np.integer)):
+            rows = slice(rows, rows + 1 or None)
+        return Dataset(
+            {name: values[rows] for name, values in self.columns.items()},
+            self.categories,
+        )
+
+    def to_frame(self, codes: bool = False) -> pd.DataFrame:
+        """DataFrame over the columns, without copying them.
+
+        Categorical columns are pandas Categoricals, or their integer codes
+        with codes=True (what the explainers split on).
+        """
+        frame = {}
+        for name, values in self.columns.items():
+            if name in self.categories and not codes:
+                values = pd.Categorical.from_codes(
+                    values, self.categories[name], validate=False
+                )
+            frame[name] = values
+        return pd.DataFrame(frame, copy=False)
+
+    def to_numpy(self, dtype=None) -> np.ndarray:
+        """One 2D array, as df.values would give (categories decoded)."""
+        arrays = [self._decoded(name) for name in self.columns]
+        if dtype is None:
+            dtype = np.result_type(*arrays) if arrays else np.float64
+        out = np.empty(self.shape, dtype=dtype)
+        for j, values in enumerate(arrays):
+            out[:, j] = values
+        return out
+
+    def __array__(self, dtype=None, copy=None):
+        return self.to_numpy(dtype)
+
+    def _decoded(self, name):
+        values = self.columns[name]
+        if name not in self.categories:
+            return values
+        # code -1 (missing) picks the NaN appended last
+        return np.append(np.asarray(self.categories[name], dtype=object), np.nan)[
+            values
+        ]
+
+    def _categorical(self, name):
+        if name in self.categories:
+            return self.columns[name], self.categories[name]
+        categorical = pd.Categorical(self.columns[name])
+        return categorical.codes, categorical.categories
+
+    @classmethod
+    def concat(cls, datasets: list) -> "Dataset":
+        """Stack datasets with the same columns, merging their categories."""
+        columns, categories = {}, {}
+        for name in datasets[0].columns:
+            if not any(name in d.categories for d in datasets):
+                columns[name] = np.concatenate([d.columns[name] for d in datasets])
+                continue
+            parts = [d._categorical(name) for d in datasets]
+            merged = parts[0][1]
+            for _, categories_ in parts[1:]:
+                merged = merged.union(categories_, sort=False)
+            dtype = _code_dtype(len(merged))
+            columns[name] = np.concatenate(
+                [
+                    np.append(merged.get_indexer(categories_), -1)[codes].astype(dtype)
+                    for codes, categories_ in parts
+                ]
+            )
+            categories[name] = merged
+        return cls(columns, categories)
+
+
+_SMALL_INTS = (np.int8, np.int16, np.int32)
+
+
+def _code_dtype(n_categories):
+    for dtype in _SMALL_INTS:
+        if n_categories < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def _compact(series: pd.Series):
+    """Compact values of a column, and its categories if it is categorical."""
+    kind = series.dtype.kind
+    if kind == "b":
+        return series.to_numpy(dtype=bool), None
+    if kind in "iu":
+        values = series.to_numpy()
+        if len(values):
+            low, high = values.min(), values.max()
+            for dtype in _SMALL_INTS:
+                info = np.iinfo(dtype)
+                if info.min <= low and high <= info.max:
+                    return values.astype(dtype), None
+        return values, None
+    if kind == "f":
+        values = series.to_numpy()
+        if values.dtype == np.float64:
+            # models score float64: only cast when no value changes
+            single = values.astype(np.float32)
+            if np.array_equal(single, values, equal_nan=True):
+                return single, None
+        return values, None
+    if kind in "OUS" or isinstance(series.dtype, pd.CategoricalDtype):
+        categorical = pd.Categorical(series)
+        return categorical.codes, categorical.categories
+    return series.to_numpy(), None
+
+
+def _as_datasets(parts: list) -> list:
+    """Wrap the arrays among parts as Datasets with the first Dataset's columns.
+
+    Wrapped columns take the dtype of the Dataset's column when no value
+    changes, so equal rows hash to equal keys (see hash_rows).
+    """
+    reference = next(part for part in parts if isinstance(part, Dataset))
+    names = reference.feature_names
+    wrapped = []
+    for part in parts:
+        if isinstance(part, Dataset):
+            wrapped.append(part)
+            continue
+        values = part.toarray() if is_sparse(part) else np.asarray(part)
+        if values.ndim != 2 or values.shape[1] != len(names):
+            raise ValueError(
+                f"Cannot combine a table of columns {names} with an array of "
+                f"shape {values.shape}"
+            )
+        part = Dataset.from_frame(pd.DataFrame(values, columns=names))
+        for name in names:
+            target = reference.columns[name].dtype
+            column = part.columns[name]
+            if name in reference.categories or name in part.categories:
+                continue
+            if column.dtype != target:
+                with np.errstate(invalid="ignore", over="ignore"):
+                    cast = column.astype(target)
+                if np.array_equal(cast, column):
+                    part.columns[name] = cast
+        wrapped.append(part)
+    return wrapped
+
+
+def stack_rows(parts: list):
+    """Stack arrays, sparse matrices or Datasets holding the same columns."""
+    if any(isinstance(part, Dataset) for part in parts):
+        return Dataset.concat(_as_datasets(parts))
+    if any(is_sparse(part) for part in parts):
+        from scipy import sparse
+
+        return sparse.vstack(parts, format="csr")
+    return np.concatenate([np.asarray(part) for part in parts])
+
+
+def numeric_view(X):
+    """X as the explainers take it: Datasets become a frame of codes.
+
+    The categories of every coded column are kept in the frame's
+    attrs["categories"], so explainers can describe rules on codes by the
+    categories they select.
+    """
+    if not isinstance(X, Dataset):
+        return X
+    frame = X.to_frame(codes=True)
+    frame.attrs["categories"] = {
+        name: categories.tolist() for name, categories in X.categories.items()
+    }
+    return frame
+
+
+def numeric_chunk(X, categories: dict):
+    """numeric_view of one chunk of a stream, with codes valid for every chunk.
+
+    Each chunk's Dataset codes its categories on its own. categories maps
+    every coded column to the categories met so far, in order of first
+    appearance; it is extended in place and the chunk is recoded to it.
+    """
+    if not isinstance(X, Dataset):
+        return X
+    frame = X.to_frame(codes=True)
+    for name, chunk_categories in X.categories.items():
+        known = categories.setdefault(name, [])
+        index = {category: code for code, category in enumerate(known)}
+        for category in chunk_categories.tolist():
+            if category not in index:
+                index[category] = len(known)
+                known.append(category)
+        codes = [index[category] for category in chunk_categories.tolist()]
+        frame[name] = np.array(codes + [-1], dtype=np.int64)[X.columns[name]]
+    frame.attrs["categories"] = categories
+    return frame
+
+
+def iter_chunks(X, chunk_size: int):
+    """Yield successive row slices of X holding at most chunk_size rows."""
+    for start in range(0, X.shape[0], chunk_size):
+        yield X[start : start + chunk_size]
+
+
+def iter_table(path: Path, chunk_size: int, feature_columns: list = None, dtype=None):
+    """Read a table chunk by chunk instead of loading it whole.
+
+    CSV files are parsed chunk_size rows at a time, Parquet files one record
+    batch at a time and .npy files are memory-mapped, so only the current
+    chunk is ever materialised. CSV and Parquet chunks are Datasets, as
+    load_dataset gives (arrays of that dtype when one is given). The shards
+    of a directory or glob pattern are read one after the other.
+    """
+    shards = expand_paths(path)
+    if len(shards) > 1:
+        for shard in shards:
+            yield from iter_table(shard, chunk_size, feature_columns, dtype)
+        return
+    path = shards[0]
+    ext = path.suffix.lower()
+    if ext == ".csv":
+        reader = pd.read_csv(
+            path, usecols=feature_columns or None, dtype=dtype, chunksize=chunk_size
+        )
+        for df in reader:
+            df = _order_columns(df, feature_columns)
+            yield Dataset.from_frame(df) if dtype is None else df.values
+    elif ext in {".parquet", ".pq"}:
+        import pyarrow.parquet as pq
+
+        batches = pq.ParquetFile(path).iter_batches(
+            batch_size=chunk_size, columns=feature_columns or None
+        )
+        for batch in batches:
+            df = _order_columns(batch.to_pandas(), feature_columns)
+            if dtype is None:
+                yield Dataset.from_frame(df)
+            else:
+                yield df.values.astype(dtype, copy=False)
     else:
-        raise ValueError(f"Unsupported data format: {ext}")
+        yield from iter_chunks(load_table(path, feature_columns, dtype), chunk_size)
+
+
+_HASH_SEEDS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F)
+_HASH_KEYS = ("tarmac-rows-key0", "tarmac-rows-key1")
+_HASH_PRIME = np.uint64(0x100000001B3)
+_KEY128 = np.dtype("S16")
+
+
+def _mix64(h):
+    # splitmix64 finaliser
+    h = (h ^ (h >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    h = (h ^ (h >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return h ^ (h >> np.uint64(31))
+
+
+def hash_rows(X, bits: int = 128) -> np.ndarray:
+    """Hash the contents of each row into a 64 or 128-bit key.
+
+    Numeric rows are hashed from their bytes, after mapping -0.0 to 0.0 and
+    every NaN to one bit pattern so equal rows always get equal keys.
+    Dataset rows are hashed from one 64-bit word per value: the float64 bits
+    of numbers float64 holds exactly, a hash of the value for larger
+    integers and for categories. Equal rows therefore get equal keys
+    whatever dtype each file, chunk or shard was compacted to, and numeric
+    rows match a plain float64 array of the same values. Object rows
+    (mixed-type CSVs) are hashed value by value through pandas. Rows of sparse
+    matrices are hashed from their non-zero (column, value) pairs, so
+    the cost is proportional to the non-zeros and explicitly stored zeros
+    do not matter.
+
+    Returns:
+        A 1D uint64 array for 64-bit keys, or a 1D array of 16-byte strings
+        for 128-bit keys. Both sort and compare like scalars.
+    """
+    if bits not in (64, 128):
+        raise ValueError(f"Row keys must be 64 or 128 bits, got {bits}")
+    if is_sparse(X):
+        keys = _hash_sparse_rows(X, bits // 64)
+        return keys[:, 0] if bits == 64 else keys.view(_KEY128).ravel()
+    if isinstance(X, Dataset):
+        keys = _hash_dataset_rows(X, bits // 64)
+        return keys[:, 0] if bits == 64 else keys.view(_KEY128).ravel()
+    X = np.asarray(X)
+    if X.ndim == 1:
+        X = X[:, None]
+    n_keys = bits // 64
+    keys = np.empty((X.shape[0], n_keys), dtype=np.uint64)
+
+    if X.dtype.hasobject:
+        frame = pd.DataFrame(X)
+        for k in range(n_keys):
+            keys[:, k] = pd.util.hash_pandas_object(
+                frame, index=False, hash_key=_HASH_KEYS[k]
+            ).to_numpy()
+    else:
+        if X.dtype.kind in "fc":
+            X = np.where(np.isnan(X), np.nan, X + 0.0)
+        row_bytes = np.ascontiguousarray(X).view(np.uint8).reshape(X.shape[0], -1)
+        pad = -row_bytes.shape[1] % 8
+        if pad:
+            row_bytes = np.pad(row_bytes, ((0, 0), (0, pad)))
+        keys = _hash_words(row_bytes.view(np.uint64), n_keys)
+
+    return keys[:, 0] if n_keys == 1 else keys.view(_KEY128).ravel()
+
+
+def _hash_words(words, n_keys):
+    keys = np.empty((words.shape[0], n_keys), dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for k in range(n_keys):
+            h = np.full(words.shape[0], _HASH_SEEDS[k] ^ words.shape[1], np.uint64)
+            for j in range(words.shape[1]):
+                h = (h ^ words[:, j]) * _HASH_PRIME
+                h ^= h >> np.uint64(29)
+            keys[:, k] = _mix64(h)
+    return keys
+
+
+def _value_words(values, categories=None):
+    """One 64-bit word per value, the same whatever dtype holds the value."""
+    if categories is not None:
+        # categories hash by value: files number them differently
+        words = pd.util.hash_array(
+            np.asarray(categories, dtype=object), hash_key=_HASH_KEYS[0]
+        )
+        words = np.append(words, np.float64(np.nan).view(np.uint64))
+        return words[values]  # code -1 (missing) takes the NaN word
+    floats = values.astype(np.float64)
+    if values.dtype.kind in "iu" and values.dtype.itemsize == 8:
+        # only some 64-bit integers are exact floats: hash the others apart
+        bound = 2.0**63 if values.dtype.kind == "i" else 2.0**64
+        fits = (floats < bound) & (floats >= -bound)
+        exact = fits & (np.where(fits, floats, 0).astype(values.dtype) == values)
+        if not exact.all():
+            with np.errstate(over="ignore"):
+                other = _mix64(values.view(np.uint64) ^ np.uint64(_HASH_SEEDS[1]))
+            words = np.where(np.isnan(floats), np.nan, floats + 0.0).view(np.uint64)
+            return np.where(exact, words, other)
+    return np.where(np.isnan(floats), np.nan, floats + 0.0).view(np.uint64)
+
+
+def _hash_dataset_rows(X, n_keys):
+    words = np.empty(X.shape, dtype=np.uint64)
+    for j, (name, values) in enumerate(X.columns.items()):
+        words[:, j] = _value_words(values, X.categories.get(name))
+    return _hash_words(words, n_keys)
+
+
+def _hash_sparse_rows(X, n_keys):
+    X = X.tocsr(copy=True)
+    X.sum_duplicates()
+    X.eliminate_zeros()  # also drops -0.0
+    values = X.data.astype(np.float64)
+    values[np.isnan(values)] = np.nan
+    values = values.view(np.uint64)
+    columns = X.indices.astype(np.uint64)
+    nnz = np.diff(X.indptr).astype(np.uint64)
+
+    keys = np.empty((X.shape[0], n_keys), dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for k in range(n_keys):
+            seed = np.uint64(_HASH_SEEDS[k])
+            # rows sum the hashes of their entries, wrapping around 2**64
+            entries = _mix64(_mix64(columns ^ seed) ^ values)
+            sums = np.concatenate([[np.uint64(0)], np.cumsum(entries)])
+            row = sums[X.indptr[1:]] - sums[X.indptr[:-1]]
+            keys[:, k] = _mix64((row ^ seed) * _HASH_PRIME ^ nnz)
+    return keys
+
+
+class RowDeduplicator:
+    """Keep the first occurrence of every distinct row across many chunks.
+
+    Rows are reduced to hash keys, so memory grows with 8 or 16 bytes per
+    distinct row whatever the number of features. Seen keys are held in a
+    few sorted runs that are merged as they grow, which keeps each update
+    O(chunk log n) instead of re-sorting everything seen so far.
+    """
+
+    def __init__(self, bits: int = 128):
+        self.bits = bits
+        self._runs = []
+
+    def update(self, X) -> np.ndarray:
+        """Return a boolean mask of the rows of X that were not seen before."""
+        return self.update_keys(hash_rows(X, self.bits))
+
+    def update_keys(self, keys) -> np.ndarray:
+        """Same as update, for rows already hashed with hash_rows(X, bits)."""
+        unique_keys, first = np.unique(keys, return_index=True)
+
+        new = np.ones(len(unique_keys), dtype=bool)
+        for run in self._runs:
+            pos = np.searchsorted(run, unique_keys).clip(max=len(run) - 1)
+            new &= run[pos] != unique_keys
+
+        mask = np.zeros(len(keys), dtype=bool)
+        mask[first[new]] = True
+        self._add_run(unique_keys[new])
+        return mask
+
+    def _add_run(self, run):
+        if not len(run):
+            return
+        self._runs.append(run)
+        while len(self._runs) > 1 and 2 * len(self._runs[-1]) >= len(self._runs[-2]):
+            merged = np.concatenate([self._runs.pop(), self._runs.pop()])
+            merged.sort()
+            self._runs.append(merged)
+
+
+def iter_unique(chunks, bits: int = 128):
+    """Drop rows already seen earlier in a stream of chunks."""
+    dedup = RowDeduplicator(bits)
+    for chunk in chunks:
+        yield chunk[dedup.update(chunk)]
+
+
+def iter_union(tables, source: list = None, bits: int = 128):
+    """Drop rows already seen, over the chunks of several tables in turn.
+
+    Args:
+        tables: One iterable of chunks per input table
+        source: Optional list that gets, for every yielded chunk, the
+            row_source array of its rows
+        bits: Row key size (see hash_rows)
+    """
+    dedup = RowDeduplicator(bits)
+    for number, chunks in enumerate(tables):
+        offset = 0
+        for chunk in chunks:
+            keep = dedup.update(chunk)
+            if source is not None:
+                source.append(row_source([keep], [number], [offset]))
+            offset += chunk.shape[0]
+            yield chunk[keep]
+
+
+def row_source(masks, inputs=None, offsets=None) -> np.ndarray:
+    """Where the rows kept by some masks come from.
+
+    Args:
+        masks: Boolean masks of the rows kept from each input
+        inputs: Number of each input (0, 1, ... by default)
+        offsets: Row of each input its mask starts at (0 by default)
+
+    Returns:
+        An (n, 2) int64 array holding the input number and the row within
+        that input of every kept row, in the order the rows are kept
+    """
+    inputs = range(len(masks)) if inputs is None else inputs
+    offsets = [0] * len(masks) if offsets is None else offsets
+    parts = [
+        np.column_stack(
+            [np.full(int(mask.sum()), number), np.flatnonzero(mask) + offset]
+        )
+        for mask, number, offset in zip(masks, inputs, offsets)
+    ]
+    return (
+        np.concatenate(parts).astype(np.int64) if parts else np.zeros((0, 2), np.int64)
+    )
 
 
 def union_datasets(
-    X_a: np.ndarray, X_b: np.ndarray, y_a: np.ndarray = None, y_b: np.ndarray = None
+    X_a: np.ndarray,
+    X_b: np.ndarray,
+    y_a: np.ndarray = None,
+    y_b: np.ndarray = None,
+    chunk_size: int = 1 << 16,
+    return_source: bool = False,
 ) -> tuple:
     """Union of two datasets, maintaining correspondence between X and y.
 
+    Duplicate rows are found by hashing each row chunk by chunk, and the
+    first occurrence of every row is kept in its original order. Only the
+    kept rows are copied into the result. Arrays of different dtypes are
+    hashed and stacked in their common dtype, so 1 and 1.0 are one row.
+
     Args:
         X_a: Features from dataset A
         X_b: Features from dataset B
         y_a: Optional targets from dataset A
         y_b: Optional targets from dataset B
+        chunk_size: Rows hashed at a time
+        return_source: Also return the row_source of the union's rows
+            (input 0 for A, 1 for B)
 
     Returns:
         If y_a and y_b are provided: tuple(X_union, y_union)
         If only X_a and X_b are provided: X_union
+        With return_source, the source array is appended: tuple(X_union,
+        source) or tuple(X_union, y_union, source)
     """
-    X_combined = np.vstack([X_a, X_b])
+    dtype = None
+    if isinstance(X_a, Dataset) or isinstance(X_b, Dataset):
+        X_a, X_b = _as_datasets([X_a, X_b])
+    elif not (is_sparse(X_a) or is_sparse(X_b)):
+        dtype = np.result_type(X_a, X_b)
+    dedup = RowDeduplicator()
+    keep_a = _first_occurrences(dedup, X_a, chunk_size, dtype)
+    keep_b = _first_occurrences(dedup, X_b, chunk_size, dtype)
 
-    uniq_idx = np.unique(X_combined, axis=0, return_index=True)[1]
-    uniq_idx.sort()
+    result = [_take_rows([X_a, X_b], [keep_a, keep_b])]
+    if y_a is not None and y_b is not None:
+        result.append(_take_rows([np.asarray(y_a), np.asarray(y_b)], [keep_a, keep_b]))
+    if return_source:
+        result.append(row_source([keep_a, keep_b]))
+    return result[0] if len(result) == 1 else tuple(result)
 
-    X_union = X_combined[uniq_idx]
 
-    if y_a is not None and y_b is not None:
-        y_combined = np.concatenate([y_a, y_b])
-        y_union = y_combined[uniq_idx]
-        return X_union, y_union
+def _first_occurrences(dedup, X, chunk_size, dtype=None):
+    masks = [
+        dedup.update(chunk if dtype is None else chunk.astype(dtype, copy=False))
+        for chunk in iter_chunks(X, chunk_size)
+    ]
+    return np.concatenate(masks) if masks else np.zeros(0, dtype=bool)
+
 
-    return X_union
+def _take_rows(arrays, masks):
+    """Concatenate the masked rows of several arrays with a single copy."""
+    if any(isinstance(array, Dataset) for array in arrays):
+        arrays = _as_datasets(arrays)
+        return Dataset.concat([array[mask] for array, mask in zip(arrays, masks)])
+    if any(is_sparse(array) for array in arrays):
+        from scipy import sparse
+
+        parts = [sparse.csr_matrix(array)[mask] for array, mask in zip(arrays, masks)]
+        return sparse.vstack(parts, format="csr")
+    counts = [int(mask.sum()) for mask in masks]
+    shape = (sum(counts),) + arrays[0].shape[1:]
+    out = np.empty(shape, dtype=np.result_type(*arrays))
+    start = 0
+    for array, mask, count in zip(arrays, masks, counts):
+        out[start : start + count] = array[mask]
+        start += count
+    return out
 
 
 def sample_datasets(
@@ -57,20 +745,218 @@ def sample_datasets(
     strategy: str = "union",
     size: int = None,
     seed: int = 0,
+    score=None,
 ) -> np.ndarray:
-    X = union_datasets(a, b) if strategy == "union" else np.vstack([a, b])
+    """Build the comparison data from two datasets.
+
+    Strategies are 'union', 'full' (stacked), 'random' (uniform subsample
+    of size rows) and 'adaptive', which spends a budget of size scored rows
+    where the models are likely to disagree (see adaptive_sample, score is
+    required). 'adaptive' returns tuple(X, weights).
+    """
+    if strategy in ("union", "adaptive"):
+        X = union_datasets(a, b)
+    else:
+        X = stack_rows([a, b])
     if strategy == "random":
         rng = np.random.default_rng(seed)
-        n = min(size or len(X), len(X))
-        idx = rng.choice(len(X), size=n, replace=False)
+        n = min(size or X.shape[0], X.shape[0])
+        idx = rng.choice(X.shape[0], size=n, replace=False)
         return X[idx]
+    if strategy == "adaptive":
+        idx, weights = adaptive_sample(X, score, size or X.shape[0], seed=seed)
+        return X[idx], weights
     return X  # for "union" or "full"
 
 
+def adaptive_sample(
+    X,
+    score,
+    budget: int,
+    seed_fraction: float = 0.2,
+    floor: float = 0.1,
+    seed: int = 0,
+    chunk_size: int = 1 << 16,
+) -> tuple:
+    """Pick rows likely to show disagreement, under a budget of scored rows.
+
+    A uniform seed sample is scored first and a shallow tree is fitted on it
+    as a cheap proxy for where the models disagree. The rest of the budget
+    is drawn from the remaining rows with probability proportional to the
+    proxy's disagreement estimate, mixed with a uniform floor so every row
+    keeps a chance. Seed rows get weight 1 and the others the inverse of
+    their (budget-scaled) sampling probability, so weighted statistics
+    estimate the whole pool. Weights are rescaled to average 1.
+
+    Args:
+        X: Pool of candidate rows
+        score: Callable mapping rows to 0/1 disagreement labels. It is called
+            on the seed rows, then on the other selected rows, in the order
+            of the returned indices.
+        budget: Total number of rows to score
+        seed_fraction: Share of the budget spent on the uniform seed sample
+        floor: Share of the sampling probability spread uniformly
+        seed: Random seed
+        chunk_size: Rows scored by the proxy at a time
+
+    Returns:
+        tuple(indices, weights)
+    """
+    from sklearn.tree import DecisionTreeClassifier
+
+    rng = np.random.default_rng(seed)
+    n = X.shape[0]
+    budget = min(budget, n)
+    n_seed = min(budget, max(1, int(round(seed_fraction * budget))))
+    order = rng.permutation(n)
+    seed_idx, rest = order[:n_seed], order[n_seed:]
+
+    seed_delta = np.asarray(score(X[seed_idx]))
+    n_draw = budget - n_seed
+    if n_draw == 0:
+        return seed_idx, np.ones(n_seed)
+
+    if len(np.unique(seed_delta)) < 2:
+        proba = np.ones(len(rest))
+    else:
+        proxy = DecisionTreeClassifier(
+            max_depth=6, min_samples_leaf=max(1, n_seed // 50), random_state=seed
+        ).fit(numeric_view(X[seed_idx]), seed_delta)
+        proba = np.concatenate(
+            [
+                proxy.predict_proba(numeric_view(X[rest[start : start + chunk_size]]))[
+                    :, 1
+                ]
+                for start in range(0, len(rest), chunk_size)
+            ]
+        )
+
+    total = proba.sum()
+    q = np.full(len(rest), 1.0 / len(rest))
+    if total > 0:
+        q = (1 - floor) * proba / total + floor * q
+    picked = rng.choice(len(rest), size=n_draw, replace=False, p=q)
+    score(X[rest[picked]])
+
+    weights = np.concatenate([np.ones(n_seed), 1.0 / (n_draw * q[picked])])
+    weights *= budget / weights.sum()
+    return np.concatenate([seed_idx, rest[picked]]), weights
+
+
 def load_builtin_dataset(name: str) -> tuple[np.ndarray, np.ndarray]:
+    from sklearn import datasets
+
     if name == "iris":
         return datasets.load_iris(return_X_y=True)
     elif name == "diabetes":
         return datasets.load_diabetes(return_X_y=True)
     else:
         raise ValueError(f"Unsupported builtin dataset: {name}")
+
+
+def split_rows(
+    n_rows: int, y=None, split: str = "holdout", test_size: float = 0.4, seed: int = 0
+):
+    """Pick the rows a diff runs on, as indices rather than copies.
+
+    Args:
+        n_rows: Number of rows to pick from
+        y: Targets, needed for the 'stratified' split
+        split: 'holdout' for the test_size fraction train_test_split would
+            hold out, 'full' for every row, 'stratified' for a test_size
+            sample keeping the class proportions of y
+        test_size: Fraction (or number) of rows kept by the sampled splits
+        seed: Random seed of the sampled splits
+
+    Returns:
+        Sorted row indices, or None for every row
+    """
+    from sklearn import model_selection
+
+    if split == "full":
+        return None
+    if split == "holdout":
+        splitter = model_selection.ShuffleSplit(
+            1, test_size=test_size, random_state=seed
+        )
+    elif split == "stratified":
+        if y is None:
+            raise ValueError("A stratified split needs the targets (--ya and --yb)")
+        splitter = model_selection.StratifiedShuffleSplit(
+            1, test_size=test_size, random_state=seed
+        )
+    else:
+        raise ValueError(f"Unknown split: {split}")
+
+    y = np.zeros(n_rows) if y is None else np.asarray(y).ravel()
+    _, rows = next(splitter.split(np.empty((n_rows, 0)), y))
+    return np.sort(rows)
+
+
+def load_eval_data(
+    sampling: str,
+    data: str = "iris",
+    Xa: Path = None,
+    ya: Path = None,
+    Xb: Path = None,
+    yb: Path = None,
+    feature_columns: list = None,
+    profiler=None,
+    split: str = "holdout",
+    test_size: float = 0.4,
+    return_source: bool = False,
+) -> np.ndarray:
+    """Load the comparison data and return the rows models are scored on.
+
+    Only the selected rows are gathered (see split_rows); with the 'full'
+    split the loaded data is returned as is, memory maps included.
+
+    Args:
+        sampling: 'builtin' or 'union'
+        data: Built-in dataset name when sampling is 'builtin'
+        Xa, ya, Xb, yb: Feature and target files, or directories or glob
+            patterns of shards, when sampling is 'union' (targets are only
+            needed for the stratified split)
+        feature_columns: Columns to read from the feature files
+        profiler: Optional Profiler timing the load, union and split stages
+        split: 'holdout', 'full' or 'stratified'
+        test_size: Fraction of rows kept by the holdout and stratified splits
+        return_source: Also return the row_source of the rows (input 0 for
+            the built-in data or --Xa, 1 for --Xb), as tuple(X, source)
+
+    Feature tables (CSV, Parquet, Feather) come back as a Dataset.
+    """
+    from .profiling import NullProfiler
+
+    profiler = profiler or NullProfiler()
+    if sampling == "builtin":
+        with profiler.stage("load") as stage:
+            X, y = load_builtin_dataset(data)
+            stage["rows"] = X.shape[0]
+        source = row_source([np.ones(X.shape[0], dtype=bool)])
+    elif sampling == "union":
+        if not (Xa and Xb) or bool(ya) != bool(yb):
+            raise ValueError(
+                "When using sampling='union', --Xa and --Xb are required, "
+                "and --ya and --yb go together"
+            )
+        y = None
+        with profiler.stage("load") as stage:
+            X_a = load_dataset(Xa, feature_columns)
+            X_b = load_dataset(Xb, feature_columns)
+            y_a, y_b = (load_table(ya), load_table(yb)) if ya else (None, None)
+            stage["rows"] = X_a.shape[0] + X_b.shape[0]
+
+        with profiler.stage("union", rows=X_a.shape[0] + X_b.shape[0]):
+            if ya:
+                X, y, source = union_datasets(X_a, X_b, y_a, y_b, return_source=True)
+            else:
+                X, source = union_datasets(X_a, X_b, return_source=True)
+    else:
+        raise ValueError(f"Unknown sampling strategy: {sampling}")
+
+    with profiler.stage("split", rows=X.shape[0]):
+        rows = split_rows(X.shape[0], y, split, test_size)
+        if rows is not None:
+            X, source = X[rows], source[rows]
+    return (X, source) if return_source else X
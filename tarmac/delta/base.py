@@ -7,10 +7,14 @@ class DeltaBuilder(ABC):
     def build(self, preds_a: np.ndarray, preds_b: np.ndarray, **kw): ...
 
 
-def choose_builder(task: str):
+def choose_builder(task: str, **kw):
     from .classification import ClassificationDelta
     from .regression import RegressionDelta
+    from .soft import JensenShannonDelta, ProbabilityL1Delta
 
-    return {"classification": ClassificationDelta(), "regression": RegressionDelta()}[
-        task
-    ]
+    return {
+        "classification": ClassificationDelta,
+        "regression": RegressionDelta,
+        "l1": ProbabilityL1Delta,
+        "js": JensenShannonDelta,
+    }[task](**kw)
@@ -1,10 +1,54 @@
 import numpy as np
 from .base import DeltaBuilder
+from .sketch import DiffSketch
 
 
 class RegressionDelta(DeltaBuilder):
+    """Label rows where two regressors' predictions differ by more than a threshold.
+
+    An epsilon of 1 or more is an absolute threshold. Below 1, it is a
+    fraction of a scale statistic of |a - b|:
+      - 'max': the largest difference (sensitive to a single outlier)
+      - 'quantile': the q quantile of the differences
+      - 'mad': median + 3 * 1.4826 * MAD, a robust upper range
+
+    The statistic is read from a DiffSketch, so streamed or distributed diffs
+    can sketch their chunks, merge the sketches and label every chunk with
+    the same threshold a single in-memory build would choose. The chosen
+    threshold is kept in threshold_.
+    """
+
+    def __init__(self, scale: str = "max", q: float = 0.99):
+        if scale not in ("max", "quantile", "mad"):
+            raise ValueError(f"Unknown regression threshold scale: {scale}")
+        self.scale = scale
+        self.q = q
+        self.threshold_ = None
+
+    def sketch(self, preds_a, preds_b, sketch: DiffSketch = None) -> DiffSketch:
+        """Add the differences of one chunk to a (new) sketch."""
+        sketch = sketch or DiffSketch()
+        return sketch.update(np.abs(np.asarray(preds_a) - np.asarray(preds_b)))
+
+    def threshold(self, sketch: DiffSketch, epsilon=0.05) -> float:
+        """Absolute threshold for epsilon given the sketch of all differences."""
+        if epsilon >= 1:
+            scale = 1.0
+        elif sketch.count == 0:
+            scale = 1.0
+        elif self.scale == "max":
+            scale = sketch.max
+        elif self.scale == "quantile":
+            scale = sketch.quantile(self.q)
+        else:
+            scale = sketch.quantile(0.5) + 3 * 1.4826 * sketch.mad()
+        self.threshold_ = float(epsilon * scale)
+        return self.threshold_
+
+    def label(self, preds_a, preds_b, threshold: float) -> np.ndarray:
+        diff = np.abs(np.asarray(preds_a) - np.asarray(preds_b))
+        return (diff > threshold).astype(int)
+
     def build(self, preds_a, preds_b, epsilon=0.05, **kw):
-        diff = np.abs(preds_a - preds_b)
-        if epsilon < 1:  # treat as fraction of target range
-            epsilon *= diff.max() if diff.size else 1
-        return (diff > epsilon).astype(int)
+        threshold = self.threshold(self.sketch(preds_a, preds_b), epsilon)
+        return self.label(preds_a, preds_b, threshold)
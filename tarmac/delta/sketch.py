@@ -0,0 +1,82 @@
+import numpy as np
+
+
+class DiffSketch:
+    """Mergeable one-pass summary of non-negative prediction differences.
+
+    Keeps the exact count, sum and max, plus a log-bucketed histogram
+    (as in DDSketch) whose quantiles are within relative_accuracy of the true
+    value. Bucket counts do not depend on the order rows arrive in, so
+    sketches built chunk by chunk, or on several machines and merged, give
+    exactly the same quantiles as one built over all the data. Memory is
+    bounded by the dynamic range of the values, not their number (about
+    2,800 buckets span 1e-12 to 1e12 at 1% accuracy). NaNs are ignored.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, min_value: float = 1e-12):
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.count = 0
+        self.zeros = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.buckets = {}
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return self
+        self.count += values.size
+        self.sum += float(values.sum())
+        self.max = max(self.max, float(values.max()))
+
+        small = values <= self.min_value
+        self.zeros += int(small.sum())
+        keys = np.ceil(np.log(values[~small]) / np.log(self.gamma)).astype(np.int64)
+        keys, counts = np.unique(keys, return_counts=True)
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        return self
+
+    def merge(self, other: "DiffSketch"):
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge sketches of different accuracy")
+        self.count += other.count
+        self.zeros += other.zeros
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        return self
+
+    def _values_and_counts(self):
+        keys = np.array(sorted(self.buckets), dtype=np.float64)
+        # bucket k holds (gamma^(k-1), gamma^k]; this midpoint has error <= alpha
+        values = 2 * self.gamma**keys / (self.gamma + 1)
+        counts = np.array([self.buckets[k] for k in sorted(self.buckets)])
+        if self.zeros:
+            values = np.concatenate([[0.0], values])
+            counts = np.concatenate([[self.zeros], counts])
+        return values, counts
+
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            raise ValueError("Empty sketch")
+        if q >= 1:
+            return self.max
+        values, counts = self._values_and_counts()
+        rank = q * (self.count - 1)
+        index = int(np.searchsorted(np.cumsum(counts), rank, side="right"))
+        return min(float(values[index]), self.max)
+
+    def mad(self) -> float:
+        """Median absolute deviation from the median."""
+        median = self.quantile(0.5)
+        values, counts = self._values_and_counts()
+        deviations = np.abs(values - median)
+        order = np.argsort(deviations, kind="stable")
+        cumulative = np.cumsum(counts[order])
+        index = int(np.searchsorted(cumulative, 0.5 * (self.count - 1), side="right"))
+        return float(deviations[order][index])
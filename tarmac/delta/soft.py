@@ -0,0 +1,58 @@
+from abc import abstractmethod
+import numpy as np
+from scipy.special import rel_entr
+from .base import DeltaBuilder
+
+
+def align_proba(proba, classes, all_classes) -> np.ndarray:
+    """Reorder probability columns to all_classes, zero for classes not seen."""
+    aligned = np.zeros((proba.shape[0], len(all_classes)), dtype=np.float64)
+    aligned[:, np.searchsorted(all_classes, classes)] = proba
+    return aligned
+
+
+class SoftDelta(DeltaBuilder):
+    """Graded disagreement between two (n, n_classes) probability arrays.
+
+    build() returns a score in [0, 1] per row, or binary delta labels
+    (score > epsilon) when epsilon is given. Rows are processed chunk_size
+    at a time so temporaries stay small on large inputs.
+    """
+
+    def build(self, preds_a, preds_b, epsilon=None, chunk_size=1 << 16, **kw):
+        preds_a, preds_b = np.asarray(preds_a), np.asarray(preds_b)
+        if preds_a.shape != preds_b.shape:
+            raise ValueError(
+                f"Probability arrays differ in shape: {preds_a.shape} vs "
+                f"{preds_b.shape}; align their classes first"
+            )
+        scores = np.empty(len(preds_a))
+        for start in range(0, len(preds_a), chunk_size):
+            stop = start + chunk_size
+            scores[start:stop] = self.score(
+                preds_a[start:stop].astype(np.float64, copy=False),
+                preds_b[start:stop].astype(np.float64, copy=False),
+            )
+        if epsilon is None:
+            return scores
+        return (scores > epsilon).astype(int)
+
+    @abstractmethod
+    def score(self, p, q) -> np.ndarray: ...
+
+
+class ProbabilityL1Delta(SoftDelta):
+    """Total variation distance: half the L1 distance of the probabilities."""
+
+    def score(self, p, q):
+        return 0.5 * np.abs(p - q).sum(axis=1)
+
+
+class JensenShannonDelta(SoftDelta):
+    """Jensen-Shannon divergence in bits, which lies in [0, 1]."""
+
+    def score(self, p, q):
+        m = (p + q) / 2
+        return (rel_entr(p, m).sum(axis=1) + rel_entr(q, m).sum(axis=1)) / (
+            2 * np.log(2)
+        )
@@ -6,3 +6,15 @@ class IExplainer(ABC):
     def fit(self, X, delta_labels): ...
     @abstractmethod
     def explain(self): ...
+
+
+def choose_explainer(engine: str = "exact", **kw):
+    from .deltaxplainer import DeltaXplainer
+    from .histogram import HistDeltaXplainer
+    from .hoeffding import HoeffdingDeltaXplainer
+
+    return {
+        "exact": DeltaXplainer,
+        "hist": HistDeltaXplainer,
+        "online": HoeffdingDeltaXplainer,
+    }[engine](**kw)
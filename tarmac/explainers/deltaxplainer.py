@@ -1,6 +1,7 @@
 import numpy as np
 import pandas as pd
 from sklearn.tree import DecisionTreeClassifier
+from tarmac.data import is_sparse
 from tarmac.explainers.base import IExplainer
 
 
@@ -9,12 +10,21 @@ class DeltaXplainer(IExplainer):
         self.min_leaf = min_leaf
         self.seed = seed
         self.feature_names = None
-
-    def fit(self, X, y):
-        leaf = max(1, int(self.min_leaf * len(X)))
-        self.tree = DecisionTreeClassifier(
-            min_samples_leaf=leaf, random_state=self.seed
-        )
+        self.categories = {}
+
+    def fit(self, X, y, sample_weight=None):
+        """Fit the tree on X (an array, DataFrame or scipy.sparse matrix)."""
+        self._read_categories(X)
+        if sample_weight is None:
+            leaf = max(1, int(self.min_leaf * X.shape[0]))
+            self.tree = DecisionTreeClassifier(
+                min_samples_leaf=leaf, random_state=self.seed
+            )
+        else:  # importance-weighted rows: leaves must hold enough weight
+            self.tree = DecisionTreeClassifier(
+                min_weight_fraction_leaf=min(self.min_leaf, 0.5),
+                random_state=self.seed,
+            )
 
         unique_classes = np.unique(y)
         if len(unique_classes) == 1:
@@ -27,36 +37,65 @@ class DeltaXplainer(IExplainer):
             if isinstance(X, pd.DataFrame):
                 dummy_X = X.iloc[[0]].copy()  # Copy first row
                 X = pd.concat([X, dummy_X])
+            elif is_sparse(X):
+                from scipy import sparse
+
+                X = sparse.vstack([X, X[[0]]], format="csr")
             else:
                 dummy_X = X[[0]].copy()  # Copy first row
                 X = np.vstack([X, dummy_X])
             y = np.append(y, dummy_class)
+            if sample_weight is not None:
+                sample_weight = np.append(sample_weight, sample_weight[0])
 
-        self.tree.fit(X, y)
+        self.tree.fit(X, y, sample_weight=sample_weight)
 
         if hasattr(X, "columns"):
             self.feature_names = X.columns
         return self
 
+    def _read_categories(self, X):
+        # category codes of numeric_view frames, see tarmac.data.numeric_view
+        self.categories = dict(getattr(X, "attrs", {}).get("categories", {}))
+
+    def _feature_name(self, feat):
+        if self.feature_names is None:
+            return f"feature_{feat}"
+        return self.feature_names[feat]
+
+    def condition_categories(self, feature, op, threshold):
+        """Categories a condition on a coded column selects, or None.
+
+        Codes index the column's categories, so 'code <= t' selects the
+        first floor(t) + 1 of them (and missing values, coded -1) and
+        'code > t' the others.
+        """
+        categories = self.categories.get(feature)
+        if categories is None:
+            return None
+        cut = int(np.floor(threshold)) + 1
+        return categories[:cut] if op == "<=" else categories[cut:]
+
     def format_rule_dict(self, rule):
         """Format a rule into a structured dictionary."""
         conditions = []
         for feat, op, thresh in rule["path"]:
-            feat_name = (
-                f"feature_{feat}"
-                if self.feature_names is None
-                else self.feature_names[feat]
-            )
-            conditions.append(
-                {
-                    "feature": feat_name,
-                    "operator": op,
-                    "threshold": round(float(thresh), 3),
-                }
-            )
+            feat_name = self._feature_name(feat)
+            condition = {
+                "feature": feat_name,
+                "operator": op,
+                "threshold": round(float(thresh), 3),
+                # what the tree splits on, for `tarmac apply`
+                "threshold_exact": float(thresh),
+            }
+            categories = self.condition_categories(feat_name, op, thresh)
+            if categories is not None:
+                condition["categories"] = categories
+            conditions.append(condition)
 
         samples = int(rule["samples"])  # Convert np.int64 to Python int
-        total_samples = int(self.tree.tree_.n_node_samples[0])
+        weighted = self.tree.tree_.weighted_n_node_samples
+        support = float(weighted[rule["node"]]) / float(weighted[0])
         disagreement_pct = round(float(rule["disagreement_pct"]) * 100, 1)
 
         return {
@@ -64,19 +103,20 @@ class DeltaXplainer(IExplainer):
             "samples_affected": samples,
             "disagreement_percentage": disagreement_pct,
             "prediction": "models differ",
-            "support": round(float(samples) / total_samples, 3),
+            "support": round(support, 3),
         }
 
     def format_rule_str(self, rule):
         """Format a rule into a readable string."""
         conditions = []
         for feat, op, thresh in rule["path"]:
-            feat_name = (
-                f"feature_{feat}"
-                if self.feature_names is None
-                else self.feature_names[feat]
-            )
-            conditions.append(f"{feat_name} {op} {thresh:.3f}")
+            feat_name = self._feature_name(feat)
+            categories = self.condition_categories(feat_name, op, thresh)
+            if categories is None:
+                conditions.append(f"{feat_name} {op} {thresh:.3f}")
+            else:
+                missing = " or missing" if op == "<=" else ""
+                conditions.append(f"{feat_name} in {categories}{missing}")
 
         disagreement_pct = round(float(rule["disagreement_pct"]) * 100, 1)
         return f"IF {' AND '.join(conditions)} THEN models differ (affects {rule['samples']} samples, {disagreement_pct}% disagree)"
@@ -87,77 +127,79 @@ class DeltaXplainer(IExplainer):
         Args:
             return_dict: If True, return structured dictionaries instead of strings
         """
-        tree = self.tree.tree_
-        feature = tree.feature
-        threshold = tree.threshold
-        rules = []
-
-        def recurse(node, path):
-            if tree.children_left[node] == -1:  # leaf
-                node_samples = tree.n_node_samples[node]
-                node_values = tree.value[node][0]
-
-                disagreement_pct = node_values[1] / node_values.sum()
-
-                if (
-                    disagreement_pct > 0
-                ):  # Include all rules where there's any disagreement
-
-                    simplified_path = []
-                    for feat, op, thresh in path:
-
-                        feat_conditions = [
-                            (o, t) for f, o, t in simplified_path if f == feat
-                        ]
-
-                        if op == ">":
-
-                            if not feat_conditions:
-                                simplified_path.append((feat, op, thresh))
-
-                            elif all(
-                                o != ">" or t < thresh for o, t in feat_conditions
-                            ):
-
-                                simplified_path = [
-                                    (f, o, t)
-                                    for f, o, t in simplified_path
-                                    if f != feat or o != ">"
-                                ]
-                                simplified_path.append((feat, op, thresh))
-
-                        elif op == "<=":
-
-                            if not feat_conditions:
-                                simplified_path.append((feat, op, thresh))
-
-                            elif all(
-                                o != "<=" or t > thresh for o, t in feat_conditions
-                            ):
-
-                                simplified_path = [
-                                    (f, o, t)
-                                    for f, o, t in simplified_path
-                                    if f != feat or o != "<="
-                                ]
-                                simplified_path.append((feat, op, thresh))
-                    rule = {
-                        "path": simplified_path,
-                        "samples": node_samples,
-                        "disagreement_pct": disagreement_pct,
-                    }
-                    rules.append(rule)
-            else:
-                thresh = threshold[node]
-                feat = feature[node]
-                recurse(tree.children_left[node], path + [(feat, "<=", thresh)])
-                recurse(tree.children_right[node], path + [(feat, ">", thresh)])
-
-        recurse(0, [])
-
-        rules.sort(key=lambda x: x["disagreement_pct"] * x["samples"], reverse=True)
+        rules = self.extract_rules()
 
         if return_dict:
             return [self.format_rule_dict(rule) for rule in rules]
         else:
             return [self.format_rule_str(rule) for rule in rules]
+
+    def extract_rules(self):
+        """Walk the fitted tree and return the raw rule of every leaf with disagreement.
+
+        The tree is walked depth-first with an explicit stack, so deep trees
+        cannot hit the recursion limit. For each feature, the path keeps the
+        position of its tightest '<=' and '>' condition, which gives every
+        leaf its simplified interval box in O(depth).
+        """
+        tree = self.tree.tree_
+        # plain lists: scalar access is much cheaper than on numpy arrays
+        children_left = tree.children_left.tolist()
+        children_right = tree.children_right.tolist()
+        feature = tree.feature.tolist()
+        threshold = tree.threshold.tolist()
+        n_node_samples = tree.n_node_samples.tolist()
+        node_values = tree.value[:, 0, :]
+        disagreement = (node_values[:, 1] / node_values.sum(axis=1)).tolist()
+        operators = ("<=", ">")
+
+        rules = []
+        # (feature, side, threshold, previously tightest) for each split on the
+        # current path, side 0 being '<=' and side 1 '>'
+        path = []
+        tightest = [[-1] * tree.n_features, [-1] * tree.n_features]
+        stack = [(0, None)]
+
+        while stack:
+            node, condition = stack.pop()
+            if condition is not None:
+                depth, feat, side, thresh = condition
+                while len(path) > depth:  # backtrack to this node's parent
+                    f, sd, _, previous = path.pop()
+                    tightest[sd][f] = previous
+
+                previous = tightest[side][feat]
+                if previous == -1 or (
+                    thresh < path[previous][2]
+                    if side == 0
+                    else thresh > path[previous][2]
+                ):
+                    tightest[side][feat] = len(path)
+                path.append((feat, side, thresh, previous))
+
+            if children_left[node] == -1:  # leaf
+                if disagreement[node] > 0:
+                    simplified_path = [
+                        (f, operators[sd], t)
+                        for i, (f, sd, t, _) in enumerate(path)
+                        if tightest[sd][f] == i
+                    ]
+                    rules.append(
+                        {
+                            "node": node,
+                            "path": simplified_path,
+                            "samples": n_node_samples[node],
+                            "disagreement_pct": disagreement[node],
+                        }
+                    )
+            else:
+                depth = len(path)
+                stack.append(
+                    (children_right[node], (depth, feature[node], 1, threshold[node]))
+                )
+                stack.append(
+                    (children_left[node], (depth, feature[node], 0, threshold[node]))
+                )
+
+        rules.sort(key=lambda x: x["disagreement_pct"] * x["samples"], reverse=True)
+        return rules
@@ -0,0 +1,267 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from tarmac.data import is_sparse
+from tarmac.explainers.deltaxplainer import DeltaXplainer
+
+
+class BinMapper:
+    """Quantise every feature into at most max_bins bins stored as uint8.
+
+    Bin b of a feature holds the values in (edges[b - 1], edges[b]], so the
+    split "bin <= b" is exactly the rule "feature <= edges[b]" on the raw
+    scale. Edges are midpoints between distinct values when a feature has
+    few of them, and quantiles of a row subsample otherwise. NaNs land in
+    the last bin.
+    """
+
+    def __init__(self, max_bins=256, subsample=200_000, seed=0):
+        if not 2 <= max_bins <= 256:
+            raise ValueError(f"max_bins must be between 2 and 256, got {max_bins}")
+        self.max_bins = max_bins
+        self.subsample = subsample
+        self.seed = seed
+
+    def fit(self, X):
+        if X.shape[0] > self.subsample:
+            # pick the rows first so only the subsample is ever converted
+            rng = np.random.default_rng(self.seed)
+            idx = np.sort(rng.choice(X.shape[0], self.subsample, replace=False))
+            X = X.iloc[idx] if hasattr(X, "iloc") else X[idx]
+        X = np.asarray(X)
+
+        self.edges_ = []
+        for col in X.T.astype(np.float64):
+            col = col[~np.isnan(col)]
+            values = np.unique(col)
+            if len(values) <= self.max_bins:
+                edges = (values[:-1] + values[1:]) / 2
+            else:
+                quantiles = np.linspace(0, 1, self.max_bins + 1)[1:-1]
+                edges = np.unique(np.quantile(col, quantiles))
+            self.edges_.append(edges)
+        return self
+
+    def transform(self, X, chunk_size=1 << 16):
+        binned = np.empty(X.shape, dtype=np.uint8)
+        for start in range(0, X.shape[0], chunk_size):
+            chunk = np.asarray(X[start : start + chunk_size], dtype=np.float64)
+            for f, edges in enumerate(self.edges_):
+                binned[start : start + chunk_size, f] = np.searchsorted(
+                    edges, chunk[:, f], side="left"
+                )
+        return binned
+
+
+class _TreeArrays:
+    """The subset of sklearn's Tree attributes used by DeltaXplainer."""
+
+    def __init__(self, nodes, n_features):
+        self.n_features = n_features
+        self.node_count = len(nodes["feature"])
+        self.children_left = np.array(nodes["left"], dtype=np.intp)
+        self.children_right = np.array(nodes["right"], dtype=np.intp)
+        self.feature = np.array(nodes["feature"], dtype=np.intp)
+        self.threshold = np.array(nodes["threshold"], dtype=np.float64)
+        self.n_node_samples = np.array(nodes["samples"], dtype=np.intp)
+        self.weighted_n_node_samples = np.array(nodes["weight"], dtype=np.float64)
+        positives = np.array(nodes["positives"], dtype=np.float64)
+        negatives = self.weighted_n_node_samples - positives
+        self.value = np.stack([negatives, positives], axis=1)[:, None, :]
+
+
+class BinnedTree:
+    """Decision tree grown by HistDeltaXplainer, exposed like sklearn's."""
+
+    def __init__(self, tree_):
+        self.tree_ = tree_
+
+    def apply(self, X):
+        """Return the index of the leaf each row of X falls into."""
+        tree = self.tree_
+        X = np.asarray(X)
+        node = np.zeros(X.shape[0], dtype=np.intp)
+        active = np.flatnonzero(tree.children_left[node] != -1)
+        while len(active):
+            current = node[active]
+            go_left = X[active, tree.feature[current]] <= tree.threshold[current]
+            node[active] = np.where(
+                go_left, tree.children_left[current], tree.children_right[current]
+            )
+            active = active[tree.children_left[node[active]] != -1]
+        return node
+
+
+class HistDeltaXplainer(DeltaXplainer):
+    """DeltaXplainer whose tree is grown from binned feature histograms.
+
+    Features are quantised once into at most max_bins bins (uint8), and each
+    node's best Gini split is read from per-bin sums of rows and
+    disagreements instead of sorting feature values. Only the smaller child's
+    histogram is built, over row blocks in a thread pool; the larger one is
+    the parent's minus the smaller's. Thresholds are bin edges on the raw
+    feature scale, so rules come out in the usual format.
+    """
+
+    def __init__(
+        self, min_leaf=0.01, seed=0, max_bins=256, max_depth=None, n_threads=None
+    ):
+        super().__init__(min_leaf=min_leaf, seed=seed)
+        self.max_bins = max_bins
+        self.max_depth = max_depth
+        self.n_threads = n_threads or os.cpu_count() or 1
+
+    def fit(self, X, y, sample_weight=None, block_size=1 << 16):
+        if is_sparse(X):
+            raise ValueError(
+                "The histogram engine bins dense features: use the exact engine "
+                "for sparse data"
+            )
+        self._read_categories(X)
+        y = np.asarray(y).astype(np.float64)
+        n = X.shape[0]
+        weighted = sample_weight is not None
+        w = np.ones(n) if not weighted else np.asarray(sample_weight, np.float64)
+        if weighted:
+            min_rows, min_weight = 1, min(self.min_leaf, 0.5) * w.sum()
+        else:
+            min_rows, min_weight = max(1, int(self.min_leaf * n)), 0.0
+
+        self.bin_mapper_ = BinMapper(self.max_bins, seed=self.seed).fit(X)
+        binned = self.bin_mapper_.transform(X)
+        n_features = binned.shape[1]
+        offsets = np.arange(n_features, dtype=np.intp) * self.max_bins
+        n_flat = n_features * self.max_bins
+
+        def block_histogram(block):
+            codes = (binned[block] + offsets).ravel()
+            count = np.bincount(codes, minlength=n_flat).astype(np.float64)
+            if weighted:
+                block_w = np.repeat(w[block], n_features)
+                weight = np.bincount(codes, weights=block_w, minlength=n_flat)
+            else:
+                weight = count
+            positive = np.bincount(
+                codes,
+                weights=np.repeat(w[block] * y[block], n_features),
+                minlength=n_flat,
+            )
+            return np.stack([count, weight, positive])
+
+        def histogram(idx):
+            blocks = [idx[i : i + block_size] for i in range(0, len(idx), block_size)]
+            if len(blocks) == 1 or pool is None:
+                parts = map(block_histogram, blocks)
+            else:
+                parts = pool.map(block_histogram, blocks)
+            total = sum(parts, np.zeros((3, n_flat)))
+            return total.reshape(3, n_features, self.max_bins)
+
+        keys = (
+            "left",
+            "right",
+            "feature",
+            "threshold",
+            "samples",
+            "weight",
+            "positives",
+        )
+        nodes = {key: [] for key in keys}
+
+        pool = ThreadPoolExecutor(self.n_threads) if self.n_threads > 1 else None
+        try:
+            # (parent, is_left, rows, histogram, depth); nodes are numbered in
+            # depth-first preorder like sklearn's trees
+            stack = [(-1, True, np.arange(n), None, 0)]
+            while stack:
+                parent, is_left, idx, hist, depth = stack.pop()
+                if hist is None:
+                    hist = histogram(idx)
+                node = len(nodes["feature"])
+                if parent >= 0:
+                    nodes["left" if is_left else "right"][parent] = node
+
+                count, weight, positive = hist[:, 0, :].sum(axis=1)
+                nodes["left"].append(-1)
+                nodes["right"].append(-1)
+                nodes["feature"].append(-2)
+                nodes["threshold"].append(-2.0)
+                nodes["samples"].append(int(count))
+                nodes["weight"].append(weight)
+                nodes["positives"].append(positive)
+
+                split = None
+                tolerance = 1e-9 * weight  # weighted sums come from subtractions
+                if tolerance < positive < weight - tolerance and (
+                    self.max_depth is None or depth < self.max_depth
+                ):
+                    split = self._best_split(hist, min_rows, min_weight)
+                if split is None:
+                    continue
+
+                feat, b = split
+                go_left = binned[idx, feat] <= b
+                left, right = idx[go_left], idx[~go_left]
+                nodes["feature"][node] = feat
+                nodes["threshold"][node] = self.bin_mapper_.edges_[feat][b]
+
+                # subtraction trick: only the smaller child is histogrammed
+                if len(left) <= len(right):
+                    left_hist = histogram(left)
+                    right_hist = hist - left_hist
+                else:
+                    right_hist = histogram(right)
+                    left_hist = hist - right_hist
+                stack.append((node, False, right, right_hist, depth + 1))
+                stack.append((node, True, left, left_hist, depth + 1))
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        self.tree = BinnedTree(_TreeArrays(nodes, n_features))
+        if hasattr(X, "columns"):
+            self.feature_names = X.columns
+        return self
+
+    @staticmethod
+    def _best_split(hist, min_rows, min_weight):
+        """Return the (feature, bin) of the best Gini split, or None."""
+        impurity, parent = split_impurity(hist, min_rows, min_weight)
+        feat, b = np.unravel_index(np.argmin(impurity), impurity.shape)
+        total_weight = hist[1, 0, :].sum()
+        if impurity[feat, b] >= parent - 1e-12 * total_weight:
+            return None
+        return int(feat), int(b)
+
+
+def split_impurity(hist, min_rows, min_weight=0.0):
+    """Weighted Gini impurity of every candidate split of a node.
+
+    Args:
+        hist: (3, n_features, n_bins) per-bin row counts, weights and
+            weighted disagreements of the node
+        min_rows: Minimum rows on each side of a split
+        min_weight: Minimum weight on each side of a split
+
+    Returns:
+        tuple(impurity, parent) where impurity[f, b] is the summed
+        weight * gini of the children of the split "bin of f <= b" (inf when
+        invalid) and parent is the node's own weight * gini
+    """
+    count, weight, positive = np.cumsum(hist, axis=2)[:, :, :-1]
+    total_count, total_weight, total_positive = hist[:, 0, :].sum(axis=1)
+    right_count = total_count - count
+    right_weight = total_weight - weight
+    right_positive = total_positive - positive
+
+    valid = (count >= min_rows) & (right_count >= min_rows)
+    valid &= (weight > 0) & (right_weight > 0)
+    if min_weight:
+        valid &= (weight >= min_weight) & (right_weight >= min_weight)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # weight * gini = 2 * positive * (weight - positive) / weight
+        impurity = 2 * positive * (weight - positive) / weight
+        impurity += 2 * right_positive * (right_weight - right_positive) / right_weight
+        parent = 2 * total_positive * (total_weight - total_positive) / total_weight
+    return np.where(valid, impurity, np.inf), parent
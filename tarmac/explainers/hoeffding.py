@@ -0,0 +1,203 @@
+import math
+import numpy as np
+from tarmac.data import is_sparse
+from tarmac.explainers.deltaxplainer import DeltaXplainer
+from tarmac.explainers.histogram import (
+    BinMapper,
+    BinnedTree,
+    _TreeArrays,
+    split_impurity,
+)
+
+
+class HoeffdingDeltaXplainer(DeltaXplainer):
+    """Incremental explainer growing a Hoeffding tree over batches of deltas.
+
+    Bin edges are set from the first batch. Each leaf then keeps a per-bin
+    histogram of rows and disagreements for every feature, and once a leaf
+    has seen grace_period new rows it splits if the best feature beats the
+    runner-up by more than the Hoeffding bound (or the bound falls below
+    tie_threshold). Only leaves hold histograms and their number is capped
+    by max_leaves, so memory stays bounded however long the stream runs.
+    The current rules can be read with explain() after any batch.
+
+    min_leaf is a fraction of all rows seen so far that each side of a new
+    split must hold.
+    """
+
+    def __init__(
+        self,
+        min_leaf=0.01,
+        seed=0,
+        max_bins=64,
+        grace_period=200,
+        split_confidence=1e-6,
+        tie_threshold=0.05,
+        max_leaves=256,
+        max_depth=20,
+    ):
+        super().__init__(min_leaf=min_leaf, seed=seed)
+        self.max_bins = max_bins
+        self.grace_period = grace_period
+        self.split_confidence = split_confidence
+        self.tie_threshold = tie_threshold
+        self.max_leaves = max_leaves
+        self.max_depth = max_depth
+        self._reset()
+
+    def _reset(self):
+        self.bin_mapper_ = None
+        self.n_seen_ = 0
+        self._nodes = {
+            key: []
+            for key in (
+                "left",
+                "right",
+                "feature",
+                "threshold",
+                "samples",
+                "weight",
+                "positives",
+            )
+        }
+        self._depth = []
+        self._histograms, self._since_check = {}, {}
+
+    def fit(self, X, y, sample_weight=None, chunk_size=1 << 16):
+        self._reset()
+        for start in range(0, X.shape[0], chunk_size):
+            stop = start + chunk_size
+            weights = None if sample_weight is None else sample_weight[start:stop]
+            self.partial_fit(X[start:stop], y[start:stop], sample_weight=weights)
+        return self
+
+    def partial_fit(self, X, y, sample_weight=None):
+        """Update the tree with one batch of rows and their delta labels."""
+        if is_sparse(X):
+            raise ValueError(
+                "The online engine bins dense features: use the exact engine "
+                "for sparse data"
+            )
+        if X.shape[0] == 0:
+            return self
+        y = np.asarray(y).astype(np.float64)
+        w = np.ones(len(y)) if sample_weight is None else np.asarray(sample_weight)
+
+        if self.bin_mapper_ is None:
+            self.bin_mapper_ = BinMapper(self.max_bins, seed=self.seed).fit(X)
+            self._add_node(0, (0, 0.0, 0.0))
+            self._read_categories(X)
+            if hasattr(X, "columns"):
+                self.feature_names = X.columns
+        binned = self.bin_mapper_.transform(X)
+        self.n_seen_ += len(y)
+
+        leaves = self.tree.apply(X)
+        order = np.argsort(leaves, kind="stable")
+        leaf_ids, starts = np.unique(leaves[order], return_index=True)
+        for leaf, rows in zip(leaf_ids, np.split(order, starts[1:])):
+            self._update_leaf(int(leaf), binned[rows], y[rows], w[rows])
+        return self
+
+    @property
+    def tree(self):
+        nodes = dict(self._nodes)
+        nodes["samples"] = [round(count) for count in nodes["samples"]]
+        nodes["weight"] = list(nodes["weight"])
+        nodes["positives"] = list(nodes["positives"])
+        # internal nodes total their children (children come after parents)
+        for node in reversed(range(len(nodes["feature"]))):
+            left, right = nodes["left"][node], nodes["right"][node]
+            if left != -1:
+                for key in ("samples", "weight", "positives"):
+                    nodes[key][node] = nodes[key][left] + nodes[key][right]
+        n_features = 0 if self.bin_mapper_ is None else len(self.bin_mapper_.edges_)
+        return BinnedTree(_TreeArrays(nodes, n_features))
+
+    def extract_rules(self):
+        if not self._nodes["feature"]:
+            return []  # nothing seen yet: no tree to walk
+        return super().extract_rules()
+
+    def _add_node(self, depth, stats):
+        node = len(self._nodes["feature"])
+        for key, value in zip(("samples", "weight", "positives"), stats):
+            self._nodes[key].append(value)
+        self._nodes["left"].append(-1)
+        self._nodes["right"].append(-1)
+        self._nodes["feature"].append(-2)
+        self._nodes["threshold"].append(-2.0)
+        self._depth.append(depth)
+        n_features = len(self.bin_mapper_.edges_)
+        self._histograms[node] = np.zeros((3, n_features, self.max_bins))
+        self._since_check[node] = 0
+        return node
+
+    def _update_leaf(self, leaf, binned, y, w):
+        n_features = binned.shape[1]
+        codes = (binned + np.arange(n_features) * self.max_bins).ravel()
+        n_flat = n_features * self.max_bins
+        hist = self._histograms[leaf]
+        hist[0] += np.bincount(codes, minlength=n_flat).reshape(n_features, -1)
+        hist[1] += np.bincount(
+            codes, weights=np.repeat(w, n_features), minlength=n_flat
+        ).reshape(n_features, -1)
+        hist[2] += np.bincount(
+            codes, weights=np.repeat(w * y, n_features), minlength=n_flat
+        ).reshape(n_features, -1)
+
+        self._nodes["samples"][leaf] += len(y)
+        self._nodes["weight"][leaf] += float(w.sum())
+        self._nodes["positives"][leaf] += float((w * y).sum())
+        self._since_check[leaf] += len(y)
+        if self._since_check[leaf] >= self.grace_period:
+            self._since_check[leaf] = 0
+            self._attempt_split(leaf)
+
+    def _attempt_split(self, leaf):
+        n_leaves = len(self._histograms)
+        if n_leaves >= self.max_leaves or self._depth[leaf] >= self.max_depth:
+            return
+        hist = self._histograms[leaf]
+        total_count, total_weight, positive = hist[:, 0, :].sum(axis=1)
+        if not 0 < positive < total_weight:
+            return
+
+        min_rows = max(1, int(self.min_leaf * self.n_seen_))
+        impurity, parent = split_impurity(hist, min_rows)
+        per_feature = impurity.min(axis=1) / total_weight
+        ranked = np.argsort(per_feature)
+        best = ranked[0]
+        if not np.isfinite(per_feature[best]):
+            return
+        gain = parent / total_weight - per_feature[best]
+        runner_up = (
+            parent / total_weight - per_feature[ranked[1]] if len(ranked) > 1 else 0.0
+        )
+        runner_up = runner_up if np.isfinite(runner_up) else 0.0
+
+        # gini of a binary label ranges over [0, 0.5]
+        bound = math.sqrt(
+            0.25 * math.log(1 / self.split_confidence) / (2 * total_count)
+        )
+        if gain <= 0 or (gain - runner_up <= bound and bound >= self.tie_threshold):
+            return
+
+        b = int(np.argmin(impurity[best]))
+        below = hist[:, best, : b + 1].sum(axis=1)
+        above = hist[:, best, b + 1 :].sum(axis=1)
+        # rows the leaf inherited from its parent are not in its histogram,
+        # share them between the children like the rows that are
+        stats = np.array(
+            [self._nodes[k][leaf] for k in ("samples", "weight", "positives")]
+        )
+        inherited = stats - hist[:, 0, :].sum(axis=1)
+        below = below + inherited * (below[1] / total_weight)
+        above = above + inherited * (above[1] / total_weight)
+        del self._histograms[leaf], self._since_check[leaf]
+
+        self._nodes["feature"][leaf] = int(best)
+        self._nodes["threshold"][leaf] = float(self.bin_mapper_.edges_[best][b])
+        depth = self._depth[leaf] + 1
+        self._nodes["left"][leaf] = self._add_node(depth, below)
+        self._nodes["right"][leaf] = self._add_node(depth, above)
@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+from pathlib import Path
+
+from .adapters import PredictionCache, get_adapter, release_adapter
+from .adapters.cache import fingerprint_array, fingerprint_file
+
+MODEL_SUFFIXES = {".pkl", ".joblib"}
+
+
+def _natural_key(path):
+    # model_v2 before model_v10
+    return [int(t) if t.isdigit() else t.lower() for t in re.split(r"(\d+)", path.name)]
+
+
+def list_versions(model_dir, order: str = "name") -> list:
+    """Model files of model_dir, oldest first.
+
+    Args:
+        model_dir: Directory holding one file per model version
+        order: 'name' (natural sort, so v2 comes before v10) or 'mtime'
+    """
+    if order not in ("name", "mtime"):
+        raise ValueError(f"Unknown version order: {order}")
+    paths = [
+        p
+        for p in Path(model_dir).iterdir()
+        if p.is_file() and p.suffix.lower() in MODEL_SUFFIXES
+    ]
+    if order == "mtime":
+        return sorted(paths, key=lambda p: (p.stat().st_mtime_ns, _natural_key(p)))
+    return sorted(paths, key=_natural_key)
+
+
+class ModelLog:
+    """Diffs of consecutive model versions, updated incrementally.
+
+    The state lives in state_dir (<model_dir>/.tarmac by default): a
+    PredictionCache holding every version's predictions on the evaluation
+    set, and log.json holding the diff of every consecutive pair computed so
+    far. A diff is keyed by the content of both model files, the evaluation
+    data and the diff settings, so update() only scores versions it has not
+    seen and only explains pairs whose diff is not logged yet. Models are
+    only loaded for pairs that are not logged, and released once the pairs
+    using them are done, so at most two are in memory at a time.
+
+    Example:
+        log = ModelLog("models/")
+        for entry in log.update(X):
+            print(entry["from"], entry["to"], entry["disagreement_rate"])
+    """
+
+    def __init__(self, model_dir, state_dir=None, order: str = "name"):
+        self.model_dir = Path(model_dir)
+        self.state_dir = Path(state_dir or self.model_dir / ".tarmac")
+        self.order = order
+        self.cache = PredictionCache(self.state_dir / "predictions")
+        self.path = self.state_dir / "log.json"
+        self._state = {"models": {}, "diffs": {}}
+        if self.path.exists():
+            with open(self.path) as f:
+                self._state = json.load(f)
+
+    def versions(self) -> list:
+        return list_versions(self.model_dir, self.order)
+
+    def fingerprint(self, path) -> str:
+        """Content hash of a model file, re-read only when it changed on disk."""
+        stat = os.stat(path)
+        stamp = [stat.st_mtime_ns, stat.st_size]
+        known = self._state["models"].get(Path(path).name)
+        if known is None or known["stamp"] != stamp:
+            known = {"stamp": stamp, "fingerprint": fingerprint_file(path)}
+            self._state["models"][Path(path).name] = known
+        return known["fingerprint"]
+
+    def update(
+        self,
+        X,
+        task="auto",
+        epsilon=0.05,
+        min_leaf=0.01,
+        engine="exact",
+        jobs=1,
+        backend="thread",
+        mmap_dir=None,
+        profiler=None,
+    ) -> list:
+        """Diff every consecutive pair of versions on X, reusing logged diffs.
+
+        Args:
+            X: Evaluation data, the same for every version
+            task: 'auto', 'classification' or 'regression'
+            epsilon: Threshold for considering regression predictions different
+            min_leaf: Minimum samples per leaf as fraction of dataset
+            engine: Explainer engine (see choose_explainer)
+            jobs: Number of concurrent inference workers
+            backend: 'thread' or 'process' inference pool
+            mmap_dir: Optional directory of memory-mapped model copies
+            profiler: Optional Profiler recording the latency of every model call
+
+        Returns:
+            One entry per consecutive pair, oldest first, with 'from', 'to',
+            'task', 'disagreement_rate', 'total_rules', 'rules' and
+            'computed' (False when the diff came from the log)
+        """
+        from .pipeline import diff_many
+
+        versions = self.versions()
+        settings = json.dumps(
+            {"task": task, "epsilon": epsilon, "min_leaf": min_leaf, "engine": engine},
+            sort_keys=True,
+        )
+        context = hashlib.blake2b(
+            f"{fingerprint_array(X)}-{settings}".encode(), digest_size=16
+        ).hexdigest()
+
+        entries, loaded = [], set()
+        for previous, current in zip(versions, versions[1:]):
+            key = f"{self.fingerprint(previous)}-{self.fingerprint(current)}-{context}"
+            entry = self._state["diffs"].get(key)
+            computed = entry is None
+            if computed:
+                loaded.update([previous, current])
+                result = diff_many(
+                    X,
+                    [get_adapter(previous, mmap_dir), get_adapter(current, mmap_dir)],
+                    task=task,
+                    epsilon=epsilon,
+                    min_leaf=min_leaf,
+                    engine=engine,
+                    jobs=jobs,
+                    backend=backend,
+                    cache=self.cache,
+                    profiler=profiler,
+                )
+                rules = result["explainers"][0].explain(return_dict=True)
+                entry = {
+                    "task": result["task"],
+                    "disagreement_rate": round(
+                        float(result["delta_labels"][0].mean()), 4
+                    ),
+                    "total_rules": len(rules),
+                    "rules": rules,
+                }
+                self._state["diffs"][key] = entry
+            if previous in loaded:
+                release_adapter(previous)
+                loaded.discard(previous)
+            entries.append(
+                {
+                    "from": previous.name,
+                    "to": current.name,
+                    **entry,
+                    "computed": computed,
+                }
+            )
+
+        for path in loaded:
+            release_adapter(path)
+        self.save()
+        return entries
+
+    def save(self):
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.state_dir, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(self._state, f)
+        os.replace(tmp, self.path)
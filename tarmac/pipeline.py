@@ -0,0 +1,293 @@
+import tempfile
+import numpy as np
+import pandas as pd
+
+from .adapters import InferenceExecutor
+from .data import adaptive_sample, is_sparse, numeric_chunk, numeric_view
+from .delta.base import choose_builder
+from .delta.soft import align_proba
+from .explainers.base import choose_explainer
+
+
+def score_chunks(
+    chunks,
+    model_a,
+    model_b,
+    task="auto",
+    epsilon=0.05,
+    spill_dir=None,
+    jobs=1,
+    backend="thread",
+    cache=None,
+    profiler=None,
+    scale="max",
+    on_chunk=None,
+):
+    """Score a stream of feature chunks with both models.
+
+    Each chunk is predicted by both adapters and turned into delta labels
+    before the next one is read, so peak memory is bounded by the chunk size
+    rather than the dataset size. The features the explainer needs are
+    spilled to a float32 memory map on disk (the tree works in float32).
+    Regression thresholds depend on every difference, so differences are
+    sketched and spilled as they stream and labelled once the threshold is
+    known; the labels are the same as an in-memory build's.
+
+    Args:
+        chunks: Iterable of 2D feature arrays
+        model_a: Adapter for the first model
+        model_b: Adapter for the second model
+        task: 'auto', 'classification' or 'regression'
+        epsilon: Threshold for considering regression predictions different
+        spill_dir: Directory for the spilled features (system temp by default)
+        jobs: Number of concurrent inference workers
+        backend: 'thread' or 'process' inference pool
+        cache: Optional PredictionCache reused across runs
+        profiler: Optional Profiler recording the latency of every model call
+        scale: Statistic a fractional regression epsilon is relative to
+            ('max', 'quantile' or 'mad', see RegressionDelta)
+        on_chunk: Optional callback receiving both models' predictions for
+            every chunk, in row order
+
+    Returns:
+        tuple(X, delta_labels, task, threshold) where X is a read-only memmap
+        (a float32 CSR matrix for sparse chunks, which are kept as they are,
+        or a DataFrame over the memmap for Dataset chunks, named like them
+        and with the codes of numeric_chunk) and threshold is the regression
+        threshold chosen (None otherwise)
+    """
+    spill = tempfile.TemporaryFile(dir=spill_dir)
+    diff_spill = tempfile.TemporaryFile(dir=spill_dir)
+    labels, sketch, builder, threshold = [], None, None, None
+    n_rows, n_features, sparse_chunks = 0, None, []
+    names, categories = None, {}
+
+    with InferenceExecutor(
+        [model_a, model_b], jobs=jobs, backend=backend, cache=cache, profiler=profiler
+    ) as pool:
+        for chunk in chunks:
+            if chunk.shape[0] == 0:
+                continue
+            chunk_a, chunk_b = pool.predict(chunk)
+            if on_chunk is not None:
+                on_chunk(chunk_a, chunk_b)
+
+            if task == "auto":
+                task = "regression" if chunk_a.dtype.kind in "f" else "classification"
+            if builder is None:
+                kw = {"scale": scale} if task == "regression" else {}
+                builder = choose_builder(task, **kw)
+
+            if task == "classification":
+                labels.append(builder.build(chunk_a, chunk_b))
+            else:
+                sketch = builder.sketch(chunk_a, chunk_b, sketch)
+                np.abs(chunk_a - chunk_b).astype(np.float64).tofile(diff_spill)
+
+            if is_sparse(chunk):
+                sparse_chunks.append(chunk.astype(np.float32))
+            else:
+                values = numeric_chunk(chunk, categories)
+                np.ascontiguousarray(values, np.float32).tofile(spill)
+                if hasattr(values, "columns"):
+                    names = list(values.columns)
+            n_rows += chunk.shape[0]
+            n_features = chunk.shape[1]
+
+    if n_rows == 0:
+        raise ValueError("No rows to compare: the input stream is empty")
+
+    if task == "classification":
+        delta_labels = np.concatenate(labels)
+    else:
+        threshold = builder.threshold(sketch, epsilon)
+        diff_spill.flush()
+        diffs = np.memmap(diff_spill, dtype=np.float64, mode="r", shape=(n_rows,))
+        delta_labels = np.empty(n_rows, dtype=int)
+        for start in range(0, n_rows, 1 << 20):
+            stop = start + (1 << 20)
+            delta_labels[start:stop] = diffs[start:stop] > threshold
+    diff_spill.close()
+
+    if sparse_chunks:
+        from scipy import sparse
+
+        spill.close()
+        return sparse.vstack(sparse_chunks, format="csr"), delta_labels, task, threshold
+    spill.flush()
+    X = np.memmap(spill, dtype=np.float32, mode="r", shape=(n_rows, n_features))
+    if names is not None:
+        X = pd.DataFrame(X, columns=names, copy=False)
+        X.attrs["categories"] = categories
+    return X, delta_labels, task, threshold
+
+
+def score_adaptive(
+    X,
+    model_a,
+    model_b,
+    budget,
+    task="auto",
+    epsilon=0.05,
+    seed=0,
+    jobs=1,
+    backend="thread",
+    cache=None,
+    profiler=None,
+    scale="max",
+    on_chunk=None,
+):
+    """Score a disagreement-seeking sample of X with both models.
+
+    Only budget rows are ever predicted (see tarmac.data.adaptive_sample);
+    their importance weights are returned for DeltaXplainer.fit. scale is
+    the regression threshold scale (see RegressionDelta), and on_chunk, if
+    given, receives both models' predictions for every scored batch, in the
+    order of the returned rows.
+
+    Returns:
+        tuple(X_sample, delta_labels, weights, task, rows) where rows are
+        the indices of X_sample in X
+    """
+    preds_a, preds_b = [], []
+
+    with InferenceExecutor(
+        [model_a, model_b], jobs=jobs, backend=backend, cache=cache, profiler=profiler
+    ) as pool:
+
+        def score(rows):
+            nonlocal task
+            chunk_a, chunk_b = pool.predict(rows)
+            if task == "auto":
+                task = "regression" if chunk_a.dtype.kind in "f" else "classification"
+            preds_a.append(chunk_a)
+            preds_b.append(chunk_b)
+            if on_chunk is not None:
+                on_chunk(chunk_a, chunk_b)
+            return choose_builder(task).build(chunk_a, chunk_b, epsilon=epsilon)
+
+        idx, weights = adaptive_sample(X, score, budget, seed=seed)
+
+    kw = {"scale": scale} if task == "regression" else {}
+    delta_labels = choose_builder(task, **kw).build(
+        np.concatenate(preds_a), np.concatenate(preds_b), epsilon=epsilon
+    )
+    return X[idx], delta_labels, weights, task, idx
+
+
+def score_soft(
+    X,
+    model_a,
+    model_b,
+    delta="l1",
+    epsilon=0.05,
+    jobs=1,
+    backend="thread",
+    cache=None,
+    profiler=None,
+):
+    """Grade how far apart two classifiers' probabilities are on every row.
+
+    Each model is scored once for both labels and probabilities. The
+    probability columns are aligned on the union of both models' classes
+    before the soft delta builder compares them.
+
+    Args:
+        X: Comparison data
+        model_a: Adapter for the first model
+        model_b: Adapter for the second model
+        delta: 'l1' (total variation) or 'js' (Jensen-Shannon divergence)
+        epsilon: Scores above this are labelled as disagreement
+        jobs: Number of concurrent inference workers
+        backend: 'thread' or 'process' inference pool
+        cache: Optional PredictionCache reused across runs
+        profiler: Optional Profiler recording the latency of every model call
+
+    Returns:
+        tuple(scores, delta_labels, labels_a, labels_b)
+    """
+    with InferenceExecutor(
+        [model_a, model_b], jobs=jobs, backend=backend, cache=cache, profiler=profiler
+    ) as pool:
+        (labels_a, proba_a), (labels_b, proba_b) = pool.predict(
+            X, method="predict_with_proba"
+        )
+
+    classes_a, classes_b = model_a.classes, model_b.classes
+    if classes_a is not None and classes_b is not None:
+        classes = np.union1d(classes_a, classes_b)
+        proba_a = align_proba(proba_a, classes_a, classes)
+        proba_b = align_proba(proba_b, classes_b, classes)
+
+    scores = choose_builder(delta).build(proba_a, proba_b)
+    return scores, (scores > epsilon).astype(int), labels_a, labels_b
+
+
+def diff_many(
+    X,
+    models,
+    task="auto",
+    epsilon=0.05,
+    min_leaf=0.01,
+    engine="exact",
+    matrix=False,
+    jobs=1,
+    backend="thread",
+    cache=None,
+    profiler=None,
+):
+    """Compare a baseline against several candidates in one pass over X.
+
+    Every model is scored exactly once (concurrently with jobs > 1), then
+    each candidate's predictions are diffed against the baseline's and
+    explained by its own explainer.
+
+    Args:
+        X: Comparison data
+        models: Adapters, the first one being the baseline
+        task: 'auto', 'classification' or 'regression'
+        epsilon: Threshold for considering regression predictions different
+        min_leaf: Minimum samples per leaf as fraction of dataset
+        engine: 'exact' (DeltaXplainer) or 'hist' (HistDeltaXplainer)
+        matrix: Also compute the pairwise disagreement rate of all models
+        jobs: Number of concurrent inference workers
+        backend: 'thread' or 'process' inference pool
+        cache: Optional PredictionCache reused across runs
+        profiler: Optional Profiler recording the latency of every model call
+
+    Returns:
+        dict with 'task', 'delta_labels' and 'explainers' (one entry per
+        candidate) and 'disagreement' (an (N, N) array, or None)
+    """
+    if len(models) < 2:
+        raise ValueError("diff_many needs a baseline and at least one candidate")
+
+    with InferenceExecutor(
+        models, jobs=jobs, backend=backend, cache=cache, profiler=profiler
+    ) as pool:
+        preds = pool.predict(X)
+
+    if task == "auto":
+        task = "regression" if preds[0].dtype.kind in "f" else "classification"
+    builder = choose_builder(task)
+
+    delta_labels = [builder.build(preds[0], p, epsilon=epsilon) for p in preds[1:]]
+    explainers = [
+        choose_explainer(engine, min_leaf=min_leaf).fit(numeric_view(X), d)
+        for d in delta_labels
+    ]
+
+    disagreement = None
+    if matrix:
+        disagreement = np.zeros((len(models), len(models)))
+        for i in range(len(models)):
+            for j in range(i + 1, len(models)):
+                rate = builder.build(preds[i], preds[j], epsilon=epsilon).mean()
+                disagreement[i, j] = disagreement[j, i] = rate
+
+    return {
+        "task": task,
+        "delta_labels": delta_labels,
+        "explainers": explainers,
+        "disagreement": disagreement,
+    }
@@ -0,0 +1,125 @@
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB (None if unknown)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes elsewhere
+    return peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+
+
+class Profiler:
+    """Record where the time of a diff run goes.
+
+    Stages are timed with the stage() context manager (wall time, CPU time,
+    peak RSS and rows per second), and model calls are reported through
+    record_latency(). Every finished stage is passed to the hooks, e.g. to
+    forward it to a metrics system.
+
+    Example:
+        profiler = Profiler(hooks=[print])
+        with profiler.stage("fit", rows=len(X)):
+            explainer.fit(X, delta_labels)
+        profiler.summary()
+    """
+
+    def __init__(self, hooks: list = None):
+        self.hooks = list(hooks or [])
+        self.stages = []
+        self.latencies = {}
+        self._events = []
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook):
+        """Call hook(stage) with the record of every finished stage."""
+        self.hooks.append(hook)
+
+    @contextmanager
+    def stage(self, name: str, rows: int = None):
+        """Time the enclosed block; its record can be updated inside (e.g. rows)."""
+        record = {"stage": name, "rows": rows}
+        start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            wall = time.perf_counter() - start
+            record["wall_seconds"] = round(wall, 6)
+            record["cpu_seconds"] = round(time.process_time() - cpu_start, 6)
+            record["peak_rss_mb"] = peak_rss_mb()
+            if record["rows"]:
+                record["rows_per_second"] = round(record["rows"] / max(wall, 1e-9))
+            self.stages.append(record)
+            self._event(name, start, wall, "stages", record)
+            for hook in self.hooks:
+                hook(record)
+
+    def record_latency(self, model: str, start: float, seconds: float, rows: int):
+        """Record one model call on rows rows, started at perf_counter() start."""
+        with self._lock:
+            self.latencies.setdefault(model, []).append((seconds, rows))
+            self._event(f"predict {model}", start, seconds, model, {"rows": rows})
+
+    def _event(self, name, start, seconds, track, args):
+        self._events.append(
+            {
+                "name": name,
+                "ph": "X",
+                "ts": round((start - self._origin) * 1e6, 1),
+                "dur": round(seconds * 1e6, 1),
+                "pid": os.getpid(),
+                "tid": track,
+                "args": {k: v for k, v in args.items() if k != "stage"},
+            }
+        )
+
+    def summary(self) -> dict:
+        """Stage records and per-model inference latency percentiles."""
+        import numpy as np
+
+        latency = {}
+        for model, calls in self.latencies.items():
+            seconds = np.array([s for s, _ in calls])
+            rows = sum(r for _, r in calls)
+            p50, p90, p99 = np.percentile(seconds, [50, 90, 99])
+            latency[model] = {
+                "calls": len(calls),
+                "rows": rows,
+                "p50_seconds": round(float(p50), 6),
+                "p90_seconds": round(float(p90), 6),
+                "p99_seconds": round(float(p99), 6),
+                "max_seconds": round(float(seconds.max()), 6),
+                "rows_per_second": round(rows / max(seconds.sum(), 1e-9)),
+            }
+        return {"stages": self.stages, "inference_latency": latency}
+
+    def write_chrome_trace(self, path):
+        """Write the stages and model calls in Chrome trace format.
+
+        Open the file in chrome://tracing or https://ui.perfetto.dev.
+        """
+        with open(path, "w") as f:
+            json.dump({"traceEvents": self._events, "displayTimeUnit": "ms"}, f)
+
+
+class NullProfiler(Profiler):
+    """Profiler that records nothing, used when profiling is off."""
+
+    @contextmanager
+    def stage(self, name: str, rows: int = None):
+        yield {"stage": name, "rows": rows}
+
+    def record_latency(self, model: str, start: float, seconds: float, rows: int):
+        pass
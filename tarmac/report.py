@@ -0,0 +1,196 @@
+import json
+import os
+from abc import ABC, abstractmethod
+from pathlib import Path
+import numpy as np
+
+
+def write_json(path, metadata: dict, rules):
+    """Write {"metadata": ..., "rules": [...]} one rule at a time.
+
+    The file is byte-for-byte what json.dump(..., indent=2) produces, but
+    rules can be any iterable, so the whole report never sits in memory.
+    """
+    with open(path, "w") as f:
+        f.write('{\n  "metadata": ')
+        f.write(json.dumps(metadata, indent=2).replace("\n", "\n  "))
+        f.write(',\n  "rules": [')
+        first = True
+        for rule in rules:
+            f.write("\n    " if first else ",\n    ")
+            f.write(json.dumps(rule, indent=2).replace("\n", "\n    "))
+            first = False
+        f.write("]\n}" if first else "\n  ]\n}")
+
+
+def write_ndjson(path, metadata: dict, rules):
+    """Write the metadata, then one rule per line (newline-delimited JSON)."""
+    with open(path, "w") as f:
+        f.write(json.dumps({"metadata": metadata}) + "\n")
+        for rule in rules:
+            f.write(json.dumps(rule) + "\n")
+
+
+def read_ndjson(path):
+    """Return (metadata, iterator over rules) of an NDJSON report.
+
+    The file is opened again by the iterator, only once it is used.
+    """
+    with open(path) as f:
+        metadata = json.loads(f.readline())["metadata"]
+
+    def rules():
+        with open(path) as f:
+            f.readline()
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    return metadata, rules()
+
+
+def rule_ids_by_node(explainer, rules) -> np.ndarray:
+    """Map every tree node to the 1-based ID of its rule (0 if it has none).
+
+    Rule IDs follow the order of rules, as in the JSON reports and in
+    `tarmac apply`.
+    """
+    ids = np.zeros(explainer.tree.tree_.node_count, dtype=np.int32)
+    for rule_id, rule in enumerate(rules, 1):
+        ids[rule["node"]] = rule_id
+    return ids
+
+
+class RowWriter(ABC):
+    """Writes per-row diff columns chunk by chunk."""
+
+    @abstractmethod
+    def write(self, columns: dict): ...
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class NpyBundleWriter(RowWriter):
+    """One memory-mappable .npy file per column in a directory.
+
+    Each file is created with its final shape on the first chunk and filled
+    in place, so chunks go straight to disk.
+    """
+
+    def __init__(self, directory, n_rows: int):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.n_rows = n_rows
+        self._arrays = {}
+        self._offset = 0
+
+    def write(self, columns: dict):
+        n = None
+        for name, values in columns.items():
+            values = np.asarray(values)
+            if name not in self._arrays:
+                if values.dtype.hasobject:
+                    values = values.astype(str)
+                    dtype = np.dtype(f"<U{max(values.dtype.itemsize // 4, 64)}")
+                else:
+                    dtype = values.dtype
+                self._arrays[name] = np.lib.format.open_memmap(
+                    self.directory / f"{name}.npy",
+                    mode="w+",
+                    dtype=dtype,
+                    shape=(self.n_rows,) + values.shape[1:],
+                )
+            target = self._arrays[name]
+            target[self._offset : self._offset + len(values)] = values
+            n = len(values)
+        self._offset += n or 0
+
+    def close(self):
+        for array in self._arrays.values():
+            array.flush()
+        self._arrays = {}
+
+
+class ParquetRowWriter(RowWriter):
+    """Parquet file with one row group per chunk (needs pyarrow)."""
+
+    def __init__(self, path):
+        import pyarrow.parquet as pq
+
+        self._pq = pq
+        self.path = path
+        self._writer = None
+
+    def write(self, columns: dict):
+        import pyarrow as pa
+
+        table = pa.table({name: np.asarray(v) for name, v in columns.items()})
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self.path, table.schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def open_row_writer(path, n_rows: int) -> RowWriter:
+    """Parquet for .parquet/.pq paths, a directory of .npy files otherwise."""
+    path = Path(path)
+    if path.suffix.lower() in {".parquet", ".pq"}:
+        return ParquetRowWriter(path)
+    if path.suffix:
+        raise ValueError(
+            f"Row artifacts go to a .parquet file or a directory, got {path.name}"
+        )
+    return NpyBundleWriter(path, n_rows)
+
+
+def write_rows(
+    writer: RowWriter,
+    explainer,
+    X,
+    columns: dict,
+    node_rule_ids,
+    chunk_size: int = 1 << 16,
+    source=None,
+):
+    """Stream the per-row view of a diff to writer.
+
+    Every chunk gets the origin of its rows, the given columns (e.g. both
+    predictions and the delta label), and the leaf and rule ID the
+    explainer's tree puts the row in. With source (a row_source array, see
+    tarmac.data), 'source' is the input each row was read from and 'index'
+    its row in that input; otherwise 'index' is the row's position in X.
+    """
+    for start in range(0, X.shape[0], chunk_size):
+        stop = min(start + chunk_size, X.shape[0])
+        leaves = explainer.tree.apply(X[start:stop])
+        if source is None:
+            chunk = {"index": np.arange(start, stop, dtype=np.int64)}
+        else:
+            chunk = {
+                "source": source[start:stop, 0].astype(np.int16),
+                "index": source[start:stop, 1],
+            }
+        chunk.update({name: values[start:stop] for name, values in columns.items()})
+        chunk["leaf"] = leaves.astype(np.int32)
+        chunk["rule_id"] = node_rule_ids[leaves]
+        writer.write(chunk)
+
+
+def load_rows(directory) -> dict:
+    """Memory-map the columns of an .npy bundle written by NpyBundleWriter."""
+    return {
+        Path(name).stem: np.load(os.path.join(directory, name), mmap_mode="r")
+        for name in sorted(os.listdir(directory))
+        if name.endswith(".npy")
+    }
@@ -0,0 +1,160 @@
+import json
+import re
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from .data import is_sparse
+
+_POSITIONAL = re.compile(r"feature_(\d+)$")
+_OPERATORS = {"<=": np.less_equal, ">": np.greater}
+
+
+class RuleSet:
+    """Rules compiled into vectorised mask programs.
+
+    Every distinct condition (feature, operator, threshold) is compiled to a
+    single comparison, evaluated once per chunk of rows however many rules
+    share it (rules from one tree share all their ancestors' conditions).
+    Each rule is then the AND of its condition masks. Rows are labelled with
+    the 1-based ID of the first rule they match, in file order, or 0.
+
+    A NaN feature value satisfies neither '<=' nor '>', so it matches no rule
+    testing that feature. Conditions are evaluated on their full-precision
+    'threshold_exact' when the rules have one, so rows land in the same
+    rule as in the tree that produced them; 'threshold' is rounded for display.
+
+    Conditions on categorical columns list the 'categories' they select
+    (the tree split on category codes) and test membership instead: '<='
+    conditions also hold for missing values, which are coded -1, and a
+    category unseen when the rules were made satisfies neither side.
+    """
+
+    def __init__(self, rules):
+        self.rules = list(rules)
+        self.features = []
+        literals = {}
+        self.programs = []
+        for rule in self.rules:
+            program = []
+            for condition in rule["conditions"]:
+                feature, op = condition["feature"], condition["operator"]
+                if op not in _OPERATORS:
+                    raise ValueError(f"Unsupported rule operator: {op}")
+                if feature not in self.features:
+                    self.features.append(feature)
+                threshold = condition.get("threshold_exact", condition["threshold"])
+                categories = condition.get("categories")
+                if categories is not None:
+                    key = (feature, op, tuple(categories))
+                else:
+                    key = (feature, op, float(threshold))
+                program.append(literals.setdefault(key, len(literals)))
+            self.programs.append(sorted(set(program)))
+        self.literals = sorted(literals, key=literals.get)
+
+    @classmethod
+    def from_json(cls, path: Path):
+        """Load the rules saved by `tarmac diff -o rules.json`.
+
+        A bare list of rule dictionaries is accepted as well.
+        """
+        with open(path) as f:
+            content = json.load(f)
+        if isinstance(content, dict):
+            if "rules" not in content:
+                raise ValueError(f"No 'rules' found in {path}")
+            content = content["rules"]
+        return cls(content)
+
+    def __len__(self):
+        return len(self.rules)
+
+    @property
+    def positional(self):
+        """Whether every feature is an unnamed 'feature_<i>' column."""
+        return all(_POSITIONAL.match(str(f)) for f in self.features)
+
+    def columns(self, feature_names=None):
+        """Column index of every rule feature in data with these names.
+
+        Without names, 'feature_<i>' is column i.
+        """
+        if feature_names is not None:
+            feature_names = list(feature_names)
+            missing = [f for f in self.features if f not in feature_names]
+            if missing:
+                raise ValueError(f"Features used by the rules are missing: {missing}")
+            return [feature_names.index(f) for f in self.features]
+        if not self.positional:
+            raise ValueError(
+                "The rules use named features: pass the data's feature names"
+            )
+        return [int(_POSITIONAL.match(str(f)).group(1)) for f in self.features]
+
+    def apply(self, X, feature_names=None, chunk_size: int = 1 << 16) -> np.ndarray:
+        """Label every row of X with the ID of the first rule it matches.
+
+        Args:
+            X: 2D array, DataFrame or scipy.sparse matrix
+            feature_names: Column names of X (read from a DataFrame's columns)
+            chunk_size: Rows evaluated at a time, so masks stay in cache
+
+        Returns:
+            int32 array with a 1-based rule ID per row, 0 when no rule matches
+        """
+        if feature_names is None and hasattr(X, "columns"):
+            names = list(X.columns)
+            # positional rules only use names when X has them all
+            if not self.positional or set(self.features) <= set(names):
+                feature_names = names
+        columns = self.columns(feature_names)
+        sparse = is_sparse(X)
+        if not sparse:
+            X = np.asarray(X)
+        literals = [
+            (columns[self.features.index(f)], op, t) for f, op, t in self.literals
+        ]
+        coded = {col for col, _, t in literals if isinstance(t, tuple)}
+
+        labels = np.zeros(X.shape[0], dtype=np.int32)
+        for start in range(0, X.shape[0], chunk_size):
+            chunk = X[start : start + chunk_size]
+            if sparse:
+                chunk = chunk.tocsc()  # cheap column slices
+            n = chunk.shape[0]
+            masks = np.empty((len(literals), n), dtype=bool)
+            values = {}
+            for i, (col, op, threshold) in enumerate(literals):
+                if col not in values:
+                    column = chunk[:, col]
+                    if sparse:  # only the columns the rules test are densified
+                        column = column.toarray().ravel()
+                    if col in coded:
+                        values[col] = pd.Series(column)
+                    else:
+                        values[col] = np.ascontiguousarray(column, np.float64)
+                if isinstance(threshold, tuple):
+                    masks[i] = values[col].isin(threshold).to_numpy()
+                    if op == "<=":
+                        masks[i] |= values[col].isna().to_numpy()
+                else:
+                    _OPERATORS[op](values[col], threshold, out=masks[i])
+
+            out = labels[start : start + n]
+            match = np.empty(n, dtype=bool)
+            # later rules first, so the first matching rule is written last
+            for rule_id in range(len(self.programs), 0, -1):
+                program = self.programs[rule_id - 1]
+                if not program:
+                    out[:] = rule_id
+                    continue
+                np.copyto(match, masks[program[0]])
+                for literal in program[1:]:
+                    match &= masks[literal]
+                out[match] = rule_id
+        return labels
+
+    def counts(self, labels) -> np.ndarray:
+        """Rows matched by each rule, index 0 counting unmatched rows."""
+        return np.bincount(labels, minlength=len(self) + 1)
@@ -0,0 +1,266 @@
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+import numpy as np
+
+from .adapters import get_adapter, release_adapter, shared_feature_names
+from .data import load_eval_data
+from .pipeline import diff_many
+
+
+class AdapterPool:
+    """Keep loaded adapters in memory between requests.
+
+    Adapters come from get_adapter, so a model file that changed is reloaded.
+    At most max_models are kept, the least recently used being released first.
+    """
+
+    def __init__(self, max_models: int = 8, mmap_dir=None):
+        self.max_models = max_models
+        self.mmap_dir = mmap_dir
+        self._adapters = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, model_path):
+        path = str(Path(model_path).resolve())
+        adapter = get_adapter(path, self.mmap_dir)
+        with self._lock:
+            self._adapters[path] = adapter
+            self._adapters.move_to_end(path)
+            while len(self._adapters) > self.max_models:
+                release_adapter(self._adapters.popitem(last=False)[0])
+        return adapter
+
+    def paths(self) -> list:
+        with self._lock:
+            return list(self._adapters)
+
+
+class MicroBatcher:
+    """Coalesce concurrent small predict requests into batched calls.
+
+    A worker thread takes the first queued request, then waits at most
+    max_delay seconds for more until max_batch rows are gathered, and scores
+    them all with one predict call per adapter. Requests are checked on
+    submit against the adapters' number of features (or, when the adapters
+    do not record it, the first request's), so one malformed request is
+    rejected alone instead of failing the batch it would join.
+    """
+
+    def __init__(self, adapters, max_batch: int = 4096, max_delay: float = 0.005):
+        self.adapters = list(adapters)
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.n_batches = 0
+        known = [a.n_features for a in self.adapters if a.n_features is not None]
+        self.n_features = known[0] if known else None
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, X) -> Future:
+        """Queue rows; the future resolves to one prediction array per adapter."""
+        if self._closed:
+            raise RuntimeError("MicroBatcher is closed")
+        X = np.atleast_2d(np.asarray(X))
+        if X.ndim != 2 or X.dtype.kind not in "biuf":
+            raise ValueError("Rows must be a list of numeric rows")
+        with self._lock:
+            if self.n_features is None:
+                self.n_features = X.shape[1]
+        if X.shape[1] != self.n_features:
+            raise ValueError(
+                f"Rows have {X.shape[1]} features, the models expect {self.n_features}"
+            )
+        future = Future()
+        self._queue.put((X, future))
+        return future
+
+    def predict(self, X) -> list:
+        return self.submit(X).result()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch, rows = [item], len(item[0])
+            deadline = time.monotonic() + self.max_delay
+            while rows < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)  # stop after this batch
+                    break
+                batch.append(item)
+                rows += len(item[0])
+            self._flush(batch)
+
+    def _flush(self, batch):
+        futures = [future for _, future in batch]
+        try:
+            X = np.concatenate([rows for rows, _ in batch])
+            preds = [adapter.predict(X) for adapter in self.adapters]
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+        self.n_batches += 1
+        stops = np.cumsum([len(rows) for rows, _ in batch])
+        for future, stop, size in zip(futures, stops, (len(r) for r, _ in batch)):
+            future.set_result([p[stop - size : stop] for p in preds])
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join()
+
+
+def create_app(
+    pool=None,
+    max_batch=4096,
+    max_delay=0.005,
+    cache=None,
+    model_dir=None,
+    data_dir=None,
+):
+    """Build the Flask app behind `tarmac serve`.
+
+    Clients name models and data files by path, and loading a model runs
+    the code pickled in it. Only the models already in pool when the app is
+    built (--preload) and the models under model_dir are served, and only
+    data files under data_dir are read; other paths get a 400. Relative
+    paths are taken relative to those directories.
+
+    Endpoints:
+        GET /health: Loaded models
+        POST /disagree: {"model_a", "model_b", "rows", "epsilon"?} gives both
+            predictions and whether they differ for each row. Concurrent
+            requests for the same pair of models are scored in one batch.
+        POST /diff: {"model_a", "model_b"} plus either "rows" or the data
+            options of `tarmac diff` ("sampling", "data", "Xa", "ya", "Xb",
+            "yb", "split", "test_size"), and optionally "task", "epsilon",
+            "min_samples_leaf" and "engine". Returns the same JSON as `tarmac diff -o rules.json`.
+    """
+    from flask import Flask, jsonify, request
+
+    app = Flask("tarmac")
+    pool = pool or AdapterPool()
+    preloaded = set(pool.paths())
+    batchers = {}
+    lock = threading.Lock()
+
+    def allowed_path(name, directory, kind):
+        path = Path(name)
+        candidates = [path.resolve()]
+        if directory is not None:
+            directory = Path(directory).resolve()
+            candidates.append((directory / path).resolve())
+        for candidate in candidates:
+            if kind == "model" and str(candidate) in preloaded:
+                return candidate
+            if directory is not None and candidate.is_relative_to(directory):
+                return candidate
+        raise ValueError(f"{kind.capitalize()} {name} is not served")
+
+    def model(name):
+        return pool.get(allowed_path(name, model_dir, "model"))
+
+    def batcher_for(path_a, path_b):
+        adapters = (model(path_a), model(path_b))
+        with lock:
+            key = (str(path_a), str(path_b))
+            batcher = batchers.get(key)
+            if batcher is None or tuple(batcher.adapters) != adapters:
+                if batcher is not None:
+                    batcher.close()
+                batcher = MicroBatcher(adapters, max_batch, max_delay)
+                batchers[key] = batcher
+            return batcher
+
+    @app.errorhandler(ValueError)
+    @app.errorhandler(KeyError)
+    @app.errorhandler(OSError)
+    def bad_request(e):
+        return jsonify({"error": str(e)}), 400
+
+    @app.get("/health")
+    def health():
+        return jsonify({"status": "ok", "models": pool.paths()})
+
+    @app.post("/disagree")
+    def disagree():
+        payload = request.get_json(force=True)
+        batcher = batcher_for(payload["model_a"], payload["model_b"])
+        preds_a, preds_b = batcher.predict(payload["rows"])
+        if preds_a.dtype.kind in "f":
+            # a single row has no range to be relative to: epsilon is absolute
+            differs = np.abs(preds_a - preds_b) > payload.get("epsilon", 0.05)
+        else:
+            differs = preds_a != preds_b
+        return jsonify(
+            {
+                "disagree": differs.tolist(),
+                "prediction_a": preds_a.tolist(),
+                "prediction_b": preds_b.tolist(),
+            }
+        )
+
+    @app.post("/diff")
+    def diff():
+        payload = request.get_json(force=True)
+        models = [model(payload["model_a"]), model(payload["model_b"])]
+        if "rows" in payload:
+            X = np.asarray(payload["rows"])
+        else:
+            paths = [
+                allowed_path(payload[k], data_dir, "data") if payload.get(k) else None
+                for k in ("Xa", "ya", "Xb", "yb")
+            ]
+            X = load_eval_data(
+                payload.get("sampling", "builtin"),
+                payload.get("data", "iris"),
+                *paths,
+                feature_columns=shared_feature_names(*models),
+                split=payload.get("split", "holdout"),
+                test_size=payload.get("test_size", 0.4),
+            )
+
+        epsilon = payload.get("epsilon", 0.05)
+        min_samples_leaf = payload.get("min_samples_leaf", 0.01)
+        result = diff_many(
+            X,
+            models,
+            task=payload.get("task", "auto"),
+            epsilon=epsilon,
+            min_leaf=min_samples_leaf,
+            engine=payload.get("engine", "exact"),
+            cache=cache,
+        )
+        rules = result["explainers"][0].explain(return_dict=True)
+        return jsonify(
+            {
+                "metadata": {
+                    "total_rules": len(rules),
+                    "task": result["task"],
+                    "epsilon": epsilon if result["task"] == "regression" else None,
+                    "dataset_size": len(X),
+                    "min_samples_leaf": min_samples_leaf,
+                    "disagreement_rate": float(result["delta_labels"][0].mean()),
+                },
+                "rules": rules,
+            }
+        )
+
+    return app
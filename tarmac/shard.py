@@ -0,0 +1,133 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from .data import (
+    RowDeduplicator,
+    _take_rows,
+    expand_paths,
+    hash_rows,
+    load_dataset,
+    load_table,
+    row_source,
+)
+
+_worker_state = None
+
+
+def _init_worker(sources, feature_columns):
+    global _worker_state
+    from .adapters import get_adapter
+
+    models = [get_adapter(path, mmap_dir) for path, mmap_dir in sources]
+    _worker_state = (models, feature_columns)
+
+
+def _score_in_worker(shard):
+    return _score_shard(shard, *_worker_state)
+
+
+def _score_shard(shard, models, feature_columns):
+    """Load one shard, drop its repeated rows and score the rest with every model."""
+    x_path, y_path = shard
+    X = load_dataset(x_path, feature_columns)
+    n_rows = X.shape[0]
+    keys = hash_rows(X)
+    _, first = np.unique(keys, return_index=True)
+    first.sort()
+    X, keys = X[first], keys[first]
+    y = None if y_path is None else np.asarray(load_table(y_path))[first]
+    preds = [m.predict(X) for m in models]
+    return {
+        "keys": keys,
+        "n_rows": n_rows,
+        "rows": first,
+        "X": X,
+        "y": y,
+        "preds": preds,
+    }
+
+
+def pair_shards(X_path, y_path=None) -> list:
+    """(features, targets) file pairs of a sharded dataset, matched in sorted order."""
+    x_paths = expand_paths(X_path)
+    if y_path is None:
+        return [(x, None) for x in x_paths]
+    y_paths = expand_paths(y_path)
+    if len(y_paths) != len(x_paths):
+        raise ValueError(
+            f"{X_path} has {len(x_paths)} feature shards but {y_path} has "
+            f"{len(y_paths)} target shards"
+        )
+    return list(zip(x_paths, y_paths))
+
+
+def score_shards(
+    shards, model_a, model_b, feature_columns=None, jobs=1, mmap_dir=None, inputs=None
+):
+    """Union and score a dataset stored as many files, one shard per task.
+
+    Every shard is loaded, deduplicated and scored by both models in a
+    worker process that loads the models once (jobs of them, 0 for every
+    CPU). Workers send back only the compact rows they kept, their hash
+    keys and both models' predictions. The parent then drops rows already
+    seen in an earlier shard, keeping the first occurrence of every row in
+    shard order like union_datasets, so delta labels and regression
+    thresholds are computed on exactly the rows an in-memory union holds.
+    Rows repeated across shards are scored once per shard they appear in.
+
+    Args:
+        shards: (features, targets) paths, see pair_shards; targets may be None
+        model_a: Path to the first model
+        model_b: Path to the second model
+        feature_columns: Columns to read from the feature files
+        jobs: Number of worker processes
+        mmap_dir: Optional directory of memory-mapped model copies
+        inputs: Input number of every shard, e.g. 0 for the shards of --Xa
+            and 1 for those of --Xb (all 0 by default)
+
+    Returns:
+        tuple(X, y, preds_a, preds_b, source); y is None unless every shard
+        has targets, and source is the row_source of the rows: their input
+        and their row in the input's shards stacked in the order given
+    """
+    sources = [(str(model_a), mmap_dir), (str(model_b), mmap_dir)]
+    jobs = min(jobs or os.cpu_count() or 1, len(shards))
+
+    if jobs == 1:
+        from .adapters import get_adapter
+
+        models = [get_adapter(path, mmap_dir) for path, mmap_dir in sources]
+        results = [_score_shard(shard, models, feature_columns) for shard in shards]
+    else:
+        with ProcessPoolExecutor(
+            jobs, initializer=_init_worker, initargs=(sources, feature_columns)
+        ) as pool:
+            results = list(pool.map(_score_in_worker, shards))
+
+    dedup = RowDeduplicator()
+    masks = [dedup.update_keys(result["keys"]) for result in results]
+    X = _take_rows([result["X"] for result in results], masks)
+    # workers dropped repeats within their shard: map back to input rows
+    inputs = [0] * len(shards) if inputs is None else list(inputs)
+    offsets, seen = [], {}
+    for number, result in zip(inputs, results):
+        offsets.append(seen.get(number, 0))
+        seen[number] = offsets[-1] + result["n_rows"]
+    source = row_source(masks, inputs)
+    source[:, 1] = np.concatenate(
+        [
+            result["rows"][mask] + offset
+            for result, mask, offset in zip(results, masks, offsets)
+        ]
+    )
+    y = None
+    if all(result["y"] is not None for result in results):
+        y = _take_rows([result["y"] for result in results], masks)
+    preds_a, preds_b = (
+        np.concatenate(
+            [result["preds"][k][mask] for result, mask in zip(results, masks)]
+        )
+        for k in range(2)
+    )
+    return X, y, preds_a, preds_b, source
@@ -0,0 +1,107 @@
+from sklearn.datasets import make_classification
+from sklearn.linear_model import LogisticRegression
+from sklearn.ensemble import RandomForestClassifier
+import joblib
+import os
+import tempfile
+import pathlib
+import numpy as np
+import pytest
+
+from tarmac.adapters import InferenceExecutor, PredictionCache, get_adapter
+
+
+@pytest.fixture(scope="module")
+def fitted_models():
+    X, y = make_classification(n_samples=500, n_features=8, random_state=0)
+    p = pathlib.Path(tempfile.mkdtemp())
+    joblib.dump(LogisticRegression(max_iter=300).fit(X, y), p / "lr.pkl")
+    joblib.dump(RandomForestClassifier(n_estimators=10).fit(X, y), p / "rf.pkl")
+    return X, [get_adapter(p / "lr.pkl"), get_adapter(p / "rf.pkl")]
+
+
+@pytest.mark.parametrize("backend", ["thread", "process"])
+def test_executor_matches_sequential(fitted_models, backend):
+    X, adapters = fitted_models
+    expected = [adapter.predict(X) for adapter in adapters]
+
+    with InferenceExecutor(adapters, jobs=3, backend=backend, chunk_size=77) as pool:
+        preds = pool.predict(X)
+
+    assert len(preds) == 2
+    for got, want in zip(preds, expected):
+        np.testing.assert_array_equal(got, want)
+
+
+def test_prediction_cache_skips_known_models(fitted_models, tmp_path):
+    X, adapters = fitted_models
+    cache = PredictionCache(tmp_path / "cache")
+
+    first = InferenceExecutor(adapters, cache=cache).predict(X)
+    assert len(list((tmp_path / "cache").glob("*.npy"))) == 2
+
+    class Unscorable:
+        path = adapters[0].path
+
+        def predict(self, X):
+            raise AssertionError("cached predictions should have been reused")
+
+    second = InferenceExecutor([Unscorable(), adapters[1]], cache=cache).predict(X)
+    np.testing.assert_array_equal(second[0], first[0])
+    assert isinstance(second[0], np.memmap)
+
+
+def test_prediction_cache_evicts_least_recently_used(tmp_path):
+    cache = PredictionCache(tmp_path, max_bytes=3000)
+    for i in range(4):
+        cache.put(f"entry{i}", np.zeros(200))
+        os.utime(tmp_path / f"entry{i}.npy", (i, i))
+
+    cache.evict()
+    assert cache.get("entry0") is None
+    assert cache.get("entry3") is not None
+
+
+def test_adapters_are_shared_and_memory_mapped(fitted_models, tmp_path):
+    X, adapters = fitted_models
+    path = adapters[0].path
+    assert get_adapter(path) is adapters[0]
+
+    model_dir = tmp_path / "models"
+    mapped = get_adapter(path, model_dir)
+    assert mapped is not adapters[0]
+    assert get_adapter(path, model_dir) is mapped
+    assert isinstance(mapped.model.coef_, np.memmap)
+    assert len(list(model_dir.glob("*.joblib"))) == 1
+    np.testing.assert_array_equal(mapped.predict(X), adapters[0].predict(X))
+
+    with InferenceExecutor([mapped], jobs=2, backend="process") as pool:
+        np.testing.assert_array_equal(pool.predict(X)[0], adapters[0].predict(X))
+
+
+def test_labels_and_probabilities_in_one_pass(tmp_path):
+    from sklearn.linear_model import RidgeClassifier
+
+    X, y = make_classification(
+        n_samples=300, n_features=6, n_informative=4, n_classes=3, random_state=0
+    )
+    y = np.array(["cat", "dog", "eel"])[y]
+    joblib.dump(LogisticRegression(max_iter=500).fit(X, y), tmp_path / "lr.pkl")
+    joblib.dump(RidgeClassifier().fit(X, y), tmp_path / "ridge.pkl")
+    lr, ridge = get_adapter(tmp_path / "lr.pkl"), get_adapter(tmp_path / "ridge.pkl")
+
+    labels, proba = lr.predict_with_proba(X)
+    assert proba.shape == (300, 3)
+    np.testing.assert_array_equal(labels, lr.model.classes_[proba.argmax(axis=1)])
+
+    # no predict_proba: one-hot over the string classes
+    labels, proba = ridge.predict_with_proba(X)
+    np.testing.assert_array_equal(labels, ridge.predict(X))
+    np.testing.assert_array_equal(proba, ridge.predict_proba(X))
+    assert proba.shape == (300, 3) and (proba.sum(axis=1) == 1).all()
+    np.testing.assert_array_equal(ridge.model.classes_[proba.argmax(axis=1)], labels)
+
+    with InferenceExecutor([lr, ridge], jobs=2, chunk_size=64) as pool:
+        (labels_a, proba_a), (labels_b, _) = pool.predict(X, "predict_with_proba")
+    np.testing.assert_array_equal(proba_a, lr.predict_proba(X))
+    np.testing.assert_array_equal(labels_b, ridge.predict(X))
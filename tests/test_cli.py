@@ -7,3 +7,40 @@ def test_version():
     result = runner.invoke(app, ["--version"])
     assert "Tarmac v0.1-dev" in result.stdout
     assert result.exit_code == 0
+
+
+def test_startup_imports_stay_light():
+    """`tarmac --version` must not pay for the scientific stack."""
+    import subprocess
+    import sys
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "tarmac.cli", "--version"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert "Tarmac v0.1-dev" in result.stdout
+
+    modules, total_us = set(), 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        modules.add(name.strip())
+        if not name.startswith("  "):  # one space of padding: top-level import
+            total_us += int(cumulative)
+
+    heavy = {"numpy", "pandas", "sklearn", "scipy", "joblib", "flask"}
+    assert not heavy & modules
+    assert total_us < 1_000_000  # 1s budget, well above the ~0.1s it takes
+
+
+def test_shared_options():
+    runner = CliRunner()
+    for args in (["diff", "a.pkl", "b.pkl"], ["diff-many", "a.pkl"], ["log", "m"]):
+        res = runner.invoke(app, [*args, "--engine", "forest"])
+        assert res.exit_code == 2 and "Unknown explainer engine" in res.output
+    for command in ("diff", "diff-many", "log", "serve"):
+        res = runner.invoke(app, [command, "--help"])
+        assert "--model-cache-dir" in res.output
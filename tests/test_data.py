@@ -0,0 +1,251 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tarmac.data import (
+    Dataset,
+    RowDeduplicator,
+    adaptive_sample,
+    expand_paths,
+    iter_table,
+    load_dataset,
+    load_table,
+    numeric_chunk,
+    union_datasets,
+)
+
+
+def test_load_npy_is_memory_mapped(tmp_path):
+    X = np.arange(20.0).reshape(5, 4)
+    np.save(tmp_path / "X.npy", X)
+
+    data = load_table(tmp_path / "X.npy")
+    assert isinstance(data, np.memmap)
+    np.testing.assert_array_equal(data, X)
+    np.testing.assert_array_equal(load_table(tmp_path / "X.npy", [3, 1]), X[:, [3, 1]])
+
+
+def test_load_npz_member(tmp_path):
+    X = np.arange(6.0).reshape(3, 2)
+    np.savez(tmp_path / "data.npz", X=X, y=np.arange(3))
+    np.testing.assert_array_equal(load_table(tmp_path / "data.npz"), X)
+    np.testing.assert_array_equal(
+        load_table(tmp_path / "data.npz", member="y"), np.arange(3)
+    )
+
+
+def test_csv_reads_only_requested_columns(tmp_path):
+    df = pd.DataFrame({"a": [1, 2], "b": [3, 4], "c": [5, 6]})
+    df.to_csv(tmp_path / "X.csv", index=False)
+
+    values = load_table(tmp_path / "X.csv", ["c", "a"], dtype="float32")
+    assert values.dtype == np.float32
+    np.testing.assert_array_equal(values, [[5, 1], [6, 2]])
+    np.testing.assert_array_equal(load_table(tmp_path / "X.csv", [2, 0]), values)
+
+    chunks = list(iter_table(tmp_path / "X.csv", 1, ["c", "a"]))
+    np.testing.assert_array_equal(np.vstack(chunks), values)
+
+
+def test_parquet_column_pruning(tmp_path):
+    pytest.importorskip("pyarrow")
+    df = pd.DataFrame({"a": [1.0, 2.0], "b": [3.0, 4.0], "c": [5.0, 6.0]})
+    df.to_parquet(tmp_path / "X.parquet")
+
+    np.testing.assert_array_equal(
+        load_table(tmp_path / "X.parquet", ["b"]), [[3.0], [4.0]]
+    )
+    chunks = list(iter_table(tmp_path / "X.parquet", 1, ["c", "a"]))
+    np.testing.assert_array_equal(np.vstack(chunks), [[5.0, 1.0], [6.0, 2.0]])
+
+
+def test_sharded_paths(tmp_path):
+    X = np.arange(40.0).reshape(10, 4)
+    for i, start in enumerate(range(0, 10, 4)):
+        np.save(tmp_path / f"part-{i}.npy", X[start : start + 4])
+    (tmp_path / "notes.txt").write_text("not data")
+    (tmp_path / ".part-9.npy").write_text("hidden")
+
+    shards = [tmp_path / f"part-{i}.npy" for i in range(3)]
+    assert expand_paths(tmp_path) == shards
+    assert expand_paths(tmp_path / "part-[01].npy") == shards[:2]
+    assert expand_paths(tmp_path / "X.csv") == [tmp_path / "X.csv"]
+    with pytest.raises(ValueError, match="No data files"):
+        expand_paths(tmp_path / "*.parquet")
+
+    np.testing.assert_array_equal(load_table(tmp_path), X)
+    np.testing.assert_array_equal(load_dataset(tmp_path / "part-*.npy", [1]), X[:, [1]])
+    np.testing.assert_array_equal(np.vstack(list(iter_table(tmp_path, 3))), X)
+
+
+def test_union_matches_sorting_dedup():
+    rng = np.random.default_rng(0)
+    X_a = rng.integers(0, 3, (400, 3)).astype(float)
+    X_b = rng.integers(0, 3, (400, 3)).astype(float)
+    X_b[0, 0] = -0.0
+    y_a, y_b = np.arange(400), np.arange(400, 800)
+
+    X_combined = np.vstack([X_a, X_b])
+    idx = np.sort(np.unique(X_combined, axis=0, return_index=True)[1])
+
+    for bits in (64, 128):
+        dedup = RowDeduplicator(bits)
+        mask = np.concatenate([dedup.update(X_a[:150]), dedup.update(X_a[150:])])
+        assert mask.sum() == len(np.unique(X_a, axis=0))
+
+    X_union, y_union = union_datasets(X_a, X_b, y_a, y_b, chunk_size=64)
+    np.testing.assert_array_equal(X_union, X_combined[idx])
+    np.testing.assert_array_equal(y_union, np.concatenate([y_a, y_b])[idx])
+
+
+def test_union_of_mixed_dtypes():
+    A = np.array([[1, 2], [3, 4], [1, 2]])
+    X, y = union_datasets(
+        A.astype(np.float32), A.astype(np.float64), np.array([0, 1, 0]), np.ones(3)
+    )
+    assert X.dtype == np.float64 and y.dtype == np.float64
+    np.testing.assert_array_equal(X, [[1, 2], [3, 4]])
+    np.testing.assert_array_equal(y, [0, 1])
+
+    X = union_datasets(A, np.array([[1.0, 2.0], [5.5, 6.0]]))
+    np.testing.assert_array_equal(X, [[1, 2], [3, 4], [5.5, 6]])
+
+
+def test_union_of_table_and_array():
+    X = Dataset.from_frame(pd.DataFrame({"a": [1, 2, 3], "b": [0.5, 1.5, 2.5]}))
+    other = np.array([[3.0, 2.5], [4.0, 0.5]])
+    union = union_datasets(X, other)
+    assert isinstance(union, Dataset) and union.feature_names == ["a", "b"]
+    np.testing.assert_array_equal(
+        union.to_numpy(), [[1, 0.5], [2, 1.5], [3, 2.5], [4, 0.5]]
+    )
+
+
+def test_union_of_tables_with_different_int_widths(tmp_path):
+    pd.DataFrame({"a": [1, 2, 3]}).to_csv(tmp_path / "a.csv", index=False)
+    pd.DataFrame({"a": [1, 2, 10**10]}).to_csv(tmp_path / "b.csv", index=False)
+    pd.DataFrame({"a": [1.0, np.nan, 1e10]}).to_csv(tmp_path / "c.csv", index=False)
+    A, B, C = (load_dataset(tmp_path / f"{name}.csv") for name in "abc")
+    assert A.columns["a"].dtype == np.int8 and B.columns["a"].dtype == np.int64
+    assert len(union_datasets(A, B)) == 4
+    assert len(union_datasets(B, C)) == 4
+    big = Dataset({"a": np.array([2**63 - 1, 2**62 + 1, 2**62])})
+    assert len(union_datasets(big, Dataset({"a": np.array([2.0**62])}))) == 3
+
+    dedup = RowDeduplicator()
+    for path in ("a.csv", "b.csv"):
+        for chunk in iter_table(tmp_path / path, 2):
+            dedup.update(chunk)
+    assert sum(len(run) for run in dedup._runs) == 4
+
+
+def test_union_of_mixed_type_rows():
+    X = np.array([[1, "a"], [1, "a"], [2, "b"]], dtype=object)
+    assert union_datasets(X, X[::-1]).tolist() == [[1, "a"], [2, "b"]]
+
+
+def test_adaptive_sample_targets_disagreement():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(20000, 4))
+    disagree = (X[:, 0] > 1.5).astype(int)  # ~7% of the pool
+    scored = []
+
+    def score(rows):
+        scored.append(len(rows))
+        return (rows[:, 0] > 1.5).astype(int)
+
+    idx, weights = adaptive_sample(X, score, budget=1000, seed=0)
+
+    assert sum(scored) == len(idx) == len(np.unique(idx)) == 1000
+    assert disagree[idx].mean() > 3 * disagree.mean()
+    estimate = np.average(disagree[idx], weights=weights)
+    assert abs(estimate - disagree.mean()) < 0.03
+
+
+def test_sparse_load_and_union(tmp_path):
+    from scipy import sparse
+
+    rng = np.random.default_rng(0)
+    dense = rng.integers(0, 3, size=(300, 40)) * (rng.random((300, 40)) < 0.05)
+    dense = np.vstack([dense, dense[:50]]).astype(float)
+    X = sparse.csr_matrix(dense)
+    sparse.save_npz(tmp_path / "X.npz", X)
+
+    loaded = load_table(tmp_path / "X.npz", feature_columns=[0, 3])
+    assert sparse.isspmatrix_csr(loaded)
+    np.testing.assert_array_equal(loaded.toarray(), dense[:, [0, 3]])
+
+    # same rows as the dense union, without densifying
+    X_a, X_b, dense_a = X[:200], X[150:], dense[:200].copy()
+    X_a.data[0] = -0.0  # a stored zero hashes like a missing entry
+    dense_a[0, X_a.indices[0]] = 0
+    union = union_datasets(X_a, X_b)
+    assert sparse.issparse(union)
+    expected = union_datasets(dense_a, dense[150:])
+    np.testing.assert_array_equal(union.toarray(), expected)
+
+
+def test_dataset_compact_columns(tmp_path):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        {
+            "age": rng.integers(18, 90, 500),
+            "income": rng.normal(5e4, 1e4, 500),
+            "half": rng.integers(0, 8, 500) / 2,
+            "city": rng.choice(["paris", "lyon", "nice"], 500),
+        }
+    )
+    df.to_csv(tmp_path / "a.csv", index=False)
+    df.iloc[::-1].to_csv(tmp_path / "b.csv", index=False)
+
+    X = load_dataset(tmp_path / "a.csv", ["city", "age", "half", "income"])
+    assert X.feature_names == ["city", "age", "half", "income"]
+    assert [X.columns[c].dtype for c in X.feature_names] == [
+        np.int8,
+        np.int8,
+        np.float32,  # exact in float32
+        np.float64,
+    ]
+    np.testing.assert_array_equal(
+        X.to_numpy(), load_table(tmp_path / "a.csv", X.feature_names)
+    )
+    frame = X[10:20].to_frame(codes=True)
+    assert np.shares_memory(frame["age"].to_numpy(), X.columns["age"])
+
+    # same rows with other category codes: the union keeps one of each
+    other = pd.read_csv(tmp_path / "b.csv")[X.feature_names]
+    other = Dataset.from_frame(other[other.city != "lyon"].iloc[:100])
+    assert list(other.categories["city"]) == ["nice", "paris"]
+    union = union_datasets(X, other)
+    assert isinstance(union, Dataset) and len(union) == 500
+    np.testing.assert_array_equal(union.to_numpy(), X.to_numpy())
+
+
+def test_split_rows():
+    from sklearn.model_selection import train_test_split
+
+    from tarmac.data import split_rows
+
+    y = np.repeat([0, 1, 2], [80, 15, 5])
+    _, held_out = train_test_split(np.arange(100), test_size=0.4, random_state=0)
+    np.testing.assert_array_equal(split_rows(100), np.sort(held_out))
+    assert split_rows(100, split="full") is None
+
+    rows = split_rows(100, y, split="stratified", test_size=0.2)
+    assert np.bincount(y[rows]).tolist() == [16, 3, 1]
+    with pytest.raises(ValueError, match="targets"):
+        split_rows(100, split="stratified")
+
+
+def test_streamed_tables_keep_codes_consistent(tmp_path):
+    df = pd.DataFrame({"city": ["paris", "lyon", None, "nice", "lyon"], "n": range(5)})
+    df.to_csv(tmp_path / "X.csv", index=False)
+    chunks = list(iter_table(tmp_path / "X.csv", 2))
+    assert all(isinstance(chunk, Dataset) for chunk in chunks)
+
+    categories = {}
+    frames = [numeric_chunk(chunk, categories) for chunk in chunks]
+    assert categories == {"city": ["lyon", "paris", "nice"]}
+    codes = np.concatenate([frame["city"].to_numpy() for frame in frames])
+    np.testing.assert_array_equal(codes, [1, 0, -1, 2, 0])
+    assert frames[-1].attrs["categories"] is categories
@@ -2,6 +2,8 @@ from sklearn.datasets import load_iris, make_classification
 from sklearn.linear_model import LogisticRegression
 from sklearn.ensemble import RandomForestClassifier
 import joblib
+import json
+import numpy as np
 import tempfile
 import pathlib
 from tarmac.cli import app
@@ -10,6 +12,7 @@ import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.neural_network import MLPClassifier
 import warnings
+import pytest
 
 
 def test_classif():
@@ -142,3 +145,360 @@ def test_classification_with_custom_data():
     assert "Model Difference Analysis" in res_uf.stdout
     assert "explaining model differences:" in res_uf.stdout
     assert res_txt.stdout.count("IF") > 1  # Ensure multiple rules
+
+
+def test_chunked_matches_in_memory():
+    X, y = load_iris(return_X_y=True)
+    lr = LogisticRegression(max_iter=300).fit(X, y)
+    rf = RandomForestClassifier(random_state=0).fit(X, y)
+    p = pathlib.Path(tempfile.mkdtemp())
+    joblib.dump(lr, p / "lr.pkl")
+    joblib.dump(rf, p / "rf.pkl")
+
+    runner = CliRunner()
+    args = ["diff", str(p / "lr.pkl"), str(p / "rf.pkl"), "--data", "iris"]
+    res = runner.invoke(app, args)
+    res_chunked = runner.invoke(app, args + ["--chunk-size", "7"])
+    assert res_chunked.exit_code == 0
+    assert res_chunked.stdout == res.stdout
+
+
+def test_streaming_union_without_targets():
+    X, y = make_classification(n_samples=600, n_features=6, random_state=0)
+    lr = LogisticRegression(max_iter=300).fit(X, y)
+    rf = RandomForestClassifier(n_estimators=20, random_state=0).fit(X, y)
+    p = pathlib.Path(tempfile.mkdtemp())
+    joblib.dump(lr, p / "lr.pkl")
+    joblib.dump(rf, p / "rf.pkl")
+    pd.DataFrame(X[:300]).to_csv(p / "Xa.csv", index=False)
+    # 50 rows in both files, as the CSV parser reads them
+    parsed = pd.read_csv(p / "Xa.csv").to_numpy()
+    np.save(p / "Xb.npy", np.vstack([parsed[250:], X[300:]]))
+
+    args = [
+        "diff",
+        str(p / "lr.pkl"),
+        str(p / "rf.pkl"),
+        "--sampling",
+        "union",
+        "--Xa",
+        str(p / "Xa.csv"),
+        "--Xb",
+        str(p / "Xb.npy"),
+        "-o",
+        str(p / "out.json"),
+    ]
+    # streamed, then loaded whole: a CSV table and an .npy array
+    for options in (
+        ["--chunk-size", "64"],
+        ["--chunk-size", "64", "--split", "full"],
+        ["--split", "full"],
+    ):
+        res = CliRunner().invoke(app, args + options)
+        assert res.exit_code == 0, res.stdout
+        metadata = json.loads((p / "out.json").read_text())["metadata"]
+        assert metadata["dataset_size"] == 600
+
+    # streamed rows are neither split nor matched to targets
+    np.save(p / "y.npy", np.zeros(300))
+    for options in (["--split", "holdout"], ["--test-size", "0.2"], ["--ya", "y.npy"]):
+        res = CliRunner().invoke(app, args + ["--chunk-size", "64", *options])
+        assert res.exit_code == 2
+
+
+def test_adaptive_sampling_budget():
+    X, y = make_classification(n_samples=3000, n_features=6, random_state=0)
+    lr = LogisticRegression(max_iter=300).fit(X, y)
+    rf = RandomForestClassifier(n_estimators=20, random_state=0).fit(X, y)
+    p = pathlib.Path(tempfile.mkdtemp())
+    joblib.dump(lr, p / "lr.pkl")
+    joblib.dump(rf, p / "rf.pkl")
+    np.save(p / "Xa.npy", X[:2000])
+    np.save(p / "Xb.npy", X[1000:])
+
+    res = CliRunner().invoke(
+        app,
+        [
+            "diff",
+            str(p / "lr.pkl"),
+            str(p / "rf.pkl"),
+            "--sampling",
+            "adaptive",
+            "--Xa",
+            str(p / "Xa.npy"),
+            "--Xb",
+            str(p / "Xb.npy"),
+            "--budget",
+            "500",
+            "-o",
+            str(p / "out.json"),
+        ],
+    )
+    assert res.exit_code == 0, res.stdout
+    out = json.loads((p / "out.json").read_text())
+    assert out["metadata"]["dataset_size"] == 500
+    assert out["rules"]
+
+
+def test_diff_many_shares_one_pass(monkeypatch):
+    from tarmac.explainers.deltaxplainer import DeltaXplainer
+
+    walks = []
+    extract_rules = DeltaXplainer.extract_rules
+
+    def counted(self):
+        walks.append(self)
+        return extract_rules(self)
+
+    monkeypatch.setattr(DeltaXplainer, "extract_rules", counted)
+    X, y = load_iris(return_X_y=True)
+    p = pathlib.Path(tempfile.mkdtemp())
+    joblib.dump(LogisticRegression(max_iter=300).fit(X, y), p / "base.pkl")
+    joblib.dump(RandomForestClassifier(random_state=0).fit(X, y), p / "rf.pkl")
+    joblib.dump(MLPClassifier(max_iter=50, random_state=0).fit(X, y), p / "mlp.pkl")
+
+    res = CliRunner().invoke(
+        app,
+        [
+            "diff-many",
+            str(p / "base.pkl"),
+            str(p / "rf.pkl"),
+            str(p / "mlp.pkl"),
+            "--matrix",
+            "-o",
+            str(p / "many.json"),
+        ],
+    )
+    assert res.exit_code == 0, res.stdout
+    out = json.loads((p / "many.json").read_text())
+    assert [c["model_b"] for c in out["comparisons"]] == [
+        str(p / "rf.pkl"),
+        str(p / "mlp.pkl"),
+    ]
+    rates = np.array(out["disagreement_matrix"]["rates"])
+    assert rates.shape == (3, 3) and np.allclose(rates, rates.T)
+    assert rates[0, 1] == out["comparisons"][0]["disagreement_rate"]
+    # every explainer's tree is walked once for both outputs
+    assert len(walks) == len(set(map(id, walks))) == 2
+
+
+def test_profile_and_trace():
+    X, y = load_iris(return_X_y=True)
+    p = pathlib.Path(tempfile.mkdtemp())
+    joblib.dump(LogisticRegression(max_iter=300).fit(X, y), p / "lr.pkl")
+    joblib.dump(RandomForestClassifier(random_state=0).fit(X, y), p / "rf.pkl")
+    res = CliRunner().invoke(
+        app,
+        [
+            "diff",
+            str(p / "lr.pkl"),
+            str(p / "rf.pkl"),
+            "--profile",
+            "--trace",
+            str(p / "trace.json"),
+            "--jobs",
+            "2",
+            "-o",
+            str(p / "out.json"),
+        ],
+    )
+    assert res.exit_code == 0, res.stdout
+    assert "Profile" in res.stdout
+
+    with open(p / "out.json") as f:
+        profile = json.load(f)["metadata"]["profile"]
+    stages = [s["stage"] for s in profile["stages"]]
+    assert stages == [
+        "load_models",
+        "load",
+        "split",
+        "inference",
+        "delta",
+        "fit",
+        "explain",
+    ]
+    assert all(s["wall_seconds"] >= 0 for s in profile["stages"])
+    latency = profile["inference_latency"][str(p / "lr.pkl")]
+    assert latency["calls"] == 2 and latency["rows"] == 60
+    assert latency["p50_seconds"] <= latency["p99_seconds"]
+
+    with open(p / "trace.json") as f:
+        events = json.load(f)["traceEvents"]
+    names = {e["name"] for e in events}
+    assert {"report", "fit", f"predict {p / 'rf.pkl'}"} <= names
+    assert all(e["ph"] == "X" and e["dur"] >= 0 for e in events)
+
+
+def test_soft_delta_builders():
+    from tarmac.delta.base import choose_builder
+    from tarmac.delta.soft import align_proba
+
+    p = np.array([[1.0, 0.0], [0.5, 0.5], [0.2, 0.8]])
+    q = np.array([[0.0, 1.0], [0.5, 0.5], [0.4, 0.6]])
+    np.testing.assert_allclose(choose_builder("l1").build(p, q), [1.0, 0.0, 0.2])
+    js = choose_builder("js").build(p, q)
+    assert js[0] == pytest.approx(1.0) and js[1] == 0 and 0 < js[2] < 0.2
+    np.testing.assert_array_equal(
+        choose_builder("js").build(p, q, epsilon=0.5), [1, 0, 0]
+    )
+
+    rng = np.random.default_rng(0)
+    a, b = rng.dirichlet(np.ones(4), 5000), rng.dirichlet(np.ones(4), 5000)
+    for name in ("l1", "js"):
+        full = choose_builder(name).build(a, b)
+        assert np.array_equal(full, choose_builder(name).build(a, b, chunk_size=7))
+        assert ((full >= 0) & (full <= 1 + 1e-12)).all()
+
+    aligned = align_proba(np.array([[0.3, 0.7]]), ["b", "c"], np.array(["a", "b", "c"]))
+    np.testing.assert_array_equal(aligned, [[0.0, 0.3, 0.7]])
+
+
+def test_probability_delta_cli():
+    X, y = load_iris(return_X_y=True)
+    p = pathlib.Path(tempfile.mkdtemp())
+    joblib.dump(LogisticRegression(max_iter=300).fit(X, y), p / "lr.pkl")
+    joblib.dump(RandomForestClassifier(random_state=0).fit(X, y), p / "rf.pkl")
+    res = CliRunner().invoke(
+        app,
+        [
+            "diff",
+            str(p / "lr.pkl"),
+            str(p / "rf.pkl"),
+            "--delta",
+            "js",
+            "--epsilon",
+            "0.1",
+            "-o",
+            str(p / "out.json"),
+        ],
+    )
+    assert res.exit_code == 0, res.stdout
+    with open(p / "out.json") as f:
+        metadata = json.load(f)["metadata"]
+    assert metadata["delta"] == "js" and metadata["epsilon"] == 0.1
+    assert 0 < metadata["mean_delta_score"] < 1
+
+
+def test_bootstrap_cli():
+    X, y = load_iris(return_X_y=True)
+    p = pathlib.Path(tempfile.mkdtemp())
+    joblib.dump(LogisticRegression(max_iter=300).fit(X, y), p / "lr.pkl")
+    joblib.dump(RandomForestClassifier(random_state=0).fit(X, y), p / "rf.pkl")
+    res = CliRunner().invoke(
+        app,
+        [
+            "diff",
+            str(p / "lr.pkl"),
+            str(p / "rf.pkl"),
+            "--bootstrap",
+            "10",
+            "--jobs",
+            "2",
+            "-o",
+            str(p / "out.json"),
+        ],
+    )
+    assert res.exit_code == 0, res.stdout
+    assert "bootstrap resamples" in res.stdout
+    with open(p / "out.json") as f:
+        report = json.load(f)
+    assert report["metadata"]["bootstrap"] == 10
+    for rule in report["rules"]:
+        assert 0 <= rule["bootstrap_frequency"] <= 1
+        if rule["bootstrap_frequency"]:
+            for condition in rule["conditions"]:
+                low, high = condition["threshold_ci"]
+                assert low <= high
+
+
+@pytest.mark.parametrize(
+    "args, option",
+    [
+        (["diff", "a.pkl", "b.pkl"], "--jobs"),
+        (["diff", "a.pkl", "b.pkl"], "--bootstrap"),
+        (["diff-many", "a.pkl", "b.pkl"], "--jobs"),
+        (["log", "models"], "--jobs"),
+    ],
+)
+def test_negative_counts_are_rejected(args, option):
+    res = CliRunner().invoke(app, [*args, option, "-1"])
+    assert res.exit_code == 2
+    assert option in res.output and "-1" in res.output
+
+
+def test_split_options():
+    X, y = load_iris(return_X_y=True)
+    p = pathlib.Path(tempfile.mkdtemp())
+    joblib.dump(LogisticRegression(max_iter=300).fit(X, y), p / "lr.pkl")
+    joblib.dump(RandomForestClassifier(random_state=0).fit(X, y), p / "rf.pkl")
+    for split, size in (("full", 150), ("stratified", 30)):
+        res = CliRunner().invoke(
+            app,
+            [
+                "diff",
+                str(p / "lr.pkl"),
+                str(p / "rf.pkl"),
+                "--split",
+                split,
+                "--test-size",
+                "0.2",
+                "-o",
+                str(p / "out.json"),
+            ],
+        )
+        assert res.exit_code == 0, res.stdout
+        with open(p / "out.json") as f:
+            assert json.load(f)["metadata"]["dataset_size"] == size
+
+
+def test_streaming_pipelines_on_named_columns():
+    from sklearn.compose import ColumnTransformer
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import OneHotEncoder
+
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        {
+            "city": rng.choice(["lyon", "nice", "paris"], 1000),
+            "age": rng.integers(18, 80, 1000),
+        }
+    )
+    y = ((df["city"] == "nice") | (df["age"] > 60)).astype(int)
+    p = pathlib.Path(tempfile.mkdtemp())
+    encode = ColumnTransformer(
+        [("city", OneHotEncoder(), ["city"])], remainder="passthrough"
+    )
+    joblib.dump(
+        make_pipeline(encode, LogisticRegression(max_iter=300)).fit(df, y), p / "a.pkl"
+    )
+    joblib.dump(
+        make_pipeline(encode, RandomForestClassifier(random_state=0)).fit(df, y),
+        p / "b.pkl",
+    )
+    df.iloc[:600].to_csv(p / "Xa.csv", index=False)
+    df.iloc[400:].to_csv(p / "Xb.csv", index=False)
+
+    for options in (["--chunk-size", "128"], ["--split", "full"]):
+        res = CliRunner().invoke(
+            app,
+            [
+                "diff",
+                str(p / "a.pkl"),
+                str(p / "b.pkl"),
+                "--sampling",
+                "union",
+                "--Xa",
+                str(p / "Xa.csv"),
+                "--Xb",
+                str(p / "Xb.csv"),
+                "-o",
+                str(p / "out.json"),
+                *options,
+            ],
+        )
+        assert res.exit_code == 0, res.stdout
+        rules = json.loads((p / "out.json").read_text())["rules"]
+        for condition in (c for r in rules for c in r["conditions"]):
+            assert condition["feature"] in ("city", "age")
+            if condition["feature"] == "city":
+                assert set(condition["categories"]) <= {"lyon", "nice", "paris"}
@@ -9,6 +9,7 @@ from sklearn.neural_network import MLPRegressor
 import pandas as pd
 from sklearn.model_selection import train_test_split
 import warnings
+import pytest
 
 from tarmac.cli import app
 from typer.testing import CliRunner
@@ -155,3 +156,106 @@ def test_regression_with_custom_data():
     assert "Model Difference Analysis" in res_uf.stdout
     assert "explaining model differences:" in res_uf.stdout
     assert res_txt.stdout.count("IF") > 1  # Ensure multiple rules
+
+
+def test_chunked_regression_matches_in_memory():
+    X, y = load_diabetes(return_X_y=True)
+    lr = LinearRegression().fit(X, y)
+    rf = RandomForestRegressor(n_estimators=20, random_state=0).fit(X, y)
+    p = pathlib.Path(tempfile.mkdtemp())
+    joblib.dump(lr, p / "lr_reg.pkl")
+    joblib.dump(rf, p / "rf_reg.pkl")
+
+    runner = CliRunner()
+    args = ["diff", str(p / "lr_reg.pkl"), str(p / "rf_reg.pkl"), "--data", "diabetes"]
+    res = runner.invoke(app, args)
+    res_chunked = runner.invoke(app, args + ["--chunk-size", "50"])
+    assert res_chunked.exit_code == 0
+    assert res_chunked.stdout == res.stdout
+
+    res_hist = runner.invoke(app, args + ["--chunk-size", "50", "--engine", "hist"])
+    assert res_hist.exit_code == 0
+    assert "Generated" in res_hist.stdout
+
+
+def test_diff_sketch_quantiles_and_merge():
+    import numpy as np
+    from tarmac.delta.sketch import DiffSketch
+
+    rng = np.random.default_rng(0)
+    values = np.concatenate([rng.lognormal(size=100_000), np.zeros(500)])
+    full = DiffSketch().update(values)
+    merged = DiffSketch()
+    for chunk in np.array_split(rng.permutation(values), 13):
+        merged.merge(DiffSketch().update(chunk))
+
+    assert merged.buckets == full.buckets and merged.zeros == full.zeros
+    assert merged.max == full.max == values.max()
+    for q in (0.01, 0.5, 0.9, 0.99):
+        assert merged.quantile(q) == full.quantile(q)
+        assert full.quantile(q) == pytest.approx(np.quantile(values, q), rel=0.03)
+    mad = np.median(np.abs(values - np.median(values)))
+    assert full.mad() == pytest.approx(mad, rel=0.05)
+
+
+def test_regression_threshold_scales():
+    import numpy as np
+    from tarmac.delta.regression import RegressionDelta
+
+    rng = np.random.default_rng(0)
+    a = rng.normal(size=10_000)
+    b = a + rng.normal(scale=0.1, size=10_000)
+    b[0] += 1000  # one outlier
+
+    diff = np.abs(a - b)
+    legacy = (diff > 0.05 * diff.max()).astype(int)
+    builder = RegressionDelta()
+    assert np.array_equal(builder.build(a, b, epsilon=0.05), legacy)
+    assert builder.threshold_ == 0.05 * diff.max()
+    assert legacy.sum() == 1  # the outlier hides every other difference
+
+    robust = RegressionDelta(scale="quantile")
+    labels = robust.build(a, b, epsilon=0.5)
+    assert robust.threshold_ == pytest.approx(0.5 * np.quantile(diff, 0.99), rel=0.03)
+    assert 10 < labels.sum() < len(a) // 2
+    assert RegressionDelta(scale="mad").build(a, b, epsilon=0.5).sum() > 1
+    assert RegressionDelta(scale="mad").build(a, b, epsilon=2).sum() == (
+        (diff > 2).sum()
+    )
+
+
+def test_chunked_robust_threshold_matches_in_memory():
+    import json
+
+    X, y = load_diabetes(return_X_y=True)
+    lr = LinearRegression().fit(X, y)
+    rf = RandomForestRegressor(n_estimators=20, random_state=0).fit(X, y)
+    p = pathlib.Path(tempfile.mkdtemp())
+    joblib.dump(lr, p / "lr_reg.pkl")
+    joblib.dump(rf, p / "rf_reg.pkl")
+
+    runner = CliRunner()
+    args = [
+        "diff",
+        str(p / "lr_reg.pkl"),
+        str(p / "rf_reg.pkl"),
+        "--data",
+        "diabetes",
+        "--threshold-scale",
+        "mad",
+        "--epsilon",
+        "0.3",
+    ]
+    res = runner.invoke(app, args + ["-o", str(p / "full.json")])
+    res_chunked = runner.invoke(
+        app, args + ["--chunk-size", "37", "-o", str(p / "chunked.json")]
+    )
+    assert res.exit_code == 0 and res_chunked.exit_code == 0
+    assert res_chunked.stdout == res.stdout
+    assert "|a - b| >" in res.stdout
+
+    with open(p / "full.json") as f, open(p / "chunked.json") as g:
+        full, chunked = json.load(f), json.load(g)
+    assert full == chunked
+    assert full["metadata"]["threshold_scale"] == "mad"
+    assert full["metadata"]["threshold"] > 0
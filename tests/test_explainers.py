@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tarmac.explainers.deltaxplainer import DeltaXplainer
+from tarmac.explainers.histogram import BinMapper, HistDeltaXplainer
+from tarmac.explainers.hoeffding import HoeffdingDeltaXplainer
+
+
+def _in_box(X, path):
+    mask = np.ones(len(X), dtype=bool)
+    for feat, op, thresh in path:
+        column = X[:, feat].astype(np.float32)
+        mask &= column <= thresh if op == "<=" else column > thresh
+    return mask
+
+
+def test_rule_boxes_match_tree_leaves():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(20000, 5))
+    y = ((X[:, 0] * X[:, 1] > 0.2) ^ (rng.random(len(X)) < 0.1)).astype(int)
+    explainer = DeltaXplainer(min_leaf=0.0005).fit(X, y)
+
+    rules = explainer.extract_rules()
+    leaves = explainer.tree.apply(X.astype(np.float32))
+    assert len(rules) > 100
+
+    scores = [r["disagreement_pct"] * r["samples"] for r in rules]
+    assert scores == sorted(scores, reverse=True)
+    for rule in rules:
+        ops = [(feat, op) for feat, op, _ in rule["path"]]
+        assert len(ops) == len(set(ops))
+        np.testing.assert_array_equal(_in_box(X, rule["path"]), leaves == rule["node"])
+
+    assert len(explainer.explain()) == len(explainer.explain(return_dict=True))
+
+
+def test_histogram_engine_rules():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(50000, 6))
+    y = ((X[:, 0] > 1) & (X[:, 3] < 0)).astype(int)
+    explainer = HistDeltaXplainer(min_leaf=0.01, n_threads=2).fit(X, y)
+
+    rules = explainer.extract_rules()
+    leaves = explainer.tree.apply(X)
+    for rule in rules:
+        mask = np.ones(len(X), dtype=bool)
+        for feat, op, thresh in rule["path"]:
+            mask &= X[:, feat] <= thresh if op == "<=" else X[:, feat] > thresh
+        np.testing.assert_array_equal(mask, leaves == rule["node"])
+        assert rule["samples"] >= 500
+
+    top = explainer.explain(return_dict=True)[0]
+    assert {c["feature"] for c in top["conditions"]} == {"feature_0", "feature_3"}
+    assert top["disagreement_percentage"] == 100.0
+    assert explainer.explain()[0].startswith("IF ")
+
+
+def test_bin_edges_from_a_row_subsample():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(5000, 3)).astype(np.float32)
+    by_array = BinMapper(max_bins=16, subsample=1000).fit(X)
+    by_frame = BinMapper(max_bins=16, subsample=1000).fit(pd.DataFrame(X))
+    full = BinMapper(max_bins=16).fit(X)
+    for a, b, c in zip(by_array.edges_, by_frame.edges_, full.edges_):
+        np.testing.assert_array_equal(a, b)
+        assert len(a) == 15 and not np.array_equal(a, c)
+
+
+def test_online_explainer_partial_fit():
+    rng = np.random.default_rng(0)
+    explainer = HoeffdingDeltaXplainer(min_leaf=0.01, max_leaves=32)
+    assert explainer.explain() == explainer.explain(return_dict=True) == []
+    for _ in range(40):
+        X = rng.normal(size=(2000, 5))
+        y = ((X[:, 0] > 1) & (X[:, 3] < 0)).astype(int)
+        explainer.partial_fit(X, y)
+        explainer.explain()  # rules are available after every batch
+
+    tree = explainer.tree.tree_
+    assert (tree.children_left == -1).sum() <= 32
+    assert tree.n_node_samples[0] == explainer.n_seen_ == 80000
+
+    top = explainer.explain(return_dict=True)[0]
+    assert {c["feature"] for c in top["conditions"]} >= {"feature_0", "feature_3"}
+    assert top["disagreement_percentage"] > 90
+
+
+def test_bootstrap_rule_stability():
+    from tarmac.bootstrap import bootstrap_rules, rule_stability
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(4000, 3))
+    y = (X[:, 0] > 0.5).astype(int)
+    explainer = DeltaXplainer(min_leaf=0.01).fit(X, y)
+    rules = explainer.extract_rules()
+
+    found = bootstrap_rules(X, y, 8, min_leaf=0.01, seed=1)
+    # workers memory-map the data and give the same fits
+    assert bootstrap_rules(X, y, 8, min_leaf=0.01, seed=1, jobs=2) == found
+
+    stability = rule_stability(rules, found, 8)
+    assert stability[0]["frequency"] == 1.0
+    ((low, high),) = stability[0]["threshold_ci"]
+    assert low <= 0.5 <= high and high - low < 0.1
+
+
+def test_sparse_fit_matches_dense():
+    from scipy import sparse
+
+    rng = np.random.default_rng(0)
+    X = rng.integers(0, 4, size=(2000, 30)) * (rng.random((2000, 30)) < 0.2)
+    y = ((X[:, 0] > 1) | (X[:, 1] == 3)).astype(int)
+    dense = DeltaXplainer(min_leaf=0.01).fit(X.astype(float), y)
+    sparse_fit = DeltaXplainer(min_leaf=0.01).fit(sparse.csr_matrix(X, dtype=float), y)
+    assert sparse_fit.explain() == dense.explain()
+
+    with pytest.raises(ValueError, match="exact engine"):
+        HistDeltaXplainer().fit(sparse.csr_matrix(X, dtype=float), y)
@@ -0,0 +1,74 @@
+from sklearn.datasets import load_iris
+from sklearn.linear_model import LogisticRegression
+from sklearn.ensemble import RandomForestClassifier
+import joblib
+import json
+import tempfile
+import pathlib
+import tarmac.adapters
+import tarmac.history
+from tarmac.cli import app
+from tarmac.history import ModelLog, list_versions
+from typer.testing import CliRunner
+
+
+def test_log_is_incremental(monkeypatch):
+    X, y = load_iris(return_X_y=True)
+    p = pathlib.Path(tempfile.mkdtemp())
+    joblib.dump(LogisticRegression(max_iter=300).fit(X, y), p / "model_v2.pkl")
+    joblib.dump(RandomForestClassifier(random_state=0).fit(X, y), p / "model_v10.pkl")
+    joblib.dump(LogisticRegression(C=0.01, max_iter=300).fit(X, y), p / "model_v1.pkl")
+    assert [v.name for v in list_versions(p)] == [
+        "model_v1.pkl",
+        "model_v2.pkl",
+        "model_v10.pkl",
+    ]
+
+    first = ModelLog(p).update(X)
+    assert [(e["from"], e["to"], e["computed"]) for e in first] == [
+        ("model_v1.pkl", "model_v2.pkl", True),
+        ("model_v2.pkl", "model_v10.pkl", True),
+    ]
+    # every version was scored once
+    assert len(list((p / ".tarmac" / "predictions").glob("*.npy"))) == 3
+
+    again = ModelLog(p).update(X)
+    assert not any(e["computed"] for e in again)
+    assert [e["rules"] for e in again] == [e["rules"] for e in first]
+
+    joblib.dump(
+        RandomForestClassifier(5, random_state=1).fit(X, y), p / "model_v11.pkl"
+    )
+    loads = []
+
+    def get_adapter(path, mmap_dir=None):
+        loads.append(path.name)
+        return tarmac.adapters.get_adapter(path, mmap_dir)
+
+    monkeypatch.setattr(tarmac.history, "get_adapter", get_adapter)
+    latest = ModelLog(p).update(X)
+    assert [e["computed"] for e in latest] == [False, False, True]
+    # only the new pair was loaded, and nothing stays in the registry
+    assert loads == ["model_v10.pkl", "model_v11.pkl"]
+    assert not any(
+        key[0].startswith(str(p.resolve())) for key in tarmac.adapters._registry
+    )
+    assert len(list((p / ".tarmac" / "predictions").glob("*.npy"))) == 4
+
+
+def test_log_cli():
+    X, y = load_iris(return_X_y=True)
+    p = pathlib.Path(tempfile.mkdtemp())
+    joblib.dump(LogisticRegression(max_iter=300).fit(X, y), p / "a.pkl")
+    joblib.dump(RandomForestClassifier(random_state=0).fit(X, y), p / "b.pkl")
+    args = ["log", str(p), "-o", str(p / "log.json")]
+    res = CliRunner().invoke(app, args)
+    assert res.exit_code == 0, res.stdout
+    assert "a.pkl → b.pkl" in res.stdout and "(1 new)" in res.stdout
+
+    res = CliRunner().invoke(app, args)
+    assert "(0 new)" in res.stdout
+    with open(p / "log.json") as f:
+        log = json.load(f)
+    assert log["metadata"]["versions"] == ["a.pkl", "b.pkl"]
+    assert log["diffs"][0]["computed"] is False
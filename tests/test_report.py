@@ -0,0 +1,136 @@
+from sklearn.datasets import load_iris
+from sklearn.linear_model import LogisticRegression
+from sklearn.ensemble import RandomForestClassifier
+import joblib
+import json
+import numpy as np
+import pandas as pd
+import tempfile
+import pathlib
+import sys
+import warnings
+from tarmac.cli import app
+from tarmac.report import load_rows, read_ndjson, write_json, write_ndjson
+from typer.testing import CliRunner
+
+
+def test_streaming_writers():
+    p = pathlib.Path(tempfile.mkdtemp())
+    metadata = {"total_rules": 2, "task": "classification", "epsilon": None}
+    rules = [
+        {"conditions": [{"feature": "x", "op": ">", "value": 1.5}], "samples": 3},
+        {"conditions": [], "samples": 1},
+    ]
+    for listed in (rules, []):
+        write_json(p / "streamed.json", metadata, iter(listed))
+        with open(p / "dumped.json", "w") as f:
+            json.dump({"metadata": metadata, "rules": listed}, f, indent=2)
+        assert (p / "streamed.json").read_text() == (p / "dumped.json").read_text()
+
+    write_ndjson(p / "rules.ndjson", metadata, iter(rules))
+    read_metadata, read_rules = read_ndjson(p / "rules.ndjson")
+    assert read_metadata == metadata
+    assert list(read_rules) == rules
+
+
+def test_rows_out():
+    X, y = load_iris(return_X_y=True)
+    p = pathlib.Path(tempfile.mkdtemp())
+    joblib.dump(LogisticRegression(max_iter=300).fit(X, y), p / "lr.pkl")
+    joblib.dump(RandomForestClassifier(random_state=0).fit(X, y), p / "rf.pkl")
+    res = CliRunner().invoke(
+        app,
+        [
+            "diff",
+            str(p / "lr.pkl"),
+            str(p / "rf.pkl"),
+            "--min-samples-leaf",
+            "0.05",
+            "-o",
+            str(p / "rules.ndjson"),
+            "--rows-out",
+            str(p / "rows"),
+        ],
+    )
+    assert res.exit_code == 0, res.stdout
+
+    rows = load_rows(p / "rows")
+    assert set(rows) == {
+        "source",
+        "index",
+        "prediction_a",
+        "prediction_b",
+        "delta",
+        "leaf",
+        "rule_id",
+    }
+    # rows point back to the iris rows the holdout split kept
+    assert (rows["source"] == 0).all()
+    assert len(set(rows["index"])) == len(rows["index"]) < len(X)
+    lr = joblib.load(p / "lr.pkl")
+    np.testing.assert_array_equal(rows["prediction_a"], lr.predict(X[rows["index"]]))
+    np.testing.assert_array_equal(
+        rows["delta"], rows["prediction_a"] != rows["prediction_b"]
+    )
+
+    metadata, rules = read_ndjson(p / "rules.ndjson")
+    rules = list(rules)
+    assert metadata["total_rules"] == len(rules)
+    # every rule covers exactly the rows labelled with its ID
+    for rule_id, rule in enumerate(rules, 1):
+        assert (rows["rule_id"] == rule_id).sum() == rule["samples_affected"]
+    assert rows["delta"][rows["rule_id"] == 0].sum() == 0
+
+
+def test_rows_out_of_a_union():
+    X, y = load_iris(return_X_y=True)
+    p = pathlib.Path(tempfile.mkdtemp())
+    names = ["sl", "sw", "pl", "pw"]
+    # A and B overlap on rows 60-99
+    X_ab = [X[:100], X[60:]]
+    pd.DataFrame(X_ab[0], columns=names).to_csv(p / "a.csv", index=False)
+    pd.DataFrame(X_ab[1], columns=names).to_csv(p / "b.csv", index=False)
+    X_ab = [pd.read_csv(p / name).to_numpy() for name in ("a.csv", "b.csv")]
+    joblib.dump(LogisticRegression(max_iter=300).fit(X, y), p / "lr.pkl")
+    joblib.dump(RandomForestClassifier(random_state=0).fit(X, y), p / "rf.pkl")
+
+    for extra in ([], ["--chunk-size", "32"]):
+        out = p / f"rows{len(extra)}"
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", UserWarning)
+            res = CliRunner().invoke(
+                app,
+                [
+                    "diff",
+                    str(p / "lr.pkl"),
+                    str(p / "rf.pkl"),
+                    "--sampling",
+                    "union",
+                    "--Xa",
+                    str(p / "a.csv"),
+                    "--Xb",
+                    str(p / "b.csv"),
+                    "--rows-out",
+                    str(out),
+                    *extra,
+                ],
+            )
+        assert res.exit_code == 0, res.stdout
+
+        rows = load_rows(out)
+        X_rows = np.array([X_ab[s][i] for s, i in zip(rows["source"], rows["index"])])
+        # rows B shares with A are read from A
+        assert (rows["index"][rows["source"] == 1] >= 40).all()
+        lr = joblib.load(p / "lr.pkl")
+        np.testing.assert_array_equal(rows["prediction_a"], lr.predict(X_rows))
+
+
+def test_parquet_rows_out_needs_pyarrow(monkeypatch):
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    monkeypatch.setitem(sys.modules, "pyarrow.parquet", None)
+    p = pathlib.Path(tempfile.mkdtemp())
+    res = CliRunner().invoke(
+        app, ["diff", "a.pkl", "b.pkl", "--rows-out", str(p / "rows.parquet")]
+    )
+    # rejected before the models are loaded
+    assert res.exit_code == 2 and "pyarrow" in res.output
@@ -0,0 +1,159 @@
+import json
+import pathlib
+import tempfile
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+from sklearn.tree import DecisionTreeClassifier
+from typer.testing import CliRunner
+
+from tarmac.cli import app
+from tarmac.data import Dataset, numeric_view
+from tarmac.explainers.deltaxplainer import DeltaXplainer
+from tarmac.report import rule_ids_by_node, write_json
+from tarmac.rules import RuleSet
+
+
+def _first_match(X, rules, columns):
+    labels = np.zeros(len(X), dtype=np.int32)
+    for rule_id, rule in reversed(list(enumerate(rules, 1))):
+        mask = np.ones(len(X), dtype=bool)
+        for c in rule["conditions"]:
+            column = X[:, columns[c["feature"]]]
+            t = c.get("threshold_exact", c["threshold"])
+            mask &= column <= t if c["operator"] == "<=" else column > t
+        labels[mask] = rule_id
+    return labels
+
+
+def test_compiled_rules_match_naive_evaluation():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(20000, 4))
+    y = ((X[:, 0] > 0.5) | (X[:, 2] * X[:, 3] > 1)).astype(int)
+    rules = DeltaXplainer(min_leaf=0.005).fit(X, y).explain(return_dict=True)
+    rule_set = RuleSet(rules)
+    assert len(rule_set.literals) < sum(len(r["conditions"]) for r in rules)
+
+    X_new = rng.normal(size=(50000, 4))
+    X_new[::97, 0] = np.nan
+    labels = rule_set.apply(X_new, chunk_size=4096)
+    columns = {f"feature_{i}": i for i in range(4)}
+    assert np.array_equal(labels, _first_match(X_new, rules, columns))
+    # NaN satisfies no condition on its feature
+    for rule_id in np.unique(labels[::97]):
+        if rule_id:
+            conditions = rules[rule_id - 1]["conditions"]
+            assert "feature_0" not in [c["feature"] for c in conditions]
+
+    # named features are looked up by name, in any column order
+    df = pd.DataFrame(X_new[:, ::-1], columns=["d", "c", "b", "a"])
+    renamed = [
+        {
+            **r,
+            "conditions": [
+                {**c, "feature": "abcd"[int(c["feature"][-1])]} for c in r["conditions"]
+            ],
+        }
+        for r in rules
+    ]
+    assert np.array_equal(RuleSet(renamed).apply(df), labels)
+
+
+def test_applied_rules_match_tree_leaves():
+    # thresholds around 0.01 are far finer than the 3 decimals displayed
+    rng = np.random.default_rng(2)
+    X = rng.normal(scale=0.01, size=(50000, 3))
+    y = ((X[:, 0] > 0.004) ^ (X[:, 1] < -0.0123)).astype(int)
+    explainer = DeltaXplainer(min_leaf=0.002).fit(X, y)
+    raw_rules = explainer.extract_rules()
+    rules = [explainer.format_rule_dict(rule) for rule in raw_rules]
+    p = pathlib.Path(tempfile.mkdtemp())
+    write_json(p / "rules.json", {"total_rules": len(rules)}, rules)
+    np.save(p / "X.npy", X)
+
+    res = CliRunner().invoke(
+        app,
+        ["apply", str(p / "rules.json"), str(p / "X.npy"), "-o", str(p / "ids.npy")],
+    )
+    assert res.exit_code == 0, res.stdout
+    expected = rule_ids_by_node(explainer, raw_rules)[explainer.tree.apply(X)]
+    np.testing.assert_array_equal(np.load(p / "ids.npy"), expected)
+
+
+def test_apply_command():
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(2000, 3))
+    y = (X[:, 0] > 0).astype(int)
+    p = pathlib.Path(tempfile.mkdtemp())
+    joblib.dump(LogisticRegression().fit(X, y), p / "lr.pkl")
+    joblib.dump(DecisionTreeClassifier(max_depth=2).fit(X, y), p / "dt.pkl")
+    np.save(p / "X.npy", X)
+    runner = CliRunner()
+    res = runner.invoke(
+        app,
+        [
+            "diff",
+            str(p / "lr.pkl"),
+            str(p / "dt.pkl"),
+            "--sampling",
+            "union",
+            "--Xa",
+            str(p / "X.npy"),
+            "--Xb",
+            str(p / "X.npy"),
+            "--chunk-size",
+            "500",
+            "-o",
+            str(p / "rules.json"),
+        ],
+    )
+    assert res.exit_code == 0, res.stdout
+
+    for chunked in ([], ["--chunk-size", "300"]):
+        res = runner.invoke(
+            app,
+            ["apply", str(p / "rules.json"), str(p / "X.npy"), "-o", str(p / "ids.npy")]
+            + chunked,
+        )
+        assert res.exit_code == 0, res.stdout
+        assert "rows" in res.stdout
+        labels = np.load(p / "ids.npy")
+        with open(p / "rules.json") as f:
+            rules = json.load(f)["rules"]
+        columns = {f"feature_{i}": i for i in range(3)}
+        assert np.array_equal(labels, _first_match(X, rules, columns))
+
+
+def test_rules_on_categorical_columns():
+    rng = np.random.default_rng(3)
+    df = pd.DataFrame(
+        {
+            "city": rng.choice(["lyon", "nice", "paris", "lille"], 4000),
+            "age": rng.integers(18, 80, 4000),
+        }
+    )
+    df.loc[::50, "city"] = np.nan
+    y = (df["city"].isin(["nice", "paris"]) & (df["age"] > 40)).astype(int)
+    X = numeric_view(Dataset.from_frame(df))
+    explainer = DeltaXplainer(min_leaf=0.01).fit(X, y)
+    raw_rules = explainer.extract_rules()
+    rules = [explainer.format_rule_dict(rule) for rule in raw_rules]
+
+    conditions = [c for r in rules for c in r["conditions"] if c["feature"] == "city"]
+    assert conditions and all(
+        set(c["categories"]) <= {"lille", "lyon", "nice", "paris"} for c in conditions
+    )
+    assert "city in [" in explainer.format_rule_str(raw_rules[0])
+
+    p = pathlib.Path(tempfile.mkdtemp())
+    write_json(p / "rules.json", {"total_rules": len(rules)}, rules)
+    df.to_csv(p / "rows.csv", index=False)
+    res = CliRunner().invoke(
+        app,
+        ["apply", str(p / "rules.json"), str(p / "rows.csv"), "-o", str(p / "ids.npy")],
+    )
+    assert res.exit_code == 0, res.stdout
+    expected = rule_ids_by_node(explainer, raw_rules)[explainer.tree.apply(X)]
+    np.testing.assert_array_equal(np.load(p / "ids.npy"), expected)
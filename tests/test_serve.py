@@ -0,0 +1,102 @@
+import pathlib
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import joblib
+import numpy as np
+from sklearn.datasets import load_iris
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+
+from tarmac.serve import AdapterPool, MicroBatcher, create_app
+
+
+def _models():
+    X, y = load_iris(return_X_y=True)
+    p = pathlib.Path(tempfile.mkdtemp())
+    joblib.dump(LogisticRegression(max_iter=300).fit(X, y), p / "lr.pkl")
+    joblib.dump(RandomForestClassifier(random_state=0).fit(X, y), p / "rf.pkl")
+    return X, p / "lr.pkl", p / "rf.pkl"
+
+
+def test_micro_batcher_coalesces_requests():
+    X, lr, rf = _models()
+    pool = AdapterPool()
+    adapters = [pool.get(lr), pool.get(rf)]
+    batcher = MicroBatcher(adapters, max_batch=1000, max_delay=0.2)
+    futures = [batcher.submit(X[i : i + 3]) for i in range(0, 30, 3)]
+    results = [f.result() for f in futures]
+    batcher.close()
+
+    assert batcher.n_batches == 1
+    preds_a = np.concatenate([a for a, _ in results])
+    preds_b = np.concatenate([b for _, b in results])
+    assert np.array_equal(preds_a, adapters[0].predict(X[:30]))
+    assert np.array_equal(preds_b, adapters[1].predict(X[:30]))
+
+
+def test_adapter_pool_reuses_and_reloads():
+    X, lr, rf = _models()
+    pool = AdapterPool(max_models=2)
+    first = pool.get(lr)
+    assert pool.get(lr) is first
+
+    time.sleep(0.01)
+    joblib.dump(joblib.load(lr), lr)  # new mtime
+    assert pool.get(lr) is not first
+    pool.get(rf)
+    assert len(pool.paths()) == 2
+
+
+def test_serve_endpoints():
+    X, lr, rf = _models()
+    client = create_app(max_delay=0.01, model_dir=lr.parent).test_client()
+
+    res = client.post("/diff", json={"model_a": str(lr), "model_b": str(rf)})
+    assert res.status_code == 200
+    body = res.get_json()
+    assert body["metadata"]["task"] == "classification"
+    assert body["metadata"]["dataset_size"] == 60
+    assert "rules" in body
+
+    def query(i):
+        payload = {"model_a": str(lr), "model_b": str(rf), "rows": X[i].tolist()}
+        return client.post("/disagree", json=payload).get_json()
+
+    with ThreadPoolExecutor(8) as threads:
+        answers = list(threads.map(query, range(len(X))))
+    disagree = np.array([a["disagree"][0] for a in answers])
+    expected = joblib.load(lr).predict(X) != joblib.load(rf).predict(X)
+    assert np.array_equal(disagree, expected)
+
+    assert client.get("/health").get_json()["models"] == [
+        str(lr.resolve()),
+        str(rf.resolve()),
+    ]
+    res = client.post("/diff", json={"model_a": str(lr), "model_b": "missing.pkl"})
+    assert res.status_code == 400
+
+
+def test_serve_rejects_other_paths_and_bad_rows():
+    X, lr, rf = _models()
+    other = pathlib.Path(tempfile.mkdtemp())
+    np.save(other / "X.npy", X)
+    pool = AdapterPool()
+    pool.get(lr)
+    client = create_app(pool, max_delay=0.2).test_client()
+
+    res = client.post("/disagree", json={"model_a": str(lr), "model_b": str(rf)})
+    assert res.status_code == 400 and "not served" in res.get_json()["error"]
+    payload = {"model_a": str(lr), "model_b": str(lr), "sampling": "union"}
+    res = client.post("/diff", json={**payload, "Xa": str(other / "X.npy")})
+    assert res.status_code == 400 and "not served" in res.get_json()["error"]
+
+    def query(rows):
+        payload = {"model_a": str(lr), "model_b": str(lr), "rows": rows}
+        return client.post("/disagree", json=payload)
+
+    # a malformed request sent alongside good ones fails alone
+    with ThreadPoolExecutor(4) as threads:
+        answers = list(threads.map(query, [X[0].tolist(), [1.0, 2.0], X[1].tolist()]))
+    assert [a.status_code for a in answers] == [200, 400, 200]
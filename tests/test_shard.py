@@ -0,0 +1,120 @@
+from sklearn.datasets import load_diabetes, load_iris
+from sklearn.linear_model import LinearRegression, LogisticRegression
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+import joblib
+import json
+import numpy as np
+import pandas as pd
+import tempfile
+import pathlib
+from tarmac.adapters import get_adapter
+from tarmac.cli import app
+from tarmac.data import load_dataset, union_datasets
+from tarmac.shard import pair_shards, score_shards
+from typer.testing import CliRunner
+
+
+def write_shards(directory, X, y, bounds):
+    directory.mkdir()
+    columns = [f"f{i}" for i in range(X.shape[1])]
+    for i, (start, stop) in enumerate(bounds):
+        pd.DataFrame(X[start:stop], columns=columns).to_csv(
+            directory / f"part-{i}.csv", index=False
+        )
+        pd.DataFrame({"y": y[start:stop]}).to_csv(
+            directory / f"target-{i}.csv", index=False
+        )
+    return pd.DataFrame(X, columns=columns), directory
+
+
+def test_score_shards_matches_union():
+    X, y = load_diabetes(return_X_y=True)
+    p = pathlib.Path(tempfile.mkdtemp())
+    # A and B overlap on rows 200-299, and rows repeat across A's shards
+    X_a, y_a = np.vstack([X[:300], X[:50]]), np.concatenate([y[:300], y[:50]])
+    frame_a, dir_a = write_shards(p / "a", X_a, y_a, [(0, 120), (120, 250), (250, 350)])
+    frame_b, dir_b = write_shards(p / "b", X[200:], y[200:], [(0, 150), (150, 242)])
+    frame_a.to_csv(p / "a.csv", index=False)
+    frame_b.to_csv(p / "b.csv", index=False)
+    joblib.dump(LinearRegression().fit(frame_a, y_a), p / "lr.pkl")
+    joblib.dump(RandomForestRegressor(10, random_state=0).fit(X, y), p / "rf.pkl")
+
+    shards = pair_shards(dir_a / "part-*.csv", dir_a / "target-*.csv")
+    shards += pair_shards(dir_b / "part-*.csv", dir_b / "target-*.csv")
+    assert len(shards) == 5
+    X_s, y_s, preds_a, preds_b, source_s = score_shards(
+        shards, p / "lr.pkl", p / "rf.pkl", jobs=2, inputs=[0, 0, 0, 1, 1]
+    )
+
+    X_u, y_u, source_u = union_datasets(
+        load_dataset(p / "a.csv"),
+        load_dataset(p / "b.csv"),
+        y_a,
+        y[200:],
+        return_source=True,
+    )
+    assert len(X_s) == len(X_u) == len(X)
+    np.testing.assert_array_equal(X_s.to_numpy(), X_u.to_numpy())
+    np.testing.assert_array_equal(y_s.ravel(), y_u)
+    np.testing.assert_array_equal(source_s, source_u)
+    np.testing.assert_allclose(preds_a, get_adapter(p / "lr.pkl").predict(X_u))
+    np.testing.assert_allclose(preds_b, get_adapter(p / "rf.pkl").predict(X_u))
+
+
+def test_sharded_diff_cli():
+    X, y = load_iris(return_X_y=True)
+    p = pathlib.Path(tempfile.mkdtemp())
+    frame_a, dir_a = write_shards(p / "a", X[:100], y[:100], [(0, 40), (40, 100)])
+    frame_b, dir_b = write_shards(p / "b", X[60:], y[60:], [(0, 30), (30, 90)])
+    frame_a.to_csv(p / "Xa.csv", index=False)
+    frame_b.to_csv(p / "Xb.csv", index=False)
+    pd.DataFrame({"y": y[:100]}).to_csv(p / "ya.csv", index=False)
+    pd.DataFrame({"y": y[60:]}).to_csv(p / "yb.csv", index=False)
+    frame = pd.DataFrame(X, columns=frame_a.columns)
+    joblib.dump(LogisticRegression(max_iter=300).fit(frame, y), p / "lr.pkl")
+    joblib.dump(RandomForestClassifier(random_state=0).fit(frame, y), p / "rf.pkl")
+
+    def run(Xa, ya, Xb, yb, *options):
+        args = ["diff", str(p / "lr.pkl"), str(p / "rf.pkl"), "--sampling", "union"]
+        args += ["--Xa", str(Xa), "--ya", str(ya), "--Xb", str(Xb), "--yb", str(yb)]
+        res = CliRunner().invoke(app, args + ["-o", str(p / "out.json"), *options])
+        assert res.exit_code == 0, res.stdout
+        with open(p / "out.json") as f:
+            return json.load(f)
+
+    for split in ("holdout", "stratified"):
+        single = run(p / "Xa.csv", p / "ya.csv", p / "Xb.csv", p / "yb.csv")
+        sharded = run(
+            dir_a / "part-*.csv",
+            dir_a / "target-*.csv",
+            dir_b / "part-*.csv",
+            dir_b / "target-*.csv",
+            "--jobs",
+            "2",
+        )
+        assert sharded == single
+
+    # directories stand for every data file in them
+    (dir_b / "target-0.csv").unlink()
+    (dir_b / "target-1.csv").unlink()
+    res = CliRunner().invoke(
+        app,
+        [
+            "diff-many",
+            str(p / "lr.pkl"),
+            str(p / "rf.pkl"),
+            "--sampling",
+            "union",
+            "--Xa",
+            str(p / "Xa.csv"),
+            "--Xb",
+            str(dir_b),
+            "--split",
+            "full",
+            "-o",
+            str(p / "many.json"),
+        ],
+    )
+    assert res.exit_code == 0, res.stdout
+    with open(p / "many.json") as f:
+        assert json.load(f)["metadata"]["dataset_size"] == 149